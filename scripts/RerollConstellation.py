@@ -1,9 +1,26 @@
 import argparse
 import time
+from enum import Enum, auto
 
 import utilities.vision_images as vio
+from utilities.app_config import config
+from utilities.screen_events import PollingPolicy, PollingScheduler
 from utilities.utilities import capture_window, find, find_and_click
 
+
+class RerollStates(Enum):
+    LOOKING_FOR_BUTTON = auto()
+    REROLLED = auto()
+
+
+# How to wait when `event_driven_loops` is enabled (see `utilities.screen_events`). While the screen is static, only
+# its thumbnail is compared instead of looking for the button. The stats keep changing during the reroll animation,
+# so a change doesn't tell that it's over, and the wait after a reroll stays fixed
+POLLING_POLICIES = {
+    RerollStates.LOOKING_FOR_BUTTON: PollingPolicy(target_latency=0.1, max_poll_rate=10, min_wait=0.05, timeout=1.0),
+    RerollStates.REROLLED: PollingPolicy(target_latency=5.0, min_wait=5.0, timeout=5.0),
+}
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--max-rerolls", type=str, default=50, help="Maximum number of rerolls")
 args = parser.parse_args()
@@ -12,6 +29,7 @@ if (max_rerolls := float(args.max_rerolls)) < float("inf"):
     print(f"We'll reroll at most {int(max_rerolls)} times")
 
 num_rerolls = 0
+scheduler = PollingScheduler(POLLING_POLICIES) if config.get("event_driven_loops", False) else None
 
 while num_rerolls < max_rerolls:
 
@@ -20,6 +38,16 @@ while num_rerolls < max_rerolls:
     if find_and_click(vio.change_stats, screenshot, window_location):
         num_rerolls += 1
         print(f"Rerolled {num_rerolls} times.")
+        state = RerollStates.REROLLED
+    else:
+        state = RerollStates.LOOKING_FOR_BUTTON
+
+    if scheduler is not None:
+        scheduler.wait(state)
+    elif state == RerollStates.REROLLED:
         time.sleep(5)
     else:
         time.sleep(0.1)
+
+if scheduler is not None:
+    print(f"Reaction latencies:\n{scheduler.summary()}")
@@ -0,0 +1,195 @@
+"""Analyze the state traces of the farmers and the fighters (see `utilities/state_trace.py`), to find out where each
+farmer loses wall-clock time: the time spent in every state, the clears per hour, how long the turns and the phases of
+the fights take, and the slowest transitions.
+
+The fighters' states are only timed during the fights. Run it from the `scripts/` directory:
+    python analyze_traces.py [data/traces/trace_....jsonl] [--top 10] [--output trace_report.json]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from utilities.state_trace import TraceEvents, read_trace, trace_files
+
+# Name of `FightingStates.MY_TURN`, whose visits are the turns. Not imported, to analyze traces on any machine
+TURN_STATE = "MY_TURN"
+
+
+def _summary(durations: list[float]) -> dict:
+    values = np.array(durations) if durations else np.zeros(1)
+    return {
+        "count": len(durations),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class TraceAnalyzer:
+    """Accumulates the durations of the states, turns and phases of one or more traces"""
+
+    def __init__(self):
+        self.duration = 0.0
+        self.fights = 0
+        self.victories = 0
+        self.defeats = 0
+        # (source, state) -> seconds and visits
+        self.state_seconds: dict[tuple[str, str], float] = defaultdict(float)
+        self.state_visits: dict[tuple[str, str], int] = defaultdict(int)
+        self.turn_durations: list[float] = []
+        self.phase_durations: dict[str, list[float]] = defaultdict(list)
+        # (seconds in the state left, source, from, to, wall-clock time of the transition)
+        self.transitions: list[tuple[float, str, str, str, float | None]] = []
+
+    def add_trace(self, events: list[dict]):
+        if not events:
+            return
+        header = next((event for event in events if event["ev"] == TraceEvents.HEADER), None)
+        events = sorted((event for event in events if event["ev"] != TraceEvents.HEADER), key=lambda event: event["t"])
+        if not events:
+            return
+
+        def wall_time(t: float) -> float | None:
+            return header["wall_time"] + t - header["t"] if header is not None else None
+
+        fighters = {event["src"] for event in events if event["ev"] == TraceEvents.FIGHT_START}
+        # Current state of every source, and since when it's timed (None for the fighters between fights)
+        states: dict[str, tuple[str | None, float | None]] = {}
+        # Current phase of every fighter, and since when
+        phases: dict[str, tuple[str, float]] = {}
+
+        def close_state(source: str, t: float) -> str | None:
+            state, since = states.get(source, (None, None))
+            if state is not None and since is not None:
+                self.state_seconds[(source, state)] += t - since
+                self.state_visits[(source, state)] += 1
+                if state == TURN_STATE:
+                    self.turn_durations.append(t - since)
+            return state
+
+        def close_phase(source: str, t: float):
+            if source in phases:
+                phase, since = phases.pop(source)
+                self.phase_durations[str(phase)].append(t - since)
+
+        for event in events:
+            source, t, kind = event["src"], event["t"], event["ev"]
+            if kind == TraceEvents.STATE:
+                _, since = states.get(source, (None, None))
+                previous_state = close_state(source, t)
+                timed = since is not None or source not in fighters
+                if previous_state is not None and since is not None:
+                    self.transitions.append((t - since, source, previous_state, event["to"], wall_time(t)))
+                states[source] = (event["to"], t if timed else None)
+            elif kind == TraceEvents.FIGHT_START:
+                self.fights += 1
+                states[source] = (event.get("state"), t)
+                phases[source] = (event.get("phase"), t)
+            elif kind == TraceEvents.FIGHT_END:
+                states[source] = (close_state(source, t), None)
+                close_phase(source, t)
+            elif kind == TraceEvents.PHASE:
+                close_phase(source, t)
+                phases[source] = (event["to"], t)
+            elif kind == TraceEvents.FIGHT_RESULT:
+                if event.get("victory") is True:
+                    self.victories += 1
+                elif event.get("victory") is False:
+                    self.defeats += 1
+
+        end_time = events[-1]["t"]
+        for source in list(states):
+            close_state(source, end_time)
+        self.duration += end_time - events[0]["t"]
+
+    def report(self, top: int = 10) -> dict:
+        hours = self.duration / 3600
+        source_seconds = defaultdict(float)
+        for (source, _), seconds in self.state_seconds.items():
+            source_seconds[source] += seconds
+
+        time_per_state = [
+            {
+                "source": source,
+                "state": state,
+                "seconds": round(seconds, 3),
+                "share": round(seconds / source_seconds[source], 4) if source_seconds[source] else 0.0,
+                "visits": self.state_visits[(source, state)],
+                "mean_seconds": round(seconds / max(self.state_visits[(source, state)], 1), 3),
+            }
+            for (source, state), seconds in sorted(self.state_seconds.items(), key=lambda item: -item[1])
+        ]
+        slowest_transitions = [
+            {
+                "source": source,
+                "from": previous_state,
+                "to": state,
+                "seconds": round(seconds, 3),
+                "at": datetime.fromtimestamp(at).isoformat(timespec="seconds") if at is not None else None,
+            }
+            for seconds, source, previous_state, state, at in sorted(self.transitions, key=lambda item: -item[0])[:top]
+        ]
+        return {
+            "duration_hours": round(hours, 3),
+            "fights": self.fights,
+            "victories": self.victories,
+            "defeats": self.defeats,
+            "clears_per_hour": round(self.victories / hours, 2) if hours else 0.0,
+            "time_per_state": time_per_state,
+            "turn_duration_s": _summary(self.turn_durations),
+            "phase_duration_s": {
+                phase: _summary(durations) for phase, durations in sorted(self.phase_durations.items())
+            },
+            "slowest_transitions": slowest_transitions,
+        }
+
+
+def print_report(report: dict):
+    print(
+        f"{report['duration_hours']} h traced, {report['fights']} fights: {report['victories']} victories, "
+        f"{report['defeats']} defeats, {report['clears_per_hour']} clears/h"
+    )
+    print("\nTime per state:")
+    for row in report["time_per_state"]:
+        print(
+            f"  {row['source']:<32} {row['state']:<28} {row['seconds']:>10.1f} s  {row['share'] * 100:5.1f} %  "
+            f"{row['visits']:>6} visits  {row['mean_seconds']:>8.2f} s/visit"
+        )
+    turns = report["turn_duration_s"]
+    print(f"\nTurns: {turns['count']}, mean {turns['mean']} s, p95 {turns['p95']} s, max {turns['max']} s")
+    print("\nPhases:")
+    for phase, durations in report["phase_duration_s"].items():
+        print(f"  Phase {phase}: {durations['count']} times, mean {durations['mean']} s, max {durations['max']} s")
+    print("\nSlowest transitions:")
+    for row in report["slowest_transitions"]:
+        print(f"  {row['seconds']:>8.1f} s  {row['source']}: {row['from']} -> {row['to']}  ({row['at']})")
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("traces", type=str, nargs="*", help="Trace files to analyze. All of them by default")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest transitions to show")
+    parser.add_argument("--output", type=str, default=None, help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    analyzer = TraceAnalyzer()
+    for filepath in args.traces or trace_files():
+        analyzer.add_trace(read_trace(filepath))
+
+    report = analyzer.report(top=args.top)
+    print_report(report)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved in '{args.output}'")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,306 @@
+"""Benchmark every predictor of `utilities/models.py` on the held-out samples of its dataset (see
+`utilities.datasets.held_out_mask`): load time, memory footprint, single-sample and batched latency, and accuracy.
+
+The accuracy is only meaningful for the models trained without the held-out samples, as recorded in the model
+registry. For the others (e.g. the models trained before the registry, on all the data) it's reported as
+`training_accuracy` instead, and `accuracy` is null.
+
+Only needs 'data/' and 'models/', no game window, so it runs headless. The report is a JSON file with stable key order,
+to diff between model versions. Run it from the `scripts/` directory:
+    python benchmark_models.py [--output benchmark_report.json] [--compare old_report.json] [--max-samples 500]
+
+With `--check-exports`, it instead checks that the exported numpy models (see `model_trainer.export_all_models`)
+predict exactly like their pickled sklearn versions, on all the samples of the datasets. That needs sklearn:
+    python benchmark_models.py --check-exports [--max-samples 5000]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+from utilities.active_learning import low_confidence_capture
+from utilities.datasets import dataset_shards, held_out_mask, split_by_sample_shape
+from utilities.feature_extractors import (
+    extract_color_features,
+    extract_color_histograms_features,
+    extract_difference_of_histograms_features,
+)
+from utilities.model_registry import model_registry
+from utilities.models import (
+    NUMPY_MODEL_TYPES,
+    AmplifyCardPredictor,
+    CardMergePredictor,
+    CardSlotPredictor,
+    CardTypePredictor,
+    GroundCardPredictor,
+    HAMCardPredictor,
+    IModel,
+    ThorCardPredictor,
+    UnitTypePredictor,
+)
+
+# Repeats of the batched prediction, to average out the noise
+_BATCHED_REPEATS = 5
+
+
+@dataclass
+class PredictorBenchmark:
+    """How to evaluate a predictor"""
+
+    predictor: type[IModel]
+    dataset_pattern: str
+    # The predictor's own API, on a single sample
+    predict_one: Callable[[np.ndarray], object]
+    # Features of a batch of samples, for the batched predictions
+    extract_features: Callable[[np.ndarray], np.ndarray]
+
+
+def _histograms_of(predictor: type[IModel]) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda samples: extract_color_histograms_features(samples, bins=predictor.feature_bins)
+
+
+BENCHMARKS = [
+    PredictorBenchmark(
+        CardTypePredictor, "data/card_types*", CardTypePredictor.predict_card_type, _histograms_of(CardTypePredictor)
+    ),
+    PredictorBenchmark(
+        UnitTypePredictor, "data/unit_type*", UnitTypePredictor.predict_unit_type, _histograms_of(UnitTypePredictor)
+    ),
+    PredictorBenchmark(
+        CardMergePredictor,
+        "data/card_merges*",
+        lambda sample: CardMergePredictor.predict_card_merge(sample[0], sample[1]),
+        extract_difference_of_histograms_features,
+    ),
+    PredictorBenchmark(
+        AmplifyCardPredictor,
+        "data/amplify*",
+        AmplifyCardPredictor.is_amplify_card,
+        _histograms_of(AmplifyCardPredictor),
+    ),
+    PredictorBenchmark(
+        HAMCardPredictor, "data/ham_cards*", HAMCardPredictor.is_HAM_card, _histograms_of(HAMCardPredictor)
+    ),
+    PredictorBenchmark(
+        ThorCardPredictor, "data/thor_cards*", ThorCardPredictor.is_Thor_card, _histograms_of(ThorCardPredictor)
+    ),
+    PredictorBenchmark(
+        CardSlotPredictor,
+        "data/card_slots_data*",
+        lambda sample: CardSlotPredictor.predict_empty_slots(sample[np.newaxis])[0],
+        lambda samples: extract_color_features(samples, type="median"),
+    ),
+    PredictorBenchmark(
+        GroundCardPredictor,
+        "data/ground_data*",
+        GroundCardPredictor.is_ground_card,
+        _histograms_of(GroundCardPredictor),
+    ),
+]
+
+
+def load_held_out_samples(
+    dataset_pattern: str, max_samples: int, held_out_only: bool = True
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """The held-out samples of the datasets (or all of them), as (images, labels) batches of a single sample shape"""
+    batches = []
+    num_samples = 0
+    for shard in dataset_shards(dataset_pattern):
+        data, labels = shard.load(mmap=True)
+        mask = held_out_mask(shard, len(labels)) if held_out_only else np.ones(len(labels), dtype=bool)
+        start = 0
+        for data_part, labels_part in split_by_sample_shape(data, labels):
+            part_mask = mask[start : start + len(labels_part)]
+            start += len(labels_part)
+            if num_samples < max_samples and part_mask.any():
+                images = np.asarray(data_part[part_mask])[: max_samples - num_samples]
+                batches.append((images, labels_part[part_mask][: len(images)]))
+                num_samples += len(images)
+    return batches
+
+
+def _plain_label(label) -> int:
+    return label.value if isinstance(label, Enum) else int(label)
+
+
+def benchmark_predictor(benchmark: PredictorBenchmark, max_samples: int) -> dict:
+    predictor = benchmark.predictor
+    batches = load_held_out_samples(benchmark.dataset_pattern, max_samples)
+    if not batches:
+        return {"skipped": f"no held-out samples in '{benchmark.dataset_pattern}'"}
+
+    # Load time (up to the first prediction) and memory, from scratch
+    predictor.unload()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        predictor.warm_up()
+    except Exception as e:
+        tracemalloc.stop()
+        return {"skipped": f"couldn't load the model: {e}"}
+    load_time = time.perf_counter() - start_time
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Single samples, through the predictor's API, which the accuracy is measured on too
+    single_latencies = []
+    correct = 0
+    for images, labels in batches:
+        for image, label in zip(images, labels):
+            start_time = time.perf_counter()
+            prediction = benchmark.predict_one(image)
+            single_latencies.append(time.perf_counter() - start_time)
+            correct += _plain_label(prediction) == _plain_label(label)
+
+    # Whole batches, from the features extraction to the predictions
+    batched_time = 0.0
+    for _ in range(_BATCHED_REPEATS):
+        for images, _labels in batches:
+            start_time = time.perf_counter()
+            features = benchmark.extract_features(images)
+            if predictor.feature_transform_model is not None:
+                features = predictor.feature_transform_model.transform(features)
+            predictor.model.predict(features)
+            batched_time += time.perf_counter() - start_time
+
+    num_samples = len(single_latencies)
+    single_latencies_ms = np.array(single_latencies) * 1e3
+    accuracy = round(correct / num_samples, 4)
+    held_out_excluded = model_registry.entry(predictor.model_filename).held_out_excluded
+    if not held_out_excluded:
+        print(f"    {predictor.model_filename} was trained on the held-out samples too, its accuracy isn't meaningful")
+    return {
+        "predictor": predictor.__name__,
+        "version": predictor.model_version,
+        "model_type": type(predictor.model).__name__,
+        "dataset_pattern": benchmark.dataset_pattern,
+        "held_out_samples": num_samples,
+        "held_out_excluded": held_out_excluded,
+        "accuracy": accuracy if held_out_excluded else None,
+        "training_accuracy": None if held_out_excluded else accuracy,
+        "load_time_ms": round(load_time * 1e3, 2),
+        "memory_bytes": memory_bytes,
+        "single_latency_ms": {
+            "mean": round(float(single_latencies_ms.mean()), 4),
+            "p50": round(float(np.percentile(single_latencies_ms, 50)), 4),
+            "p95": round(float(np.percentile(single_latencies_ms, 95)), 4),
+        },
+        "batched_latency_per_sample_ms": round(batched_time * 1e3 / (_BATCHED_REPEATS * num_samples), 4),
+    }
+
+
+def _load_pickled_model(name: str):
+    import dill as pickle
+
+    with open(model_registry.entry(name).path, "rb") as model_file:
+        return pickle.load(model_file)
+
+
+def check_exported_model(benchmark: PredictorBenchmark, max_samples: int) -> dict:
+    """Compare the predictions of the exported numpy version of the predictor's model (and of its feature transforms)
+    with the ones of the pickled sklearn version, on all the samples of its datasets"""
+    predictor = benchmark.predictor
+    predictor.unload()
+    predictor.warm_up()
+    if not isinstance(predictor.model, tuple(NUMPY_MODEL_TYPES.values())):
+        return {"skipped": "the model isn't exported"}
+
+    transform_names = model_registry.entry(predictor.model_filename).transforms or tuple(
+        name for name in (predictor.feature_transform_model_filename,) if name is not None
+    )
+    sklearn_transforms = [_load_pickled_model(name) for name in transform_names]
+    sklearn_model = _load_pickled_model(predictor.model_filename)
+
+    num_samples = num_mismatches = 0
+    for images, _labels in load_held_out_samples(benchmark.dataset_pattern, max_samples, held_out_only=False):
+        features = benchmark.extract_features(images)
+        numpy_features = sklearn_features = features
+        if predictor.feature_transform_model is not None:
+            numpy_features = predictor.feature_transform_model.transform(features)
+        for transform_model in sklearn_transforms:
+            sklearn_features = transform_model.transform(sklearn_features)
+
+        numpy_predictions = [_plain_label(label) for label in predictor.model.predict(numpy_features)]
+        sklearn_predictions = [_plain_label(label) for label in sklearn_model.predict(sklearn_features)]
+        num_samples += len(images)
+        num_mismatches += sum(a != b for a, b in zip(numpy_predictions, sklearn_predictions))
+
+    if not num_samples:
+        return {"skipped": f"no samples in '{benchmark.dataset_pattern}'"}
+    return {"samples": num_samples, "mismatches": num_mismatches}
+
+
+def _accuracy_text(result: dict) -> str:
+    """The held-out accuracy, or 'n/a' for models trained on the held-out samples (or older reports without it)"""
+    return f"{result['accuracy']:.4f}" if result.get("accuracy") is not None else "n/a"
+
+
+def compare_reports(old_report: dict, new_report: dict):
+    """Print the changes of accuracy and latency between two reports"""
+    print(f"\n{'Model':32} {'Accuracy':>18} {'Single (ms)':>20} {'Batched (ms)':>20}")
+    for name, new in new_report["models"].items():
+        old = old_report["models"].get(name, {})
+        if not old or "skipped" in new or "skipped" in old:
+            continue
+        print(
+            f"{name:32} {_accuracy_text(old):>8} -> {_accuracy_text(new):>6}"
+            f" {old['single_latency_ms']['mean']:8.3f} -> {new['single_latency_ms']['mean']:8.3f}"
+            f" {old['batched_latency_per_sample_ms']:8.3f} -> {new['batched_latency_per_sample_ms']:8.3f}"
+        )
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, default="benchmark_report.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", type=str, default=None, help="Previous report to compare against")
+    parser.add_argument("--max-samples", type=int, default=500, help="Maximum held-out samples per model")
+    parser.add_argument(
+        "--check-exports", action="store_true", help="Check that the numpy models predict like the sklearn ones"
+    )
+    args = parser.parse_args()
+
+    # Don't queue the datasets' own samples for labeling
+    low_confidence_capture.suspended = True
+
+    if args.check_exports:
+        all_match = True
+        for benchmark in BENCHMARKS:
+            result = check_exported_model(benchmark, args.max_samples)
+            all_match &= result.get("mismatches", 0) == 0
+            print(f"{benchmark.predictor.model_filename}: {result}")
+        sys.exit(0 if all_match else 1)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "models": {},
+    }
+    for benchmark in BENCHMARKS:
+        print(f"Benchmarking {benchmark.predictor.__name__}...")
+        result = benchmark_predictor(benchmark, args.max_samples)
+        report["models"][benchmark.predictor.model_filename] = result
+        print(f"    {result}")
+
+    with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Report saved in '{args.output}'")
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+
+    main()
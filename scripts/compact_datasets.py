@@ -0,0 +1,176 @@
+"""Remove the near-duplicate samples of the datasets in 'data/', and flag the near-duplicates with different labels.
+
+The datasets collected across sessions (`card_types_data_0`, `card_types_data_1`, ...) are compacted together into a
+single dataset per name, in 'data/compacted/'. Samples are compared by their perceptual hashes (see
+`utilities.feature_extractors.perceptual_hash`), and only the first one of each group of near-duplicates with the same
+label is kept. Near-duplicates with different labels are all kept, but listed in the manifest (as pairs of sample
+indices) and printed, so they can be checked by hand.
+
+With `--replace`, the original datasets are moved to 'data/uncompacted/' and the compacted ones take their place. The
+legacy files left behind by `migrate_datasets.py` are moved there too, since otherwise they'd be loaded again.
+Run it from the `scripts/` directory:
+    python compact_datasets.py [--pattern "data/card_types*"] [--max-distance 5] [--replace]
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+from collections import defaultdict
+from enum import Enum
+
+import numpy as np
+from utilities.active_learning import NEAR_DUPLICATE_HASH_DISTANCE
+from utilities.datasets import (
+    LEGACY_DATASET_EXTENSION,
+    dataset_shards,
+    is_dataset_directory,
+    next_dataset_directory,
+    split_by_sample_shape,
+    write_dataset,
+)
+from utilities.feature_extractors import hash_distance, perceptual_hash
+
+COMPACTED_DIR = os.path.join("data", "compacted")
+UNCOMPACTED_DIR = os.path.join("data", "uncompacted")
+
+
+def dataset_name(path: str) -> str:
+    """Name shared by all the datasets of the same kind, e.g. 'data/card_types_data_3.npy' -> 'card_types_data'"""
+    name = os.path.basename(path)
+    if name.endswith(LEGACY_DATASET_EXTENSION):
+        name = name[: -len(LEGACY_DATASET_EXTENSION)]
+    return re.sub(r"_\d+$", "", name)
+
+
+def find_datasets(glob_pattern: str) -> dict[str, list[str]]:
+    """Paths of the datasets matching the pattern, by name"""
+    datasets = defaultdict(list)
+    for path in sorted(glob.glob(glob_pattern)):
+        # Only count each dataset once, in its newest format
+        if is_dataset_directory(path) or (
+            path.endswith(LEGACY_DATASET_EXTENSION) and not is_dataset_directory(path[: -len(LEGACY_DATASET_EXTENSION)])
+        ):
+            datasets[dataset_name(path)].append(path)
+    return dict(datasets)
+
+
+def files_to_replace(dataset_paths: list[str]) -> list[str]:
+    """The datasets, and the legacy files they were migrated from (if still there), which they hide from
+    `dataset_shards` as long as they exist"""
+    paths = []
+    for path in dataset_paths:
+        paths.append(path)
+        if is_dataset_directory(path) and os.path.exists(path + LEGACY_DATASET_EXTENSION):
+            paths.append(path + LEGACY_DATASET_EXTENSION)
+    return paths
+
+
+def compact_samples(dataset_paths: list[str], max_distance: int):
+    """Keep the first sample of each group of near-duplicates with the same label.
+    Returns the kept samples and labels, the number of samples read, and the pairs of kept samples that are
+    near-duplicates but have different labels"""
+    kept_samples, kept_labels = [], []
+    # Hashes of the kept samples, by sample shape, as (hash, index of the sample in `kept_samples`)
+    kept_hashes: dict[tuple, list[tuple[int, int]]] = defaultdict(list)
+    label_conflicts = []
+    num_samples = 0
+
+    for path in dataset_paths:
+        for shard in dataset_shards(path):
+            data, labels = shard.load(mmap=True)
+            for data_part, labels_part in split_by_sample_shape(data, labels):
+                shape_hashes = kept_hashes[data_part.shape[1:]]
+                for sample, label in zip(data_part, labels_part):
+                    num_samples += 1
+                    sample_hash = perceptual_hash(np.asarray(sample))
+                    near_duplicates = [
+                        i for kept_hash, i in shape_hashes if hash_distance(sample_hash, kept_hash) <= max_distance
+                    ]
+                    if any(kept_labels[i] == label for i in near_duplicates):
+                        continue
+
+                    index = len(kept_samples)
+                    label_conflicts.extend((i, index) for i in near_duplicates)
+                    kept_samples.append(np.asarray(sample))
+                    kept_labels.append(label)
+                    shape_hashes.append((sample_hash, index))
+
+    return kept_samples, kept_labels, num_samples, label_conflicts
+
+
+def group_samples_by_shape(samples: list[np.ndarray]) -> np.ndarray | list[np.ndarray]:
+    """Stack the samples, in one array per shape if they don't all have the same (as `write_dataset` expects)"""
+    shapes = list(dict.fromkeys(sample.shape for sample in samples))
+    if len(shapes) == 1:
+        return np.stack(samples, axis=0)
+    return [np.stack([sample for sample in samples if sample.shape == shape], axis=0) for shape in shapes]
+
+
+def compact_dataset(name: str, dataset_paths: list[str], max_distance: int, replace: bool):
+    samples, labels, num_samples, label_conflicts = compact_samples(dataset_paths, max_distance)
+    if not samples:
+        print(f"'{name}' has no samples, skipping it")
+        return
+
+    # `write_dataset` groups the samples by shape, so put them in that order first, for the conflicts to match
+    shapes = list(dict.fromkeys(sample.shape for sample in samples))
+    order = sorted(range(len(samples)), key=lambda i: shapes.index(samples[i].shape))
+    new_index = {old: new for new, old in enumerate(order)}
+    samples = [samples[i] for i in order]
+    labels = np.array([labels[i] for i in order], dtype=object if isinstance(labels[0], Enum) else None)
+    label_conflicts = [(new_index[i], new_index[j]) for i, j in label_conflicts]
+
+    os.makedirs(COMPACTED_DIR, exist_ok=True)
+    compacted_dir = next_dataset_directory(name, data_dir=COMPACTED_DIR)
+    write_dataset(
+        compacted_dir,
+        group_samples_by_shape(samples),
+        labels,
+        source="compact_datasets",
+        metadata={
+            "compacted_from": [os.path.basename(path) for path in dataset_paths],
+            "max_hash_distance": max_distance,
+            "label_conflicts": [list(pair) for pair in label_conflicts],
+        },
+    )
+    print(
+        f"'{name}': {num_samples} -> {len(samples)} samples ({num_samples - len(samples)} near-duplicates removed, "
+        f"{len(label_conflicts)} label conflicts) in {compacted_dir}"
+    )
+    for i, j in label_conflicts:
+        print(f"    Samples {i} and {j} look the same, but are labeled {labels[i]} and {labels[j]}")
+
+    if replace:
+        os.makedirs(UNCOMPACTED_DIR, exist_ok=True)
+        for path in files_to_replace(dataset_paths):
+            shutil.move(path, os.path.join(UNCOMPACTED_DIR, os.path.basename(path)))
+        replaced_dir = next_dataset_directory(name)
+        shutil.move(compacted_dir, replaced_dir)
+        print(f"    Moved the originals to {UNCOMPACTED_DIR}, and the compacted dataset to {replaced_dir}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pattern", type=str, default="data/*", help="Datasets to compact")
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=NEAR_DUPLICATE_HASH_DISTANCE,
+        help="Samples whose perceptual hashes differ in this many bits or fewer are near-duplicates",
+    )
+    parser.add_argument("--replace", action="store_true", help="Replace the original datasets with the compacted ones")
+    args = parser.parse_args()
+
+    datasets = find_datasets(args.pattern)
+    if not datasets:
+        print(f"No datasets match '{args.pattern}'")
+    for name, dataset_paths in datasets.items():
+        compact_dataset(name, dataset_paths, args.max_distance, args.replace)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -1,11 +1,10 @@
 import abc
 import argparse
-import os
 
 import cv2
-import dill as pickle
 import numpy as np
 from utilities.card_data import CardTypes
+from utilities.datasets import next_dataset_directory, write_dataset
 from utilities.feature_extractors import (
     extract_color_features,
     extract_color_histograms_features,
@@ -305,26 +304,16 @@ class UnitTypeDataCollector(DataCollector):
         return data, labels
 
 
-def save_data(dataset: np.ndarray, all_labels: np.ndarray, filename: str):
-    """Creates a dictionary with the data and saves it under 'data/'"""
+def save_data(dataset: np.ndarray, all_labels: np.ndarray, filename: str, source: str = "data_collection"):
+    """Saves the data as a new dataset under 'data/'"""
 
-    data_dict = {"data": dataset, "labels": all_labels}
+    dataset_dir = next_dataset_directory(filename)
 
-    i = 0
-    filepath = os.path.join("data", f"{filename}_{i}")
-    while os.path.exists(f"{filepath}.npy"):
-        idx = int(filepath.split("_")[-1]) + 1
-        filepath = filepath.replace(str(i), str(idx))
-        i += 1
-
-    # Append the numpy extension
-    filepath += ".npy"
     # Save the dataset
-    save = input(f"About to save dataset in {filepath}, continue? (Y/n) ")
+    save = input(f"About to save dataset in {dataset_dir}, continue? (Y/n) ")
     if not save or "y" in save.lower():
-        with open(filepath, "wb") as pfile:
-            pickle.dump(data_dict, pfile)
-            print(f"New dataset saved in {filepath}")
+        write_dataset(dataset_dir, dataset, all_labels, source=source)
+        print(f"New dataset saved in {dataset_dir}")
     else:
         print("Not saving dataset!")
 
@@ -335,7 +324,7 @@ def collect_data(CollectorClass: DataCollector, filename: str, num_units=4):
     data_collector: DataCollector = CollectorClass()
     dataset, all_labels = data_collector.collect_data(num_units=num_units)
     print("All labels:\n", all_labels)
-    save_data(dataset, all_labels, filename=filename)
+    save_data(dataset, all_labels, filename=filename, source=CollectorClass.__name__)
 
 
 def main():
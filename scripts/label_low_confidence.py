@@ -0,0 +1,136 @@
+"""Review the samples that the models weren't confident about while farming (see `utilities/active_learning.py`), and
+move them to the training datasets with the right labels.
+
+Each queued batch is shown as a grid of numbered samples with their predicted labels, which can be accepted as they
+are or corrected in bulk. Run it from the `scripts/` directory:
+    python label_low_confidence.py [--dataset card_types_data] [--list]
+"""
+
+import argparse
+import os
+import shutil
+
+import cv2
+import numpy as np
+from utilities.active_learning import queued_batches
+from utilities.datasets import LABEL_ENUMS, load_dataset, next_dataset_directory, read_dataset_manifest, write_dataset
+
+TILE_HEIGHT = 96
+TILES_PER_ROW = 8
+
+
+def make_montage(samples: np.ndarray) -> np.ndarray:
+    """All the samples in a grid, numbered. Card pairs are shown side by side"""
+    tiles = []
+    for i, sample in enumerate(samples):
+        if sample.ndim == 4:
+            sample = np.concatenate(list(sample), axis=1)
+        tile = cv2.resize(sample, (max(1, sample.shape[1] * TILE_HEIGHT // sample.shape[0]), TILE_HEIGHT))
+        cv2.putText(tile, str(i), (3, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        tiles.append(tile)
+
+    tile_width = max(tile.shape[1] for tile in tiles)
+    tiles = [cv2.copyMakeBorder(tile, 2, 2, 2, tile_width - tile.shape[1] + 2, cv2.BORDER_CONSTANT) for tile in tiles]
+    tiles += [np.zeros_like(tiles[0])] * (-len(tiles) % TILES_PER_ROW)
+    rows = [np.concatenate(tiles[i : i + TILES_PER_ROW], axis=1) for i in range(0, len(tiles), TILES_PER_ROW)]
+    return np.concatenate(rows, axis=0)
+
+
+def parse_label(text: str, label_enum: str | None):
+    """A label typed by the user: the name or value of an enum member, or an integer"""
+    if label_enum is None:
+        return int(text)
+    enum = LABEL_ENUMS[label_enum]
+    return enum(int(text)) if text.isdigit() else enum[text.upper()]
+
+
+def format_label(label) -> str:
+    return label.name if hasattr(label, "name") else str(label)
+
+
+def review_batch(batch_dir: str) -> bool:
+    """Review one batch, and save it to the datasets if accepted. Returns False if the user wants to stop"""
+    dataset_name = os.path.basename(os.path.dirname(batch_dir))
+    manifest = read_dataset_manifest(batch_dir)
+    label_enum = manifest.get("label_enum")
+    confidences = manifest.get("metadata", {}).get("confidences", [])
+    samples, labels = load_dataset(batch_dir)
+    labels = list(labels)
+    kept = set(range(len(samples)))
+
+    print(f"\n{batch_dir}: {len(samples)} samples for '{dataset_name}'")
+    if label_enum is not None:
+        print("Labels: " + ", ".join(f"{member.value}={member.name}" for member in LABEL_ENUMS[label_enum]))
+    cv2.imshow(dataset_name, make_montage(samples))
+    cv2.waitKey(1)
+
+    try:
+        while True:
+            for i in sorted(kept):
+                confidence = f" (confidence {confidences[i]:.2f})" if i < len(confidences) else ""
+                print(f"  {i:3d}: {format_label(labels[i])}{confidence}")
+
+            command = input(
+                "Corrections as 'index=label ...', 'd index ...' to drop samples, "
+                "Enter to accept, 's' to skip the batch, 'q' to quit: "
+            ).strip()
+            if not command:
+                break
+            if command.lower() == "s":
+                return True
+            if command.lower() == "q":
+                return False
+
+            try:
+                if command.lower().startswith("d "):
+                    kept -= {int(index) for index in command[2:].split()}
+                    continue
+                for correction in command.split():
+                    index, label = correction.split("=")
+                    labels[int(index)] = parse_label(label, label_enum)
+            except (ValueError, KeyError, IndexError) as e:
+                print(f"Couldn't understand '{command}': {e}")
+    finally:
+        cv2.destroyAllWindows()
+
+    if kept:
+        indices = sorted(kept)
+        dataset_dir = next_dataset_directory(dataset_name)
+        write_dataset(
+            dataset_dir,
+            samples[indices],
+            np.array([labels[i] for i in indices], dtype=object if label_enum is not None else None),
+            source="label_low_confidence",
+        )
+        print(f"Saved {len(indices)} samples in {dataset_dir}")
+    shutil.rmtree(batch_dir)
+    return True
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", type=str, default=None, help="Only review this dataset, e.g. 'card_types_data'")
+    parser.add_argument("--list", action="store_true", help="Only print how many batches are waiting per dataset")
+    args = parser.parse_args()
+
+    batches = queued_batches(args.dataset)
+    if args.list or not batches:
+        counts = {}
+        for batch_dir in batches:
+            dataset_name = os.path.basename(os.path.dirname(batch_dir))
+            counts[dataset_name] = counts.get(dataset_name, 0) + 1
+        for dataset_name, count in sorted(counts.items()):
+            print(f"{dataset_name}: {count} batches")
+        if not batches:
+            print("No samples waiting for labels")
+        return
+
+    for batch_dir in batches:
+        if not review_batch(batch_dir):
+            break
+
+
+if __name__ == "__main__":
+
+    main()
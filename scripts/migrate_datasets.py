@@ -0,0 +1,37 @@
+"""Convert the legacy dill-pickled datasets in 'data/' to dataset directories (see `utilities/datasets.py`).
+
+Run it from the `scripts/` directory:
+    python migrate_datasets.py [--pattern "data/card_types*"] [--remove-legacy]
+"""
+
+import argparse
+import glob
+
+from utilities.datasets import LEGACY_DATASET_EXTENSION, is_dataset_directory, migrate_legacy_dataset
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--pattern", type=str, default=f"data/*{LEGACY_DATASET_EXTENSION}", help="Legacy dataset files to migrate"
+    )
+    parser.add_argument(
+        "--remove-legacy", action="store_true", help="Delete each legacy file once its migration is verified"
+    )
+    args = parser.parse_args()
+
+    for filepath in sorted(glob.glob(args.pattern)):
+        if not filepath.endswith(LEGACY_DATASET_EXTENSION):
+            continue
+        if is_dataset_directory(filepath[: -len(LEGACY_DATASET_EXTENSION)]):
+            print(f"Skipping {filepath}, it's already migrated")
+            continue
+
+        dataset_dir = migrate_legacy_dataset(filepath, remove_legacy=args.remove_legacy)
+        print(f"Migrated {filepath} -> {dataset_dir}")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -1,120 +1,58 @@
+import glob
 import os
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable
 
 import dill as pickle
 import numpy as np
+from sklearn.base import clone
 from sklearn.decomposition import PCA
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
 from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.svm import SVC
 from utilities.card_data import CardTypes
+from utilities.datasets import dataset_shards
 from utilities.feature_extractors import (
     extract_color_features,
     extract_color_histograms_features,
     extract_difference_of_histograms_features,
 )
-from utilities.utilities import display_image, load_dataset, save_model
-
-
-def load_card_type_features() -> list[np.ndarray]:
-    """Load all available data inside the 'data/' directory"""
-
-    dataset, all_labels = load_dataset("data/card_types*")
-
-    # Load the features
-    # card_features = extract_color_features(images=dataset, type="median")
-    card_features = extract_color_histograms_features(images=dataset, bins=(4, 4, 4))
-
-    return card_features, all_labels
+from utilities.feature_cache import load_cached_features
+from utilities.model_registry import MANIFEST_FILENAME, dataset_hash, model_registry
+from utilities.models import (
+    NUMPY_MODEL_EXTENSION,
+    NumpyKNN,
+    NumpyLogisticRegression,
+    NumpyPCA,
+    NumpyRBFSVC,
+    NumpyStandardScaler,
+)
+from utilities.utilities import display_image, save_model
 
 
 def load_card_merges_features() -> list[np.ndarray]:
     """Load all available data corresponding to card merges, and extract their features"""
 
-    dataset, all_labels = load_dataset("data/card_merges*")
-
-    # Extract all the features from `dataset`, now of shape (batch, 2, height, width, 3)
-    features = extract_difference_of_histograms_features(dataset)
-
-    return features, all_labels
-
-
-def load_card_slots_features() -> list[np.ndarray]:
-    """Load the dataset corresponding to identifying empty and filled card slots"""
-    dataset, all_labels = load_dataset("data/card_slots_data*")
+    # Extract all the features from the dataset, of shape (batch, 2, height, width, 3)
+    features, all_labels = load_cached_features(
+        "data/card_merges*", extract_difference_of_histograms_features, split="train"
+    )
 
-    # Extract the features
-    features = extract_color_features(images=dataset, type="median")
     return features, all_labels
 
 
 def load_entire_slot_space_features() -> list[np.ndarray]:
-    dataset, all_labels = load_dataset("data/entire_slot_space_data*")
-
     # Extract the features -- TODO: For this case, we may need a new different set of features
-    features = extract_color_features(images=dataset, type="median")
+    features, all_labels = load_cached_features("data/entire_slot_space_data*", extract_color_features, type="median")
     return features, all_labels
 
 
-def load_amplify_cards_features() -> list[np.ndarray]:
-    """Load the amplify card dataset and extract its features"""
-    dataset, all_labels = load_dataset("data/amplify*")
-
-    # Extract the features
-    features = extract_color_histograms_features(images=dataset, bins=(8, 8, 8))
-
-    return features, all_labels
-
-
-def load_HAM_cards_features() -> list[np.ndarray]:
-    """Load all the high-hitting dataset"""
-    dataset, all_labels = load_dataset("data/ham_cards*")
-
-    # Extract the features
-    features = extract_color_histograms_features(images=dataset, bins=(8, 8, 8))
-
-    return features, all_labels
-
-
-def load_thor_cards_features() -> list[np.ndarray]:
-    """Load all the high-hitting dataset"""
-    dataset, all_labels = load_dataset("data/thor_cards*")
-
-    # Extract the features
-    features = extract_color_histograms_features(images=dataset, bins=(8, 8, 8))
-
-    return features, all_labels
-
-
-def load_ground_cards_features_raw() -> list[np.ndarray]:
-    """Load raw histogram features for GROUND/NO GROUND card slots, without PCA"""
-    dataset, all_labels = load_dataset("data/ground_data*")
-
-    features = extract_color_histograms_features(images=dataset, bins=(8, 8, 8))
-
-    return features, all_labels
-
-
-def apply_pca_transform(features: np.ndarray, n_components: int) -> tuple[np.ndarray, PCA]:
-    """Fit a PCA model and return the reduced features plus the fitted transform."""
-
-    pca_model = PCA(n_components=n_components)
-    features_reduced = pca_model.fit_transform(features)
-
-    return features_reduced, pca_model
-
-
-def load_unit_type_features() -> list[np.ndarray]:
-    """We'll use the same features as the card types"""
-    dataset, all_labels = load_dataset("data/unit_type*")
-
-    card_features = extract_color_histograms_features(images=dataset, bins=(4, 4, 4))
-
-    return card_features, all_labels
-
-
 def explore_features(features, labels: list[CardTypes], label_type: CardTypes):
     """Explore the features for specific labels, for debugging..."""
 
@@ -124,57 +62,145 @@ def explore_features(features, labels: list[CardTypes], label_type: CardTypes):
     print(features[labels_int == label_type.value])
 
 
-def train_knn(X: np.ndarray, labels: np.ndarray[CardTypes], k: int = 3) -> KNeighborsClassifier:
-    """Train a K-NN classifier on the card types"""
-
-    # Train the model till we get a good enough one
-    acc = 0
-    num_trials = 0
-    print("Training K-NN model...")
-    while acc < 0.99 and num_trials < 20:
-        # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, stratify=labels)
-        # Create the K-NN model
-        knn = KNeighborsClassifier(n_neighbors=k)
-        # Train the model
-        knn.fit(X_train, y_train)
-        # Test the model
-        _, acc = test_model(knn, X_test, y_test)
-
-        # Increment the number of trials...
-        num_trials += 1
-
-    print(f"Found a model after {num_trials} trial(s).")
-
-    # After validating that we have enough data, fit all the data into the model
-    knn.fit(X, labels)
-
-    return knn
-
-
-def train_svm_classifier(X: np.ndarray, labels: np.ndarray) -> SVC:
-    """Train a Support Vector Machine classifier"""
-
-    # Train the model till we get a good enough one
-    acc = 0
-    num_trials = 0
-    print("Training SVM model...")
-    while acc < 0.995 and num_trials < 20:
-        # Split the data into training and testing sets
-        X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, stratify=labels)
-
-        # Create and train the SVM model with RBF kernel
-        svm_model = SVC(kernel="rbf")
-        svm_model.fit(X_train, y_train)
-
-        # Test the model
-        _, acc = test_model(svm_model, X_test, y_test)
-
-        # Increment the number of trials
-        num_trials += 1
+# Candidate hyperparameters of the searches, as `GridSearchCV` grids of the "classifier" step
+KNN_PARAM_GRID = {"classifier__n_neighbors": [1, 3, 5, 7, 9]}
+SVM_PARAM_GRID = {"classifier__C": [0.1, 1, 10, 100], "classifier__gamma": ["scale", 0.01, 0.1, 1]}
+HISTOGRAM_BINS_CANDIDATES = ((4, 4, 4), (8, 8, 8))
+# Single-sample predictions timed for the latency of every candidate
+LATENCY_SAMPLES = 50
+
+
+@dataclass
+class SearchCandidate:
+    """Cross-validated results of one combination of hyperparameters"""
+
+    params: dict
+    bins: tuple[int, int, int] | None
+    accuracy: float
+    accuracy_std: float
+    fit_time: float
+    # Median time of predicting a single sample, as the farmers do, including the PCA transform if any
+    latency_per_sample: float
+
+
+def measure_latency_per_sample(pipeline: Pipeline, X: np.ndarray, num_samples: int = LATENCY_SAMPLES) -> float:
+    """Median time of predicting one sample at a time with a fitted pipeline"""
+    samples = X[np.linspace(0, len(X) - 1, min(num_samples, len(X))).astype(int)]
+    # Warm up
+    pipeline.predict(samples[:1])
+    latencies = []
+    for sample in samples:
+        start_time = time.perf_counter()
+        pipeline.predict(sample[None])
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.median(latencies))
+
+
+def search_hyperparameters(
+    X: np.ndarray,
+    labels: np.ndarray,
+    classifier: KNeighborsClassifier | SVC,
+    param_grid: dict,
+    pca_components: tuple[int, ...] = (),
+    cv_folds: int = 5,
+) -> tuple[Pipeline, list[SearchCandidate]]:
+    """Cross-validated grid search of the classifier (and of the PCA before it, if `pca_components` are given),
+    running the candidates in parallel processes across all cores. Returns the best pipeline, refit on all the data,
+    and the results of every candidate. Their latencies are timed on copies refit on all the data, one sample at a time.
+    """
 
-    print(f"Found a good SVM model after {num_trials} trial(s).")
-    return svm_model
+    if pca_components:
+        pipeline = Pipeline([("pca", PCA()), ("classifier", classifier)])
+        param_grid = {**param_grid, "pca__n_components": list(pca_components)}
+    else:
+        pipeline = Pipeline([("classifier", classifier)])
+
+    search = GridSearchCV(
+        pipeline,
+        param_grid,
+        scoring="accuracy",
+        cv=StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=0),
+        n_jobs=-1,
+        refit=True,
+    )
+    search.fit(X, labels)
+
+    results = search.cv_results_
+    candidates = [
+        SearchCandidate(
+            params={name.split("__")[-1]: value for name, value in params.items()},
+            bins=None,
+            accuracy=results["mean_test_score"][i],
+            accuracy_std=results["std_test_score"][i],
+            fit_time=results["mean_fit_time"][i],
+            latency_per_sample=measure_latency_per_sample(clone(pipeline).set_params(**params).fit(X, labels), X),
+        )
+        for i, params in enumerate(results["params"])
+    ]
+    return search.best_estimator_, candidates
+
+
+def print_search_report(candidates: list[SearchCandidate], top: int = 15):
+    """Print the speed/accuracy trade-off of the best candidates"""
+    print(f"{'Accuracy':>17} {'Fit (s)':>8} {'Latency (us)':>13}  Bins        Parameters")
+    for candidate in sorted(candidates, key=lambda c: (-c.accuracy, c.latency_per_sample))[:top]:
+        print(
+            f"{candidate.accuracy * 100:8.2f}% ± {candidate.accuracy_std * 100:5.2f}"
+            f" {candidate.fit_time:8.3f} {candidate.latency_per_sample * 1e6:13.1f}"
+            f"  {str(candidate.bins):10}  {candidate.params}"
+        )
+
+
+def search_and_register_model(
+    name: str,
+    dataset_pattern: str,
+    feature_extractor: Callable,
+    classifier: KNeighborsClassifier | SVC,
+    param_grid: dict,
+    bins_candidates: tuple[tuple[int, int, int], ...] = (),
+    pca_name: str | None = None,
+    pca_components: tuple[int, ...] = (),
+    **extractor_params,
+):
+    """Search the best hyperparameters (including the histogram bins and PCA components, if given) of a model,
+    report all candidates and register the best one. Ties in accuracy go to the fastest candidate."""
+
+    best_pipeline, best_candidate, all_candidates = None, None, []
+    for bins in bins_candidates or (None,):
+        bins_params = {"bins": bins} if bins is not None else {}
+        X, labels = load_cached_features(
+            dataset_pattern, feature_extractor, split="train", **bins_params, **extractor_params
+        )
+        # The exported models only hold plain labels
+        labels = np.array([label.value if isinstance(label, Enum) else label for label in labels])
+
+        print(f"Searching {name} hyperparameters" + (f" with {bins} bins" if bins else "") + "...")
+        pipeline, candidates = search_hyperparameters(X, labels, clone(classifier), param_grid, pca_components)
+        for candidate in candidates:
+            candidate.bins = bins
+        all_candidates.extend(candidates)
+
+        best_of_bins = max(candidates, key=lambda c: (c.accuracy, -c.latency_per_sample))
+        if best_candidate is None or (best_of_bins.accuracy, -best_of_bins.latency_per_sample) > (
+            best_candidate.accuracy,
+            -best_candidate.latency_per_sample,
+        ):
+            best_pipeline, best_candidate = pipeline, best_of_bins
+
+    print_search_report(all_candidates)
+    print(f"Best {name}: {best_candidate}")
+
+    features_info = {
+        "dataset_pattern": dataset_pattern,
+        "feature_extractor": feature_extractor,
+        "bins": best_candidate.bins,
+    }
+    transforms = ()
+    if pca_components:
+        # The transform first, since farmers reload it when the model changes
+        register_trained_model(best_pipeline.named_steps["pca"], pca_name, **features_info)
+        transforms = (pca_name,)
+    register_trained_model(best_pipeline.named_steps["classifier"], name, transforms=transforms, **features_info)
 
 
 def train_logistic_regressor(X: np.ndarray, labels: np.ndarray) -> LogisticRegression:
@@ -218,23 +244,6 @@ def train_logistic_regressor_with_scaling(
     return logistic_regressor, scaler
 
 
-def train_svc_classifier_raw(X: np.ndarray, labels: np.ndarray) -> SVC:
-    """Train an SVC directly on the raw extracted features"""
-
-    X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, stratify=labels)
-
-    svc_model = SVC(kernel="rbf")
-    svc_model.fit(X_train, y_train)
-
-    test_model(svc_model, X_test, y_test)
-
-    svc_model.fit(X, labels)
-    print("Train accuracy on full refitted dataset:")
-    test_model(svc_model, X, labels)
-
-    return svc_model
-
-
 def test_model(model: KNeighborsClassifier | LogisticRegression | SVC, X_test: np.ndarray, y_test: np.ndarray):
     """Test a generic pre-trained model.
 
@@ -274,18 +283,135 @@ def test_card_types_model(knn_model: KNeighborsClassifier | LogisticRegression,
             print(f"Actual: {actual.name}, Predicted: {predicted.name}, Features: {X_test[i]}")
 
 
-def train_card_types_model():
-    """Train a K-NN model to distinguis between card types"""
-    features, labels = load_card_type_features()
+def _export_labels(classes: np.ndarray) -> np.ndarray:
+    """Class labels as plain numbers, since the exported models can't hold Python objects like enums"""
+    if classes.dtype == object:
+        return np.array([label.value if isinstance(label, Enum) else label for label in classes])
+    return classes
+
+
+def model_to_arrays(model: KNeighborsClassifier | LogisticRegression | SVC | PCA | StandardScaler) -> dict:
+    """Extract the numbers the numpy runtime in `utilities.models` needs to reproduce the model's predictions"""
+
+    if isinstance(model, SVC):
+        if model.kernel != "rbf":
+            raise ValueError(f"Only RBF SVCs can be exported, not '{model.kernel}' ones")
+        return {
+            "kind": NumpyRBFSVC.kind,
+            "support_vectors": model.support_vectors_,
+            # The raw libsvm coefficients/intercepts, since sklearn flips the sign of the public ones for 2 classes
+            "dual_coef": model._dual_coef_,
+            "intercept": model._intercept_,
+            "n_support": model.n_support_,
+            "gamma": model._gamma,
+            "classes": _export_labels(model.classes_),
+        }
+
+    if isinstance(model, KNeighborsClassifier):
+        if model.weights != "uniform" or model.effective_metric_ != "euclidean":
+            raise ValueError("Only K-NNs with uniform weights and euclidean distances can be exported")
+        return {
+            "kind": NumpyKNN.kind,
+            "fit_X": model._fit_X,
+            "fit_y": model._y,
+            "n_neighbors": model.n_neighbors,
+            "classes": _export_labels(model.classes_),
+        }
+
+    if isinstance(model, LogisticRegression):
+        return {
+            "kind": NumpyLogisticRegression.kind,
+            "coef": model.coef_,
+            "intercept": model.intercept_,
+            "classes": _export_labels(model.classes_),
+        }
+
+    if isinstance(model, PCA):
+        scale = np.sqrt(model.explained_variance_) if model.whiten else np.ones(model.n_components_)
+        return {"kind": NumpyPCA.kind, "components": model.components_, "mean": model.mean_, "scale": scale}
+
+    if isinstance(model, StandardScaler):
+        num_features = model.n_features_in_
+        mean = model.mean_ if model.mean_ is not None else np.zeros(num_features)
+        scale = model.scale_ if model.scale_ is not None else np.ones(num_features)
+        return {"kind": NumpyStandardScaler.kind, "mean": mean, "scale": scale}
+
+    raise ValueError(f"Can't export models of type {type(model).__name__}")
+
+
+def export_model(model: KNeighborsClassifier | LogisticRegression | SVC | PCA | StandardScaler, filename: str):
+    """Save the numeric version of the model next to the pickled one, to be loaded without sklearn"""
+    model_path = os.path.join("models", filename + NUMPY_MODEL_EXTENSION)
+    np.savez(model_path, **model_to_arrays(model))
+    print(f"Model exported to '{model_path}'")
+
+
+def export_all_models():
+    """Export all the pickled models inside 'models/', e.g. after pulling models trained somewhere else"""
+    for model_path in sorted(glob.glob(os.path.join("models", "*"))):
+        if model_path.endswith(NUMPY_MODEL_EXTENSION) or os.path.basename(model_path) == MANIFEST_FILENAME:
+            continue
+        with open(model_path, "rb") as model_file:
+            model = pickle.load(model_file)
+        try:
+            export_model(model, filename=os.path.basename(model_path))
+        except ValueError as e:
+            print(f"Skipping '{model_path}': {e}")
+
+
+def register_trained_model(
+    model: KNeighborsClassifier | LogisticRegression | SVC | PCA | StandardScaler,
+    name: str,
+    dataset_pattern: str,
+    feature_extractor: Callable,
+    bins: tuple[int, int, int] | None = None,
+    transforms: tuple[str, ...] = (),
+    held_out_excluded: bool = True,
+):
+    """Save a new version of the model (pickled, and its numeric version for the farmers) and register it in the
+    manifest, so that running farmers swap to it. `held_out_excluded` tells whether it was trained on the "train"
+    split only, as the training functions here do.
+    NOTE: Register the transforms before the model that uses them, farmers reload them when the model changes.
+    """
+    version = model_registry.next_version(name)
+    filename = model_registry.versioned_filename(name, version)
+    save_model(model, filename=filename)
+    filenames = [filename]
+    try:
+        export_model(model, filename=filename)
+        filenames.append(filename + NUMPY_MODEL_EXTENSION)
+    except ValueError as e:
+        print(f"Not exporting '{filename}': {e}")
+
+    model_registry.register(
+        name,
+        version,
+        filenames,
+        feature_extractor=feature_extractor.__name__,
+        bins=bins,
+        transforms=transforms,
+        held_out_excluded=held_out_excluded,
+        training_dataset_hash=dataset_hash(
+            [
+                path
+                for shard in dataset_shards(dataset_pattern)
+                for path in (shard.images_path, shard.labels_path)
+                if path
+            ]
+        ),
+    )
 
-    # Extract the labels fvalues
-    labels_values = [label.value for label in labels]
-    # knn_model = train_knn(X=features, labels=labels_values, k=3)
-    svm_model = train_svm_classifier(X=features, labels=labels_values)  # DOESN'T WORK WELL
 
-    ## Save the trained model
-    # save_model(knn_model, filename="card_type_predictor.knn")
-    save_model(svm_model, filename="card_type_predictor.svm")
+def train_card_types_model():
+    """Train a model to distinguish between card types"""
+    search_and_register_model(
+        "card_type_predictor.svm",
+        dataset_pattern="data/card_types*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=SVC(kernel="rbf"),
+        param_grid=SVM_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+    )
 
 
 def train_card_merges_model():
@@ -293,45 +419,66 @@ def train_card_merges_model():
 
     features, labels = load_card_merges_features()
     model = train_logistic_regressor(X=features, labels=labels)
-    save_model(model, filename="card_merges_predictor.lr")
+    register_trained_model(
+        model,
+        "card_merges_predictor.lr",
+        dataset_pattern="data/card_merges*",
+        feature_extractor=extract_difference_of_histograms_features,
+    )
 
 
 def train_empty_card_slots_model():
     """Train a model that distinguishes between empty and filled card slots"""
-
-    features, labels = load_card_slots_features()
-    model = train_knn(X=features, labels=labels)
-    save_model(model, filename="card_slots_predictor.knn")
+    search_and_register_model(
+        "card_slots_predictor.knn",
+        dataset_pattern="data/card_slots_data*",
+        feature_extractor=extract_color_features,
+        classifier=KNeighborsClassifier(),
+        param_grid=KNN_PARAM_GRID,
+        type="median",
+    )
 
 
 def train_amplify_cards_classifier():
     """Train a model that identifies what cards need to be used in phase 3 of Bird FLoor 4!"""
-
-    features, labels = load_amplify_cards_features()
-    features_reduced, pca_model = apply_pca_transform(features, n_components=20)
-    model = train_knn(X=features_reduced, labels=labels)
-    save_model(model, filename="amplify_cards_predictor.knn")
-    save_model(pca_model, filename="pca_amplify_model.pca")
+    search_and_register_model(
+        "amplify_cards_predictor.knn",
+        dataset_pattern="data/amplify*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=KNeighborsClassifier(),
+        param_grid=KNN_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+        pca_name="pca_amplify_model.pca",
+        pca_components=(10, 20, 30),
+    )
 
 
 def train_HAM_cards_classifier():
     """Train a model that identifies hard-hitting cards (excluding ultimates)"""
-
-    features, labels = load_HAM_cards_features()
-    features_reduced, pca_model = apply_pca_transform(features, n_components=25)
-    model = train_knn(X=features_reduced, labels=labels)
-    save_model(model, filename="HAM_cards_predictor.knn")
-    save_model(pca_model, filename="pca_HAM_cards_model.pca")
+    search_and_register_model(
+        "HAM_cards_predictor.knn",
+        dataset_pattern="data/ham_cards*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=KNeighborsClassifier(),
+        param_grid=KNN_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+        pca_name="pca_HAM_cards_model.pca",
+        pca_components=(15, 25, 35),
+    )
 
 
 def train_thor_cards_classifier():
-    """Train a model that identifies hard-hitting cards (excluding ultimates)"""
-
-    features, labels = load_thor_cards_features()
-    features_reduced, pca_model = apply_pca_transform(features, n_components=25)
-    model = train_svm_classifier(X=features_reduced, labels=labels)
-    save_model(model, filename="Thor_cards_predictor.svm")
-    save_model(pca_model, filename="pca_Thor_cards_model.pca")
+    """Train a model that identifies Thor cards"""
+    search_and_register_model(
+        "Thor_cards_predictor.svm",
+        dataset_pattern="data/thor_cards*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=SVC(kernel="rbf"),
+        param_grid=SVM_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+        pca_name="pca_Thor_cards_model.pca",
+        pca_components=(15, 25, 35),
+    )
 
 
 def train_ground_cards_classifier():
@@ -344,16 +491,26 @@ def train_ground_cards_classifier():
     # save_model(scaler_model, filename="scaler_ground_cards_model.scaler")
 
     # Alternative behavior: raw histogram + SVC
-    features, labels = load_ground_cards_features_raw()
-    model = train_svc_classifier_raw(X=features, labels=labels)
-    save_model(model, filename="ground_cards_predictor.svc")
+    search_and_register_model(
+        "ground_cards_predictor.svc",
+        dataset_pattern="data/ground_data*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=SVC(kernel="rbf"),
+        param_grid=SVM_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+    )
 
 
 def train_unit_type_classifier():
     """Train a model that identifies the unit type color of a unit"""
-    features, labels = load_unit_type_features()
-    model = train_svm_classifier(X=features, labels=labels)
-    save_model(model, filename="unit_type_predictor.svm")
+    search_and_register_model(
+        "unit_type_predictor.svm",
+        dataset_pattern="data/unit_type*",
+        feature_extractor=extract_color_histograms_features,
+        classifier=SVC(kernel="rbf"),
+        param_grid=SVM_PARAM_GRID,
+        bins_candidates=HISTOGRAM_BINS_CANDIDATES,
+    )
 
 
 def main():
@@ -382,6 +539,9 @@ def main():
     ### Train a model that the color type of a unit
     # train_unit_type_classifier()
 
+    ### Export all the models in 'models/' for the numpy runtime
+    # export_all_models()
+
     return
 
 
@@ -0,0 +1,140 @@
+"""Replay the hands recorded during real fights (see `utilities/hand_recorder.py`) through a battle strategy, offline,
+and compare its decisions with the golden ones: the actions taken live, or those of a previous replay saved with
+`--save-golden`. Also measures how long every decision takes.
+
+The strategies see the recorded screenshot instead of the game window, their clicks are ignored and their waits are
+skipped, so no game is needed. By default every hand is replayed through the strategy that decided on it live.
+Exits with an error if any decision changed. Run it from the `scripts/` directory:
+    python replay_hands.py [data/battle_records/session_...] [--strategy dogs_floor4_fighting_strategies.DogsFloor4BattleStrategy]
+        [--golden golden.json] [--save-golden golden.json] [--output replay_report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from utilities.active_learning import low_confidence_capture
+from utilities.battle_simulator import offline_game
+from utilities.fighting_strategies import IBattleStrategy, load_strategy
+from utilities.hand_recorder import HandRecord, action_to_json, recorded_hands, recorded_sessions
+
+# Given to the strategies when a hand was recorded without its screenshot
+BLANK_SCREEN = np.zeros((960, 540, 3), dtype=np.uint8)
+
+
+def replay_session(session_dir: str, strategy_override: str | None, golden: dict, verbose: bool = False) -> list[dict]:
+    """Replay the hands of a session in order, with one instance of each strategy, as in the fights"""
+    strategies: dict[str, IBattleStrategy] = {}
+    screen = [BLANK_SCREEN]
+    inputs = Counter()
+    results = []
+    with offline_game(lambda: screen[0], lambda action, _arguments: inputs.update((action,)), verbose=verbose):
+        for filepath in recorded_hands(session_dir):
+            record = HandRecord.load(filepath)
+            record_id = os.path.splitext(os.path.relpath(filepath, os.path.dirname(session_dir)))[0]
+            name = strategy_override or record.strategy
+            if name not in strategies:
+                strategies[name] = load_strategy(name)()
+
+            screen[0] = record.screenshot if record.screenshot is not None else BLANK_SCREEN
+            IBattleStrategy.phase_turn = record.phase_turn
+            arguments = {key: value for key, value in record.arguments.items() if key != "num_units"}
+            inputs.clear()
+
+            start_time = time.perf_counter()
+            _, card_indices = strategies[name].pick_cards_from_hand(
+                record.hand_of_cards, record.picked_cards, **arguments
+            )
+            latency = time.perf_counter() - start_time
+
+            action = action_to_json(card_indices[0] if card_indices else None)
+            golden_action = golden.get(record_id, record.action)
+            results.append(
+                {
+                    "record": record_id,
+                    "strategy": name,
+                    "phase": arguments.get("phase"),
+                    "phase_turn": record.phase_turn,
+                    "card_turn": arguments.get("card_turn"),
+                    "action": action,
+                    "golden_action": golden_action,
+                    "matches": action == golden_action,
+                    "latency_ms": round(latency * 1e3, 3),
+                    "inputs": dict(inputs),
+                }
+            )
+    return results
+
+
+def summarize(results: list[dict]) -> dict:
+    latencies_ms = np.array([result["latency_ms"] for result in results]) if results else np.zeros(1)
+    mismatches = [result for result in results if not result["matches"]]
+    return {
+        "decisions": len(results),
+        "mismatches": len(mismatches),
+        "match_rate": round(1 - len(mismatches) / max(len(results), 1), 4),
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sessions", type=str, nargs="*", help="Recorded sessions to replay. All of them by default")
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        default=None,
+        help="Strategy to replay the hands through, as '<module in utilities>.<class>'. The recorded one by default",
+    )
+    parser.add_argument("--golden", type=str, default=None, help="Golden actions of a previous replay")
+    parser.add_argument("--save-golden", type=str, default=None, help="Where to save this replay's actions as golden")
+    parser.add_argument("--output", type=str, default=None, help="Where to write the JSON report")
+    parser.add_argument("--verbose", action="store_true", help="Show what the strategies print")
+    args = parser.parse_args()
+
+    # Don't queue the recorded crops for labeling again
+    low_confidence_capture.suspended = True
+
+    golden = {}
+    if args.golden is not None:
+        with open(args.golden, encoding="utf-8") as f:
+            golden = json.load(f)
+
+    results = []
+    for session_dir in args.sessions or recorded_sessions():
+        print(f"Replaying '{session_dir}'...")
+        results.extend(replay_session(session_dir.rstrip("/\\"), args.strategy, golden, verbose=args.verbose))
+
+    for result in results:
+        if not result["matches"]:
+            print(f"{result['record']}: {result['action']} instead of {result['golden_action']}")
+    summary = summarize(results)
+    print(json.dumps(summary, indent=2))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            json.dump({"summary": summary, "decisions": results}, f, indent=2, sort_keys=True)
+        print(f"Report saved in '{args.output}'")
+
+    if args.save_golden is not None:
+        with open(args.save_golden, "w", encoding="utf-8", newline="\n") as f:
+            json.dump({result["record"]: result["action"] for result in results}, f, indent=2, sort_keys=True)
+        print(f"Golden actions saved in '{args.save_golden}'")
+
+    if summary["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+
+    main()
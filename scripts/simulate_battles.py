@@ -0,0 +1,64 @@
+"""Play thousands of simulated battles with one or more battle strategies, offline (see `utilities/battle_simulator.py`),
+and compare how fast they decide and how well they do. The cards are dealt from the same seed for every strategy.
+
+The team is one of `utilities.battle_simulator.TEAMS` or a YAML file (see `load_team`). Strategies are given as
+'<module in utilities>.<class>'. Run it from the `scripts/` directory:
+    python simulate_battles.py --strategy dogs_floor4_fighting_strategies.DogsFloor4BattleStrategy --team dogs_floor4
+        [--battles 1000] [--seed 0] [--phase-hp 20 30 40] [--output simulation_report.json]
+"""
+
+import argparse
+import json
+import os
+
+from utilities.battle_simulator import TEAMS, BattleSimulator, SimulationRules, load_team
+from utilities.fighting_strategies import load_strategy
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        nargs="+",
+        default=["fighting_strategies.SmarterBattleStrategy"],
+        help="Strategies to simulate, as '<module in utilities>.<class>'",
+    )
+    parser.add_argument("--team", type=str, default="generic", help=f"One of {list(TEAMS)}, or a team YAML file")
+    parser.add_argument("--battles", type=int, default=1000, help="Battles to simulate per strategy")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the dealt cards")
+    parser.add_argument("--phase-hp", type=float, nargs="+", default=None, help="HP of each phase, in card damage")
+    parser.add_argument("--card-slots", type=int, default=None, help="Cards played per turn")
+    parser.add_argument("--max-turns", type=int, default=None, help="Turns before a battle counts as lost")
+    parser.add_argument("--output", type=str, default=None, help="Where to write the JSON report")
+    parser.add_argument("--verbose", action="store_true", help="Show what the strategies print (much slower)")
+    args = parser.parse_args()
+
+    team = load_team(args.team) if os.path.isfile(args.team) else TEAMS[args.team]
+    rules = SimulationRules()
+    if args.phase_hp is not None:
+        rules.phase_hp = tuple(args.phase_hp)
+    if args.card_slots is not None:
+        rules.card_slots = args.card_slots
+    if args.max_turns is not None:
+        rules.max_turns = args.max_turns
+
+    summaries = []
+    for strategy_name in args.strategy:
+        strategy_class = load_strategy(strategy_name)
+        print(f"Simulating {args.battles} battles of {strategy_class.__name__} with the '{team.name}' team...")
+        simulator = BattleSimulator(team, rules, seed=args.seed, verbose=args.verbose)
+        summary = simulator.run(strategy_class, args.battles).summary()
+        summaries.append(summary)
+        print(json.dumps(summary, indent=2))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(summaries, f, indent=2, sort_keys=True)
+        print(f"Report saved in '{args.output}'")
+
+
+if __name__ == "__main__":
+
+    main()
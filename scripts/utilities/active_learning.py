@@ -0,0 +1,135 @@
+"""Queue of the samples that the live classifiers weren't confident about, to label them later and grow the datasets
+where the models are weakest.
+
+When `capture_low_confidence_samples` is enabled in 'config/config.yaml', the predictors of `utilities.models` submit
+every sample whose confidence is below `low_confidence_threshold`, together with the predicted label. A background
+thread writes them in batches under 'data/low_confidence/<dataset name>/', in the format of `utilities.datasets`, so
+farming never waits on the disk. Samples that look like one already queued are skipped, and each queue holds at most
+`MAX_QUEUED_SAMPLES` samples, dropping new ones once full.
+
+Confirm or correct the labels with `label_low_confidence.py`, which moves them to the training datasets.
+"""
+
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+from utilities.app_config import APP_CONFIG_DEFAULTS, config
+from utilities.datasets import is_dataset_directory, read_dataset_manifest, write_dataset
+from utilities.feature_extractors import hash_distance, perceptual_hash
+
+LOW_CONFIDENCE_DIR = os.path.join("data", "low_confidence")
+LOW_CONFIDENCE_SOURCE = "low_confidence_capture"
+DEFAULT_LOW_CONFIDENCE_THRESHOLD = APP_CONFIG_DEFAULTS["low_confidence_threshold"]
+MAX_QUEUED_SAMPLES = 500
+# Samples whose perceptual hashes differ in this many bits or fewer are considered the same
+NEAR_DUPLICATE_HASH_DISTANCE = 5
+
+_BATCH_SIZE = 32
+_FLUSH_INTERVAL_SECONDS = 60.0
+# Samples waiting for the writer thread. If the disk can't keep up, new samples are dropped
+_MAX_PENDING_SAMPLES = 256
+
+
+def queued_batches(dataset_name: str | None = None, queue_dir: str = LOW_CONFIDENCE_DIR) -> list[str]:
+    """Directories of the queued batches, oldest first, of one dataset or of all of them"""
+    pattern = os.path.join(queue_dir, dataset_name or "*", "*")
+    return sorted(path for path in glob.glob(pattern) if is_dataset_directory(path))
+
+
+class LowConfidenceCapture:
+    """Thread-safe, bounded and deduplicated queue of low-confidence samples, written asynchronously"""
+
+    def __init__(self, queue_dir: str = LOW_CONFIDENCE_DIR, max_queued_samples: int = MAX_QUEUED_SAMPLES):
+        self.queue_dir = queue_dir
+        self.max_queued_samples = max_queued_samples
+        self._lock = threading.Lock()
+        # Perceptual hashes of the queued samples, per dataset. Loaded from disk the first time a dataset is used
+        self._hashes: dict[str, list[int]] = {}
+        self._pending: queue.Queue = queue.Queue(maxsize=_MAX_PENDING_SAMPLES)
+        self._writer_thread: threading.Thread | None = None
+        # Set to stop capturing regardless of the config, e.g. while evaluating the models on the datasets themselves
+        self.suspended = False
+
+    @property
+    def enabled(self) -> bool:
+        return not self.suspended and bool(config.get("capture_low_confidence_samples", False))
+
+    @property
+    def threshold(self) -> float:
+        return float(config.get("low_confidence_threshold", DEFAULT_LOW_CONFIDENCE_THRESHOLD))
+
+    def submit(self, dataset_name: str, sample: np.ndarray, predicted_label, confidence: float):
+        """Queue a sample for labeling, unless it's a near-duplicate of a queued one or the queue is full.
+        Never blocks on the disk."""
+        sample_hash = perceptual_hash(sample)
+        with self._lock:
+            hashes = self._dataset_hashes(dataset_name)
+            if len(hashes) >= self.max_queued_samples or any(
+                hash_distance(sample_hash, queued_hash) <= NEAR_DUPLICATE_HASH_DISTANCE for queued_hash in hashes
+            ):
+                return
+            try:
+                # Copy, since the caller may reuse the screenshot buffer
+                self._pending.put_nowait((dataset_name, np.array(sample), predicted_label, confidence, sample_hash))
+            except queue.Full:
+                return
+            hashes.append(sample_hash)
+            self._start_writer()
+
+    def _dataset_hashes(self, dataset_name: str) -> list[int]:
+        if dataset_name not in self._hashes:
+            self._hashes[dataset_name] = [
+                int(sample_hash)
+                for batch_dir in queued_batches(dataset_name, self.queue_dir)
+                for sample_hash in read_dataset_manifest(batch_dir).get("metadata", {}).get("hashes", [])
+            ]
+        return self._hashes[dataset_name]
+
+    def _start_writer(self):
+        if self._writer_thread is None:
+            self._writer_thread = threading.Thread(target=self._write_loop, name="low-confidence-writer", daemon=True)
+            self._writer_thread.start()
+
+    def _write_loop(self):
+        # Samples waiting to be written, per dataset and sample shape, so that each batch is a single shard
+        batches: dict[tuple[str, tuple], list[tuple]] = {}
+        last_flush_time = time.monotonic()
+        while True:
+            try:
+                dataset_name, sample, label, confidence, sample_hash = self._pending.get(timeout=5.0)
+                batch = batches.setdefault((dataset_name, sample.shape), [])
+                batch.append((sample, label, confidence, sample_hash))
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            flush_all = now - last_flush_time >= _FLUSH_INTERVAL_SECONDS
+            for key in [key for key, batch in batches.items() if flush_all or len(batch) >= _BATCH_SIZE]:
+                self._write_batch(key[0], batches.pop(key))
+            if flush_all:
+                last_flush_time = now
+
+    def _write_batch(self, dataset_name: str, batch: list[tuple]):
+        samples, labels, confidences, hashes = zip(*batch)
+        batch_dir = os.path.join(self.queue_dir, dataset_name, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+        try:
+            write_dataset(
+                batch_dir,
+                np.stack(samples, axis=0),
+                np.array(labels, dtype=object if isinstance(labels[0], Enum) else None),
+                source=LOW_CONFIDENCE_SOURCE,
+                # Hashes as strings, since JSON readers may not keep 192-bit integers exact
+                metadata={"confidences": [float(c) for c in confidences], "hashes": [str(h) for h in hashes]},
+            )
+        except Exception as e:
+            # Losing some samples is fine, stopping the farmer isn't
+            print(f"Couldn't save the low-confidence samples of '{dataset_name}': {e}")
+
+
+low_confidence_capture = LowConfidenceCapture()
@@ -23,6 +23,17 @@ APP_CONFIG_KEYS = frozenset(
         "game_password",
         "game_version",
         "minutes_to_wait_before_login",
+        "capture_low_confidence_samples",
+        "low_confidence_threshold",
+        "plan_whole_turns",
+        "turn_planner_time_budget_ms",
+        "record_battle_hands",
+        "play_whole_turns",
+        "event_driven_loops",
+        "trace_state_transitions",
+        "checkpoint_farmers",
+        "checkpoint_interval_seconds",
+        "checkpoint_max_age_minutes",
     }
 )
 
@@ -34,6 +45,17 @@ APP_CONFIG_DEFAULTS = {
     "game_password": "",
     "game_version": "global",
     "minutes_to_wait_before_login": 30,
+    "capture_low_confidence_samples": False,
+    "low_confidence_threshold": 0.5,
+    "plan_whole_turns": False,
+    "turn_planner_time_budget_ms": 20,
+    "record_battle_hands": False,
+    "play_whole_turns": False,
+    "event_driven_loops": False,
+    "trace_state_transitions": False,
+    "checkpoint_farmers": False,
+    "checkpoint_interval_seconds": 15,
+    "checkpoint_max_age_minutes": 60,
 }
 
 
@@ -0,0 +1,460 @@
+"""Offline simulation of battles, to benchmark and tune the battle strategies without the game (nor stamina).
+
+A team is a deck of unit cards (see `Team`). The simulator deals hands from it, asks the strategy for one action at
+a time through `IBattleStrategy.pick_cards_from_hand`, as the fighters do, and applies the plays and moves with the
+merge rules of `utilities.battle_utilities`. Simulated cards have no image: two cards merge when they are the same
+card (`Card.name`), and each card matches the card templates of its skill (e.g. 'thonar_gauge'), so no model is
+needed. The strategies still look at the screen and click on it, so while simulating `capture_window` returns a
+blank screen on which no template is found, the clicks and drags are only counted, and the waits for the game are
+skipped.
+
+Battles move to the next phase once the damage dealt (see `SimulationRules`) reaches the HP of the current one.
+"""
+
+import contextlib
+import os
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from numbers import Integral
+
+import numpy as np
+import yaml
+from utilities.battle_utilities import handle_card_merges_new
+from utilities.capture_window import set_screenshot_source
+from utilities.card_data import Card, CardRanks, CardTypes, copy_hand
+from utilities.fighting_strategies import IBattleStrategy
+from utilities.pattern_match_strategies import IMatchingStrategy, NoMatchStrategy
+from utilities.utilities import hand_merge_matrix, set_game_wait, set_input_sink
+from utilities.vision import set_matching_strategy
+
+# Size of the game window, in pixels (height, width)
+GAME_SCREEN_SHAPE = (960, 540, 3)
+
+
+@dataclass(frozen=True)
+class SkillCard:
+    """A card that a unit can draw"""
+
+    name: str
+    card_type: CardTypes
+    # Card templates (names in `vision_images`) that the card matches, e.g. ('thonar_gauge',)
+    templates: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class Unit:
+    name: str
+    skills: tuple[SkillCard, ...]
+    ultimate: SkillCard
+
+
+@dataclass(frozen=True)
+class Team:
+    """The units of a team, whose skill cards make up the deck"""
+
+    name: str
+    units: tuple[Unit, ...]
+
+    @property
+    def hand_size(self) -> int:
+        # As read by `get_hand_cards`
+        return 8 if len(self.units) == 4 else 7
+
+
+def _unit(name: str, skills: list[tuple[str, CardTypes, tuple[str, ...]]], ultimate_templates=()) -> Unit:
+    return Unit(
+        name,
+        tuple(SkillCard(f"{name}_{skill}", card_type, templates) for skill, card_type, templates in skills),
+        SkillCard(f"{name}_ult", CardTypes.ULTIMATE, tuple(ultimate_templates)),
+    )
+
+
+GENERIC_TEAM = Team(
+    "generic",
+    (
+        _unit("attacker", [("st", CardTypes.ATTACK, ()), ("aoe", CardTypes.ATTACK, ())]),
+        _unit("debuffer", [("st", CardTypes.ATTACK_DEBUFF, ()), ("debuff", CardTypes.DEBUFF, ())]),
+        _unit("support", [("buff", CardTypes.BUFF, ()), ("stance", CardTypes.STANCE, ())]),
+        _unit("healer", [("heal", CardTypes.RECOVERY, ()), ("st", CardTypes.ATTACK, ())]),
+    ),
+)
+
+# The team `DogsFloor4BattleStrategy` is written for. The card types are the closest ones to each skill
+DOGS_FLOOR4_TEAM = Team(
+    "dogs_floor4",
+    (
+        _unit(
+            "escalin",
+            [("st", CardTypes.ATTACK, ("escalin_st",)), ("aoe", CardTypes.ATTACK, ("escalin_aoe",))],
+            ("escalin_ult",),
+        ),
+        _unit(
+            "roxy",
+            [("st", CardTypes.ATTACK, ("roxy_st",)), ("aoe", CardTypes.ATTACK, ("roxy_aoe",))],
+            ("roxy_ult",),
+        ),
+        _unit(
+            "nasi",
+            [("heal", CardTypes.RECOVERY, ("nasi_heal",)), ("stun", CardTypes.DEBUFF, ("nasi_stun",))],
+            ("nasi_ult",),
+        ),
+        _unit(
+            "thonar",
+            [("stance", CardTypes.STANCE, ("thonar_stance",)), ("gauge", CardTypes.ATTACK, ("thonar_gauge",))],
+            ("thonar_ult",),
+        ),
+    ),
+)
+
+TEAMS = {team.name: team for team in (GENERIC_TEAM, DOGS_FLOOR4_TEAM)}
+
+
+def load_team(filepath: str) -> Team:
+    """A team from a YAML file, e.g.:
+
+    name: my_team
+    units:
+      - name: escalin
+        skills:
+          - {name: st, type: ATTACK, templates: [escalin_st]}
+          - {name: aoe, type: ATTACK, templates: [escalin_aoe]}
+        ultimate_templates: [escalin_ult]
+    """
+    with open(filepath, encoding="utf-8") as f:
+        team = yaml.safe_load(f)
+    return Team(
+        team.get("name", os.path.splitext(os.path.basename(filepath))[0]),
+        tuple(
+            _unit(
+                unit["name"],
+                [
+                    (skill["name"], CardTypes[skill["type"].upper()], tuple(skill.get("templates", ())))
+                    for skill in unit["skills"]
+                ],
+                unit.get("ultimate_templates", ()),
+            )
+            for unit in team["units"]
+        ),
+    )
+
+
+@dataclass
+class SimulationRules:
+    """How battles go. Damage is in arbitrary units: a BRONZE attack card deals 1"""
+
+    phase_hp: tuple[float, ...] = (20.0, 30.0, 40.0)
+    # The battle is lost if it's not cleared after this many turns
+    max_turns: int = 30
+    card_slots: int = 4
+    floor: int = 4
+    # Card plays, moves and merges of a unit's cards that fill its ultimate gauge. The ultimate is dealt next turn
+    ultimate_gauge: int = 6
+    # Strategy actions that don't fill a slot (moves, invalid plays...) before the turn is considered stuck
+    max_actions_per_turn: int = 20
+    rank_damage: dict[CardRanks, float] = field(
+        default_factory=lambda: {
+            CardRanks.BRONZE: 1.0,
+            CardRanks.SILVER: 2.0,
+            CardRanks.GOLD: 4.0,
+            CardRanks.ULTIMATE: 6.0,
+        }
+    )
+    type_damage: dict[CardTypes, float] = field(
+        default_factory=lambda: {
+            CardTypes.ATTACK: 1.0,
+            CardTypes.ATTACK_DEBUFF: 1.0,
+            CardTypes.ULTIMATE: 1.0,
+            CardTypes.DEBUFF: 0.5,
+        }
+    )
+
+    def card_damage(self, card: Card) -> float:
+        return self.rank_damage.get(card.card_rank, 0.0) * self.type_damage.get(card.card_type, 0.0)
+
+
+@dataclass
+class BattleOutcome:
+    cleared: bool = False
+    turns: int = 0
+    # Turns spent in each phase
+    phase_turns: list[int] = field(default_factory=list)
+    damage: float = 0.0
+    cards_played: Counter = field(default_factory=Counter)
+    gold_cards_played: int = 0
+    merges: int = 0
+    moves: int = 0
+    # Plays of empty hand positions, or out of the hand
+    invalid_actions: int = 0
+    # Actions the strategy performed itself (returning None)
+    handled_actions: int = 0
+    stuck_turns: int = 0
+    decisions: int = 0
+    decision_seconds: float = 0.0
+    inputs: Counter = field(default_factory=Counter)
+    skipped_wait_seconds: float = 0.0
+
+
+@dataclass
+class SimulationReport:
+    strategy: str
+    team: str
+    outcomes: list[BattleOutcome]
+    wall_seconds: float
+
+    def summary(self) -> dict:
+        outcomes = self.outcomes
+        decisions = sum(outcome.decisions for outcome in outcomes)
+        decision_seconds = sum(outcome.decision_seconds for outcome in outcomes)
+        turns = sum(outcome.turns for outcome in outcomes)
+        cleared = [outcome for outcome in outcomes if outcome.cleared]
+        cards_played = sum((outcome.cards_played for outcome in outcomes), Counter())
+        return {
+            "strategy": self.strategy,
+            "team": self.team,
+            "battles": len(outcomes),
+            "clear_rate": round(len(cleared) / len(outcomes), 4),
+            "mean_turns_to_clear": round(float(np.mean([o.turns for o in cleared])), 2) if cleared else None,
+            "mean_damage": round(float(np.mean([o.damage for o in outcomes])), 2),
+            "turns": turns,
+            "decisions": decisions,
+            "decisions_per_second": round(decisions / decision_seconds, 1) if decision_seconds else None,
+            "turns_per_second": round(turns / self.wall_seconds, 1) if self.wall_seconds else None,
+            "cards_played": dict(sorted(cards_played.items())),
+            "gold_cards_per_battle": round(float(np.mean([o.gold_cards_played for o in outcomes])), 2),
+            "merges_per_battle": round(float(np.mean([o.merges for o in outcomes])), 2),
+            "moves_per_battle": round(float(np.mean([o.moves for o in outcomes])), 2),
+            "invalid_actions": sum(outcome.invalid_actions for outcome in outcomes),
+            "handled_actions": sum(outcome.handled_actions for outcome in outcomes),
+            "stuck_turns": sum(outcome.stuck_turns for outcome in outcomes),
+            "inputs": dict(sorted(sum((outcome.inputs for outcome in outcomes), Counter()).items())),
+            "skipped_wait_seconds": round(sum(outcome.skipped_wait_seconds for outcome in outcomes), 1),
+        }
+
+
+@contextlib.contextmanager
+def offline_game(
+    get_screen: Callable[[], np.ndarray],
+    on_input: Callable[[str, tuple], None],
+    on_wait: Callable[[float], None] = lambda _seconds: None,
+    *,
+    matching_strategy: IMatchingStrategy | None = None,
+    verbose=False,
+) -> Iterator[None]:
+    """Take the game's place for the strategies: screenshots come from `get_screen()`, inputs go to
+    `on_input(action, arguments)` and the waits for the game to `on_wait(seconds)`. If given, `matching_strategy`
+    finds the templates instead of the images' own strategies. What the strategies print is hidden unless `verbose`
+    """
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        set_screenshot_source(lambda: (get_screen(), (0, 0)))
+        set_matching_strategy(matching_strategy)
+        set_input_sink(on_input)
+        set_game_wait(on_wait)
+        try:
+            yield
+        finally:
+            set_game_wait(None)
+            set_input_sink(None)
+            set_matching_strategy(None)
+            set_screenshot_source(None)
+
+
+class BattleSimulator:
+    """Play whole battles with a strategy, on hands dealt from the deck of a team"""
+
+    def __init__(self, team: Team, rules: SimulationRules | None = None, seed: int | None = None, verbose=False):
+        self.team = team
+        self.rules = rules or SimulationRules()
+        self.rng = np.random.default_rng(seed)
+        # Print what the strategies print, which slows the simulation down a lot
+        self.verbose = verbose
+        self._unit_of_card = {skill.name: unit.name for unit in team.units for skill in (*unit.skills, unit.ultimate)}
+        self._blank_screen = np.zeros(GAME_SCREEN_SHAPE, dtype=np.uint8)
+        self._outcome: BattleOutcome | None = None
+
+    @staticmethod
+    def same_card(card_1: Card, card_2: Card) -> bool:
+        """The merge rule of the simulated cards"""
+        return card_1.name is not None and card_1.name == card_2.name
+
+    def run(self, strategy_class: type[IBattleStrategy], num_battles: int) -> SimulationReport:
+        outcomes = []
+        start_time = time.perf_counter()
+        with self._offline_game():
+            for _ in range(num_battles):
+                outcomes.append(self.simulate_battle(strategy_class()))
+        return SimulationReport(strategy_class.__name__, self.team.name, outcomes, time.perf_counter() - start_time)
+
+    @contextlib.contextmanager
+    def _offline_game(self) -> Iterator[None]:
+        """Take the game's place for the strategies, on a blank screen, and merge the cards with `same_card`"""
+
+        def skip_wait(seconds: float):
+            self._outcome.skipped_wait_seconds += seconds
+
+        with offline_game(
+            lambda: self._blank_screen,
+            lambda action, _arguments: self._outcome.inputs.update((action,)),
+            skip_wait,
+            # Nothing can be found on the blank screen, so don't spend the simulation matching templates on it
+            matching_strategy=NoMatchStrategy,
+            verbose=self.verbose,
+        ):
+            hand_merge_matrix.merge_rule = self.same_card
+            try:
+                yield
+            finally:
+                hand_merge_matrix.merge_rule = None
+
+    def simulate_battle(self, strategy: IBattleStrategy) -> BattleOutcome:
+        """Play a battle until it's cleared or lost. Must run within `_offline_game`"""
+        rules = self.rules
+        outcome = self._outcome = BattleOutcome()
+        gauges = {unit.name: 0 for unit in self.team.units}
+        hand: list[Card] = [Card(CardTypes.GROUND, None, None) for _ in range(self.team.hand_size)]
+        phase = 1
+        phase_damage = 0.0
+        strategy.reset_phase_turn()
+        outcome.phase_turns.append(0)
+
+        while outcome.turns < rules.max_turns:
+            self._deal(hand, gauges)
+            outcome.turns += 1
+            outcome.phase_turns[-1] += 1
+            strategy.increment_phase_turn()
+            phase_damage += self._play_turn(strategy, hand, gauges, phase)
+
+            if phase_damage >= rules.phase_hp[phase - 1]:
+                if phase == len(rules.phase_hp):
+                    outcome.cleared = True
+                    break
+                phase += 1
+                phase_damage = 0.0
+                outcome.phase_turns.append(0)
+                strategy.reset_phase_turn()
+
+        return outcome
+
+    def _play_turn(self, strategy: IBattleStrategy, hand: list[Card], gauges: dict[str, int], phase: int) -> float:
+        """Fill the card slots with the strategy's picks, and return the damage dealt"""
+        outcome = self._outcome
+        picked_cards = [Card() for _ in range(6)]
+        damage = 0.0
+        slot = 0
+        actions = 0
+        while slot < self.rules.card_slots:
+            if actions >= self.rules.max_actions_per_turn:
+                outcome.stuck_turns += 1
+                break
+            actions += 1
+
+            start_time = time.perf_counter()
+            # Like `pick_cards`, the rest of a planned turn is played without reading the hand again
+            planned_action = strategy._next_planned_action(slot)
+            _, card_actions = planned_action or strategy.pick_cards_from_hand(
+                copy_hand(hand),
+                picked_cards,
+                card_turn=slot,
+                card_slots=self.rules.card_slots,
+                phase=phase,
+                floor=self.rules.floor,
+            )
+            outcome.decision_seconds += time.perf_counter() - start_time
+            outcome.decisions += 1
+            action = card_actions[0]
+
+            if action is None:
+                outcome.handled_actions += 1
+            elif isinstance(action, Integral):
+                if not -len(hand) <= action < len(hand) or hand[action].name is None:
+                    outcome.invalid_actions += 1
+                    continue
+                # Negative indices too, so that the merge rules see the actual position
+                action %= len(hand)
+                card = hand[action]
+                picked_cards[slot] = card
+                slot += 1
+                damage += self._play_card(card, gauges)
+                self._apply(strategy, hand, action, gauges, played_card=card)
+            else:
+                # Moving a card takes a slot too, and fills the gauge of its unit
+                origin_card = hand[action[0]]
+                if origin_card.name is None:
+                    outcome.invalid_actions += 1
+                    continue
+                outcome.moves += 1
+                slot += 1
+                gauges[self._unit_of_card[origin_card.name]] += 1
+                self._apply(strategy, hand, action, gauges)
+        return damage
+
+    def _play_card(self, card: Card, gauges: dict[str, int]) -> float:
+        outcome = self._outcome
+        outcome.cards_played[card.card_type.name] += 1
+        outcome.gold_cards_played += card.card_rank == CardRanks.GOLD
+        unit_name = self._unit_of_card[card.name]
+        gauges[unit_name] = 0 if card.card_type == CardTypes.ULTIMATE else gauges[unit_name] + 1
+        damage = self.rules.card_damage(card)
+        outcome.damage += damage
+        return damage
+
+    def _apply(
+        self, strategy: IBattleStrategy, hand: list[Card], action, gauges: dict[str, int], played_card: Card = None
+    ):
+        """Apply a play or a move to the hand, and fill the gauges of the units whose cards merged"""
+        cards_before = self._cards_per_unit(hand)
+        if played_card is not None:
+            cards_before[self._unit_of_card[played_card.name]] -= 1
+        strategy._update_hand_of_cards(hand, [action])
+        self._count_merges(cards_before, hand, gauges)
+
+    def _cards_per_unit(self, hand: list[Card]) -> Counter:
+        return Counter(self._unit_of_card[card.name] for card in hand if card.name is not None)
+
+    def _count_merges(self, cards_before: Counter, hand: list[Card], gauges: dict[str, int]):
+        cards_after = self._cards_per_unit(hand)
+        for unit_name, num_cards in cards_before.items():
+            merges = num_cards - cards_after[unit_name]
+            self._outcome.merges += merges
+            gauges[unit_name] += merges
+
+    def _deal(self, hand: list[Card], gauges: dict[str, int]):
+        """Fill the empty positions of the hand, on the left, and merge the new cards with their neighbours, until
+        the hand is full"""
+        while any(card.name is None for card in hand):
+            cards_before = self._cards_per_unit(hand)
+            units_with_ultimate = {
+                self._unit_of_card[card.name] for card in hand if card.card_type == CardTypes.ULTIMATE
+            }
+            for i, card in enumerate(hand):
+                if card.name is not None:
+                    continue
+                ready_units = [
+                    unit
+                    for unit in self.team.units
+                    if gauges[unit.name] >= self.rules.ultimate_gauge and unit.name not in units_with_ultimate
+                ]
+                if ready_units:
+                    unit = ready_units[0]
+                    units_with_ultimate.add(unit.name)
+                    hand[i] = self._new_card(unit.ultimate, CardRanks.ULTIMATE)
+                else:
+                    unit = self.team.units[self.rng.integers(len(self.team.units))]
+                    skill = unit.skills[self.rng.integers(len(unit.skills))]
+                    hand[i] = self._new_card(skill, CardRanks.BRONZE)
+                cards_before[unit.name] += 1
+
+            handle_card_merges_new(hand)
+            self._count_merges(cards_before, hand, gauges)
+
+    def _new_card(self, skill: SkillCard, card_rank: CardRanks) -> Card:
+        return Card(
+            skill.card_type,
+            card_rank=card_rank,
+            num_units=len(self.team.units),
+            template_matches=dict.fromkeys(skill.templates, True),
+            name=skill.name,
+        )
@@ -6,13 +6,20 @@ from utilities.card_data import Card, CardRanks, CardTypes
 from utilities.utilities import determine_card_merge
 
 
+def rank_up_card(card: Card) -> Card:
+    """A copy of the card with the next rank. Simulations never modify cards in place, since they may be shared
+    with other copies of the hand"""
+    ranked_up_card = card.copy()
+    ranked_up_card.card_rank = CardRanks(card.card_rank.value + 1)
+    return ranked_up_card
+
+
 def process_card_move(house_of_cards: list[Card], origin_idx: int, target_idx: int):
     """If we're moving a card, how does the whole hand change?"""
 
     if determine_card_merge(house_of_cards[origin_idx], house_of_cards[target_idx]):
         # First, increase the rank of the target card
-        target_rank = house_of_cards[target_idx].card_rank
-        house_of_cards[target_idx].card_rank = CardRanks(target_rank.value + 1)
+        house_of_cards[target_idx] = rank_up_card(house_of_cards[target_idx])
         # And let's remove the origin card. Otherwise, we don't remove it
         house_of_cards.pop(origin_idx)
         # Let's insert a dummy card
@@ -68,7 +75,7 @@ def handle_card_merges_new(house_of_cards: list[Card]):
                 print(f"Card at idx {i} will merge with idx {i+1}!")
                 # Increase the rank of the current card
                 if card.card_rank.value in {0, 1}:
-                    card.card_rank = CardRanks(card.card_rank.value + 1)
+                    house_of_cards[i] = rank_up_card(card)
                 # And remove the right card
                 house_of_cards.pop(i + 1)
                 # Let's insert a dummy None card to keep proper indexing
@@ -105,7 +112,7 @@ def handle_card_merges(house_of_cards: list[Card], left_card_idx: int, right_car
         print(f"Card at idx {left_card_idx} will merge with idx {right_card_idx}!")
         # Increase the rank of the right card
         if right_card.card_rank.value in {0, 1}:
-            right_card.card_rank = CardRanks(right_card.card_rank.value + 1)
+            house_of_cards[right_card_idx] = rank_up_card(right_card)
 
         # Remove the left card
         house_of_cards.pop(left_card_idx)
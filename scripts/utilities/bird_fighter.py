@@ -1,29 +1,23 @@
-import time
-
 import numpy as np
 import utilities.vision_images as vio
 from utilities.card_data import Card
-from utilities.coordinates import Coordinates
 from utilities.general_fighter_interface import FightingStates, IFighter
+from utilities.interrupts import DEMONIC_BEAST_INTERRUPTS
 from utilities.utilities import capture_window, find, find_and_click
 
 
 class BirdFighter(IFighter):
 
+    # Popups that show up during the fights of the demonic beasts
+    interrupts = DEMONIC_BEAST_INTERRUPTS
+
     current_floor = 1
 
     def fighting_state(self):
 
-        screenshot, window_location = capture_window()
-
-        # In case we've been lazy and it's the first time we're doing Demonic Beast this week...
-        find_and_click(
-            vio.weekly_mission,
-            screenshot,
-            window_location,
-            point_coordinates=Coordinates.get_coordinates("lazy_weekly_bird_mission"),
-        )
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        # Closes the weekly mission and daily quest popups
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # To skip quickly to the rewards when the fight is done
         find_and_click(vio.creature_destroyed, screenshot, window_location, threshold=0.6)
@@ -97,9 +91,8 @@ class BirdFighter(IFighter):
 
     def defeat_state(self):  # sourcery skip: class-extract-method
         """We've lost the battle..."""
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # Click on the OK button to end the fight
         find_and_click(vio.ok_main_button, screenshot, window_location)
@@ -113,9 +106,8 @@ class BirdFighter(IFighter):
     def fight_complete_state(self):
         """We've completed the battle successfully!"""
 
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # Click on the OK button to end the fight
         find_and_click(vio.ok_main_button, screenshot, window_location)
@@ -155,4 +147,4 @@ class BirdFighter(IFighter):
                 print("Closing Fighter thread!")
                 return
 
-            time.sleep(0.5)
+            self.wait_for_next_iteration(0.5)
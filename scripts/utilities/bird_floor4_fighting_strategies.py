@@ -2,13 +2,14 @@ from numbers import Integral
 
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array, card_types_array
 from utilities.fighting_strategies import (
     IBattleStrategy,
     SmarterBattleStrategy,
     play_stance_card,
 )
 from utilities.logging_utils import LoggerWrapper
+from utilities.models import AmplifyCardPredictor, HAMCardPredictor, ThorCardPredictor
 from utilities.utilities import (
     capture_window,
     count_immortality_buffs,
@@ -25,6 +26,8 @@ logger = LoggerWrapper("BirdFloor4FightingStrategies", log_file="bird_floor4_AI.
 class BirdFloor4BattleStrategy(IBattleStrategy):
     """The logic behind the battle for Floor 4"""
 
+    required_models = IBattleStrategy.required_models + (AmplifyCardPredictor, HAMCardPredictor, ThorCardPredictor)
+
     # Static attribute that keeps track of whether we've enabled a shield on phase 2
     with_shield = False
 
@@ -53,9 +56,9 @@ class BirdFloor4BattleStrategy(IBattleStrategy):
         """The logic for phase 1... use the existing smarter strategy"""
         # Extract the card types and ranks, and reverse the list to give higher priority to rightmost cards (to maximize card rotation)
 
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
+        card_types = card_types_array(hand_of_cards)
+        card_ranks = card_ranks_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
         silver_ids = np.where(card_ranks == CardRanks.SILVER.value)[0]
 
         # We may need to cure all the debuffs!
@@ -196,9 +199,9 @@ class BirdFloor4BattleStrategy(IBattleStrategy):
 
     def get_next_card_index_phase2(self, hand_of_cards: list[Card], picked_cards: list[Card]) -> int:
         """The logic for phase 2. Here we need to distinguish between the two types of turns!"""
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
+        card_types = card_types_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
 
         # List of cards of high rank
         silver_ids = np.where(card_ranks == 1)[0].astype(int)
@@ -310,8 +313,8 @@ class BirdFloor4BattleStrategy(IBattleStrategy):
             BirdFloor4BattleStrategy.with_shield = False
 
         # Extract the card types and ranks, and reverse the list to give higher priority to rightmost cards (to maximize card rotation)
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
+        card_types = card_types_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
 
         # First of all, we may need to cure the block skill effect!
         screenshot, _ = capture_window()
@@ -394,9 +397,9 @@ class BirdFloor4BattleStrategy(IBattleStrategy):
         """The logic for phase 1... use the existing smarter strategy"""
 
         # Extract card types and picked card types
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
+        card_types = card_types_array(hand_of_cards)
+        card_ranks = card_ranks_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
 
         # # If we don't have Meli's ult ready, play/move a card if we can generate a Meli merge
         # if BirFloor4BattleStrategy.card_turn == 0 and not np.any(
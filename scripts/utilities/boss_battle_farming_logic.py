@@ -2,12 +2,13 @@ import time
 from enum import Enum, auto
 
 import utilities.vision_images as vio
+from utilities.app_config import wait_if_paused
 from utilities.coordinates import Coordinates
 from utilities.general_farmer_interface import IFarmer
+from utilities.interrupts import ESSETTE_SHOP
 from utilities.logging_utils import LoggerWrapper, logging
 from utilities.utilities import (
     capture_window,
-    check_for_reconnect,
     move_to_location,
     find,
     find_and_click,
@@ -32,10 +33,14 @@ class BossBattleFarmer(IFarmer):
 
     # How many runs we've done?
     num_runs_complete = 0
+    checkpoint_attributes = ("num_runs_complete",)
 
     # To avoid counting multiple finished runs if the "finished_auto_repeat_fight" image is detected for multiple consecutive frames
     finished_run_lockout_until: float = 0.0
 
+    # The Essette shop popup shows up on top of the dungeon screens
+    interrupts = IFarmer.interrupts.extended(ESSETTE_SHOP)
+
     def __init__(
         self,
         *,
@@ -150,19 +155,15 @@ class BossBattleFarmer(IFarmer):
         else:
             press_key("esc")
 
-    def check_for_esette_popup(self):
-        """Check if we have the Essette shop, and click on it if so to remove the popup"""
-        screenshot, window_location = capture_window()
-        find_and_click(vio.essette_shop, screenshot, window_location)
-
     def run(self):
 
         print("Farming Boss Battles!")
 
         while True:
 
-            check_for_reconnect()
-            self.check_for_esette_popup()
+            wait_if_paused()
+            self.interrupts.evaluate(self, groups=("reconnect", "popup"))
+            self.save_checkpoint()
 
             if self.current_state == States.GOING_TO_DUNGEON:
                 self.going_to_dungeon_state()
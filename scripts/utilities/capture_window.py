@@ -1,6 +1,7 @@
 import ctypes
 import threading
 import time
+from collections.abc import Callable
 from ctypes import wintypes
 
 import numpy as np
@@ -15,6 +16,15 @@ from utilities.image_assets import get_saved_game_version
 _CAPTURE_LOCK = threading.RLock()
 _DEFAULT_CAPTURE_RETRIES = 3
 _RETRY_DELAY_SECONDS = 0.05
+# Where `capture_window` gets the screenshots from instead of the game window, if set (see `set_screenshot_source`)
+_screenshot_source: Callable[[], tuple[np.ndarray, tuple[int, int]]] | None = None
+
+
+def set_screenshot_source(source: Callable[[], tuple[np.ndarray, tuple[int, int]]] | None):
+    """Make `capture_window` return the screenshots of `source` instead of the game window's, e.g. to run the
+    strategies offline. `None` goes back to the game window"""
+    global _screenshot_source
+    _screenshot_source = source
 
 
 def get_game_window_title() -> str:
@@ -468,6 +478,9 @@ def capture_window() -> tuple[np.ndarray, tuple[int, int]]:
     Returns:
         tuple[np.ndarray, list[float]]: The image as a numpy array, and a list of the top-left corner of the window as [x,y]
     """
+    if _screenshot_source is not None:
+        return _screenshot_source()
+
     with _CAPTURE_LOCK:
         for attempt in range(1, _DEFAULT_CAPTURE_RETRIES + 1):
             try:
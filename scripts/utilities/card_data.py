@@ -34,11 +34,56 @@ class CardColors(Enum):
     NONE = -1
 
 
-@dataclass
+@dataclass(slots=True)
 class Card:
+    """A card of the hand. `card_image` is a view into the image of the whole hand, shared by all the cards
+    read together and by all their copies: it must never be modified in place."""
+
     card_type: CardTypes = CardTypes.NONE  # From above
     rectangle: tuple[float, float, float, float] = field(default_factory=list)  # window values: [x,y,w,h]
     card_image: np.ndarray | None = None  # The card image itself
     card_rank: CardRanks = CardRanks.NONE  # From above
     card_color: CardColors = CardColors.NONE
     num_units: int = 4
+    merge_histogram: np.ndarray | None = None  # Color histogram of the card interior, to predict card merges
+    # Card template name -> whether the card matches it. Filled lazily by `CardIdentityIndex`
+    template_matches: dict[str, bool] = field(default_factory=dict)
+    debuff_type: Enum | None = None  # Set by the strategies that care about it, like Rat's
+    name: str | None = None  # Which card it is, when known without looking at it (e.g. in simulations)
+
+    def copy(self) -> "Card":
+        """Cheap copy, to simulate plays and merges: the image and the cached features are shared, not copied"""
+        return Card(
+            self.card_type,
+            self.rectangle,
+            self.card_image,
+            self.card_rank,
+            self.card_color,
+            self.num_units,
+            self.merge_histogram,
+            self.template_matches,
+            self.debuff_type,
+            self.name,
+        )
+
+    def __copy__(self) -> "Card":
+        return self.copy()
+
+    def __deepcopy__(self, memo: dict) -> "Card":
+        # The image and the features are read-only, so even deep copies can share them
+        return self.copy()
+
+
+def copy_hand(hand_of_cards: list[Card]) -> list[Card]:
+    """Copy a hand to modify it freely, without copying any of the card images"""
+    return [card.copy() for card in hand_of_cards]
+
+
+def card_types_array(cards: list[Card]) -> np.ndarray:
+    """The `CardTypes` values of the cards, as an integer array"""
+    return np.fromiter((card.card_type.value for card in cards), dtype=int, count=len(cards))
+
+
+def card_ranks_array(cards: list[Card]) -> np.ndarray:
+    """The `CardRanks` values of the cards, as an integer array"""
+    return np.fromiter((card.card_rank.value for card in cards), dtype=int, count=len(cards))
@@ -0,0 +1,91 @@
+"""Identification of specific hero cards through their card templates, e.g. 'meli3k_aoe' or 'nasi_stun'.
+
+Instead of template-matching every card against every template each time a strategy asks, the cards of a
+hand are laid side by side and every template is matched once against the whole strip. The per-card result
+is stored in `Card.template_matches`, which is shared with the hand cache, so later hand reads and later
+questions about the same card are simple lookups. Cards without an image (e.g. simulated ones) are only looked up,
+so they match the templates that were filled in for them beforehand.
+"""
+
+from collections.abc import Iterable, Sequence
+
+import cv2
+import numpy as np
+import utilities.vision_images as vio
+from utilities.card_data import Card
+
+
+class CardIdentityIndex:
+    """Identify the cards of a hand against a set of template names, caching the result on each `Card`"""
+
+    def __init__(self, threshold: float = 0.7):
+        # Same default threshold as `utilities.find`, so that both always agree
+        self.threshold = threshold
+
+    def identify_hand(self, hand_of_cards: Iterable[Card], template_names: Sequence[str]):
+        """Match all the cards of the hand against all the given templates, skipping the already known results"""
+        pending_cards = [
+            card
+            for card in hand_of_cards
+            if card.card_image is not None and any(name not in card.template_matches for name in template_names)
+        ]
+        if not pending_cards:
+            return
+
+        # All crops of a hand have the same shape, but simulated hands may mix sources
+        cards_by_shape: dict[tuple, list[Card]] = {}
+        for card in pending_cards:
+            cards_by_shape.setdefault(card.card_image.shape, []).append(card)
+
+        for cards in cards_by_shape.values():
+            strip = np.concatenate([card.card_image for card in cards], axis=1)
+            card_width = cards[0].card_image.shape[1]
+            for name in template_names:
+                matches = self._match_strip(strip, card_width, name)
+                for card, is_match in zip(cards, matches):
+                    card.template_matches[name] = bool(is_match)
+
+    def matches_any(self, card: Card, template_names: Sequence[str]) -> bool:
+        """Whether the card matches any of the given templates"""
+        self.identify_hand((card,), template_names)
+        return any(card.template_matches.get(name, False) for name in template_names)
+
+    def template_name(self, card: Card, template_names: Sequence[str]) -> str | None:
+        """The first of the given template names that the card matches, if any"""
+        self.identify_hand((card,), template_names)
+        return next((name for name in template_names if card.template_matches.get(name, False)), None)
+
+    def matching_ids(self, hand_of_cards: list[Card], template_names: Sequence[str]) -> list[int]:
+        """Indices of the cards in the hand that match any of the given templates"""
+        self.identify_hand(hand_of_cards, template_names)
+        return [i for i, card in enumerate(hand_of_cards) if self.matches_any(card, template_names)]
+
+    def _match_strip(self, strip: np.ndarray, card_width: int, template_name: str) -> np.ndarray:
+        """Return, for each card of the strip, whether the template is found fully inside of it"""
+        num_cards = strip.shape[1] // card_width
+        found = np.zeros(num_cards, dtype=bool)
+        for needle in _template_needles(template_name):
+            needle_height, needle_width = needle.shape[:2]
+            if needle_height > strip.shape[0] or needle_width > card_width:
+                continue
+
+            match_result = cv2.matchTemplate(strip, needle, cv2.TM_CCOEFF_NORMED)
+            column_scores = np.nan_to_num(match_result, nan=-1.0).max(axis=0)
+            # Pad to a whole number of cards, then only keep the positions where the needle fits inside the card
+            column_scores = np.pad(column_scores, (0, needle_width - 1), constant_values=-1.0)
+            card_scores = column_scores.reshape(num_cards, card_width)[:, : card_width - needle_width + 1].max(axis=1)
+            found |= card_scores >= self.threshold
+        return found
+
+
+def _template_needles(template_name: str) -> list[np.ndarray]:
+    """All the loaded needle images of a `Vision`/`MultiVision` in `vision_images`"""
+    vision = getattr(vio, template_name, None)
+    if vision is None:
+        return []
+    if hasattr(vision, "needle_imgs"):
+        return vision.needle_imgs
+    return [] if vision.needle_img is None else [vision.needle_img]
+
+
+card_identity_index = CardIdentityIndex()
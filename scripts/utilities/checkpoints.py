@@ -0,0 +1,127 @@
+"""Checkpoints of the farmers' progress, so that a restarted process resumes the run instead of starting it over.
+
+`FarmingFactory.main_loop` recreates the farmer after an exception, and its counters survive because they're class
+attributes. When `checkpoint_farmers` is enabled in 'config/config.yaml', they also survive the process: every farmer
+periodically saves its `current_state` and the class attributes it declares in `checkpoint_attributes` (victories,
+stamina pots, collected chests, the position in a rotation...) to 'data/checkpoints/<farmer class>.json'. The file is
+replaced atomically, so a crash while saving leaves the previous checkpoint intact.
+
+When the same farmer starts again with the same options, before `checkpoint_max_age_minutes`, it restores them. Farms
+that end on purpose (completed or stopped with CTRL+C) delete their checkpoint.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from enum import Enum
+
+CHECKPOINTS_DIR = os.path.join("data", "checkpoints")
+CHECKPOINT_FORMAT_VERSION = 1
+# Checkpoints only restore the enums of the bot's own modules
+_ENUM_PACKAGE = "utilities"
+
+
+def encode_value(value):
+    """A value as JSON, keeping the enums, the tuples and the dictionaries with non-string keys"""
+    if isinstance(value, Enum):
+        return {"__enum__": f"{type(value).__module__}:{type(value).__qualname__}", "name": value.name}
+    if isinstance(value, tuple):
+        return {"__tuple__": [encode_value(item) for item in value]}
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    if isinstance(value, dict):
+        return {"__dict__": [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    return value
+
+
+def decode_value(value, like=None):
+    """Inverse of `encode_value`. Dictionaries are restored with the type of `like` (e.g. a `defaultdict`)"""
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__enum__" in value:
+        return _enum_type(value["__enum__"])[value["name"]]
+    if "__tuple__" in value:
+        return tuple(decode_value(item) for item in value["__tuple__"])
+    items = {decode_value(key): decode_value(item) for key, item in value["__dict__"]}
+    if isinstance(like, dict):
+        restored = like.copy()
+        restored.clear()
+        restored.update(items)
+        return restored
+    return items
+
+
+def _enum_type(path: str) -> type[Enum]:
+    """The enum saved as '<module>:<qualname>' by `encode_value`. Only from the modules of `_ENUM_PACKAGE` that are
+    already imported, so a checkpoint file can't make us import or reach anything else"""
+    module_name, _, qualname = path.partition(":")
+    module = sys.modules.get(module_name) if module_name.startswith(f"{_ENUM_PACKAGE}.") else None
+    if module is None or not qualname or any(name.startswith("_") for name in qualname.split(".")):
+        raise ValueError(f"Not an enum of the '{_ENUM_PACKAGE}' modules: '{path}'")
+    enum_type = module
+    for name in qualname.split("."):
+        enum_type = getattr(enum_type, name)
+    if not (isinstance(enum_type, type) and issubclass(enum_type, Enum)):
+        raise ValueError(f"Not an enum: '{path}'")
+    return enum_type
+
+
+def options_fingerprint(*options) -> str:
+    """Hash of the options a farmer was started with, to only restore checkpoints of the same farm. Being a hash,
+    the checkpoints don't keep options like the password"""
+    return hashlib.sha256(repr(options).encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """The checkpoint file of a farmer"""
+
+    def __init__(self, name: str, checkpoints_dir: str = CHECKPOINTS_DIR):
+        self.filepath = os.path.join(checkpoints_dir, f"{name}.json")
+
+    def save(self, checkpoint: dict) -> bool:
+        """Replace the checkpoint atomically. Returns whether it was saved"""
+        data = {"format_version": CHECKPOINT_FORMAT_VERSION, "saved_at": time.time(), **checkpoint}
+        temporary_filepath = f"{self.filepath}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            with open(temporary_filepath, "w", encoding="utf-8", newline="\n") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary_filepath, self.filepath)
+            return True
+        except OSError as e:
+            # Losing a checkpoint is fine, stopping the farmer isn't
+            print(f"Couldn't save the checkpoint '{self.filepath}': {e}")
+            return False
+
+    def load(self, max_age_seconds: float = float("inf")) -> dict | None:
+        """The checkpoint, unless there's none, it can't be read, or it's older than `max_age_seconds`"""
+        try:
+            with open(self.filepath, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring the unreadable checkpoint '{self.filepath}': {e}")
+            return None
+
+        if data.get("format_version", 0) > CHECKPOINT_FORMAT_VERSION:
+            print(f"Ignoring the checkpoint '{self.filepath}', saved by a newer version")
+            return None
+        if time.time() - data.get("saved_at", 0) > max_age_seconds:
+            print(f"Ignoring the checkpoint '{self.filepath}', too old")
+            return None
+        return data
+
+    def clear(self):
+        try:
+            os.remove(self.filepath)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Couldn't delete the checkpoint '{self.filepath}': {e}")
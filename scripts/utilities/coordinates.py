@@ -2,6 +2,12 @@
 
 from utilities.capture_window import capture_window
 
+# Crops of the card slots, with the size of the 'card_slots_data' samples (50x87), one stride apart. Fitted to the
+# click coordinates of the slots ("first_slot", ...), which are 58 pixels apart on average
+_CARD_SLOT_ORIGIN = (138, 703)
+_CARD_SLOT_STRIDE = 58
+_CARD_SLOT_SIZE = (50, 87)
+
 
 class Coordinates:
     """Namespace-like class to group all the hardcoded coordinates"""
@@ -48,6 +54,16 @@ class Coordinates:
         "third_slot": (276, 746),
         "fourth_slot": (331, 746),
         "fifth_slot": (397, 746),
+        # Crops of the card slots above: "first_slot_region", "second_slot_region", ...
+        **{
+            f"{slot}_slot_region": (
+                _CARD_SLOT_ORIGIN[0] + i * _CARD_SLOT_STRIDE,
+                _CARD_SLOT_ORIGIN[1],
+                _CARD_SLOT_ORIGIN[0] + i * _CARD_SLOT_STRIDE + _CARD_SLOT_SIZE[0],
+                _CARD_SLOT_ORIGIN[1] + _CARD_SLOT_SIZE[1],
+            )
+            for i, slot in enumerate(("first", "second", "third", "fourth", "fifth"))
+        },
         # Receive Brawl coordinates
         "receive_brawl": (384, 187),
         # Daily fortune card
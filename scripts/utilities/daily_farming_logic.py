@@ -9,6 +9,7 @@ import pyautogui as pyautogui
 # Import all images
 import utilities.vision_images as vio
 from utilities.coordinates import Coordinates
+from utilities.interrupts import DAILY_TASKS_COMPLETE, ESSETTE_SHOP, InterruptHandler, InterruptRegistry, click_on_match
 from utilities.logging_utils import LoggerWrapper
 from utilities.utilities import (
     capture_window,
@@ -57,6 +58,22 @@ class DailyFarmer:
 
     _lock = Lock()
 
+    # Popups closed before every state handler
+    interrupts = InterruptRegistry(
+        [
+            ESSETTE_SHOP,
+            DAILY_TASKS_COMPLETE,
+            InterruptHandler(
+                "annoying_chat_popup",
+                (vio.annoying_chat_popup,),
+                click_on_match(message="Closing the annoying chat popup..."),
+                threshold=0.9,
+                when=lambda _farmer, screenshot: DailyFarmer.current_state in [States.IN_TAVERN_STATE, States.PVP_STATE]
+                and find(vio.battle_menu, screenshot),
+            ),
+        ]
+    )
+
     # To check if we should kill the farmer
     farmer_killed = False
     manual_kill = False
@@ -623,22 +640,8 @@ class DailyFarmer:
         find_and_click(vio.ok_main_button, screenshot, window_location)
 
     def check_for_annoying_popups(self):
-        """Check if we have the Essette shop, and click on it if so to remove the popup"""
-        screenshot, window_location = capture_window()
-        find_and_click(vio.essette_shop, screenshot, window_location)
-        find_and_click(vio.daily_tasks_complete, screenshot, window_location)
-
-        if (
-            DailyFarmer.current_state in [States.IN_TAVERN_STATE, States.PVP_STATE]
-            and find(vio.battle_menu, screenshot)
-            and find_and_click(
-                vio.annoying_chat_popup,
-                screenshot,
-                window_location,
-                threshold=0.9,
-            )
-        ):
-            print("Closing the annoying chat popup...")
+        """Close the Essette shop, the daily tasks and the chat popups"""
+        self.interrupts.evaluate(self)
 
     def run(self):
 
@@ -0,0 +1,251 @@
+"""Datasets under 'data/', used to train the models.
+
+A dataset is a directory holding a 'manifest.json' and one or more shards. Each shard has all the samples of one
+shape: a `.npy` image tensor (memory-mappable) and a `.npy` array of labels. The manifest records the shape of every
+shard, the enum the labels belong to (if any) and where the data came from:
+
+    data/card_types_data_0/
+        manifest.json
+        shard_0.images.npy
+        shard_0.labels.npy
+
+The older format, a dill-pickled `{"data": ..., "labels": ...}` dict saved as `.npy`, can still be read, and can be
+converted with `migrate_datasets.py`. When both formats of the same dataset exist, the directory wins.
+"""
+
+import glob
+import json
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+from utilities.card_data import CardColors, CardRanks, CardTypes
+from utilities.model_registry import file_checksum
+
+DATASET_MANIFEST_FILENAME = "manifest.json"
+# Fraction of the samples of every shard that the models don't train on, to evaluate them (see `held_out_mask`)
+HELD_OUT_FRACTION = 0.2
+DATASET_FORMAT_VERSION = 1
+LEGACY_DATASET_EXTENSION = ".npy"
+
+# Enums that labels can be made of, by name
+LABEL_ENUMS: dict[str, type[Enum]] = {enum.__name__: enum for enum in (CardTypes, CardRanks, CardColors)}
+
+
+@dataclass(frozen=True)
+class DatasetShard:
+    """Samples of a dataset that all have the same shape"""
+
+    images_path: str
+    # None for datasets in the legacy format, where the images file holds the labels too
+    labels_path: str | None = None
+    label_enum: str | None = None
+
+    def load(self, mmap: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """The images and labels of the shard. Images are memory-mapped unless `mmap=False`"""
+        if self.labels_path is None:
+            return _load_legacy_dataset_file(self.images_path)
+
+        images = np.load(self.images_path, mmap_mode="r" if mmap else None)
+        labels = np.load(self.labels_path)
+        if self.label_enum is not None:
+            enum = LABEL_ENUMS[self.label_enum]
+            labels = np.array([enum(label) for label in labels.tolist()], dtype=object)
+        return images, labels
+
+    def checksum(self) -> str:
+        """Hash of the contents of the shard"""
+        if self.labels_path is None:
+            return file_checksum(self.images_path)
+        return f"{file_checksum(self.images_path)}-{file_checksum(self.labels_path)}"
+
+
+def held_out_mask(shard: DatasetShard, num_samples: int) -> np.ndarray:
+    """Which samples of the shard are held out of training. Always the same ones for the same shard contents, so that
+    training and evaluation agree"""
+    rng = np.random.default_rng(int(shard.checksum()[:16], 16))
+    return rng.random(num_samples) < HELD_OUT_FRACTION
+
+
+def _load_legacy_dataset_file(filepath: str) -> tuple[np.ndarray, np.ndarray]:
+    # Only needed until all datasets are migrated
+    import dill as pickle
+
+    with open(filepath, "rb") as f:
+        local_data = pickle.load(f)
+    return local_data["data"], np.asarray(local_data["labels"])
+
+
+def read_dataset_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, DATASET_MANIFEST_FILENAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_dataset_directory(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, DATASET_MANIFEST_FILENAME))
+
+
+def next_dataset_directory(name: str, data_dir: str = "data") -> str:
+    """First free 'data/<name>_<i>' path, in either format, for a new dataset"""
+    i = 0
+    while os.path.exists(os.path.join(data_dir, f"{name}_{i}")) or os.path.exists(
+        os.path.join(data_dir, f"{name}_{i}{LEGACY_DATASET_EXTENSION}")
+    ):
+        i += 1
+    return os.path.join(data_dir, f"{name}_{i}")
+
+
+def dataset_shards(glob_pattern: str) -> list[DatasetShard]:
+    """All the shards of the datasets matching the pattern, e.g. 'data/card_types*'"""
+    shards = []
+    for path in sorted(glob.iglob(glob_pattern)):
+        if is_dataset_directory(path):
+            manifest = read_dataset_manifest(path)
+            shards.extend(
+                DatasetShard(
+                    images_path=os.path.join(path, shard["images"]),
+                    labels_path=os.path.join(path, shard["labels"]),
+                    label_enum=manifest.get("label_enum"),
+                )
+                for shard in manifest["shards"]
+            )
+        elif path.endswith(LEGACY_DATASET_EXTENSION):
+            # Skip the legacy files that were already migrated
+            if not is_dataset_directory(path[: -len(LEGACY_DATASET_EXTENSION)]):
+                shards.append(DatasetShard(images_path=path))
+    return shards
+
+
+def load_dataset(glob_pattern: str) -> tuple[list | np.ndarray, np.ndarray]:
+    """Return all the data and labels together, based on the specified file pattern.
+    If not all samples have the same shape, the data is a list with one array per shape (the labels follow the same
+    order), which the feature extractors accept as is."""
+    shards_data = []
+    for shard in dataset_shards(glob_pattern):
+        print(f"Loading {shard.images_path}...")
+        shards_data.append(shard.load(mmap=False))
+
+    groups = _group_by_sample_shape(
+        [data_part for data, labels in shards_data for data_part, _ in split_by_sample_shape(data, labels)],
+        np.concatenate([labels for _, labels in shards_data], axis=0),
+    )
+    dataset = [data for data, _ in groups]
+    all_labels = np.concatenate([labels for _, labels in groups], axis=0)
+    return (dataset[0] if len(dataset) == 1 else dataset), all_labels
+
+
+def iter_dataset_batches(glob_pattern: str, batch_size: int = 256) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Yield (images, labels) batches of the datasets, one shard at a time and without loading them whole.
+    Batches never mix shards, so all the images of a batch have the same shape."""
+    for shard in dataset_shards(glob_pattern):
+        data, labels = shard.load(mmap=True)
+        for data_part, labels_part in split_by_sample_shape(data, labels):
+            for start in range(0, len(data_part), batch_size):
+                yield np.asarray(data_part[start : start + batch_size]), labels_part[start : start + batch_size]
+
+
+def split_by_sample_shape(data: np.ndarray | list[np.ndarray], labels: np.ndarray):
+    """Legacy datasets may hold a list of arrays of different shapes. Yield each with its labels"""
+    if isinstance(data, np.ndarray):
+        yield data, labels
+        return
+
+    start = 0
+    for data_part in data:
+        yield data_part, labels[start : start + len(data_part)]
+        start += len(data_part)
+
+
+def _group_by_sample_shape(
+    data: np.ndarray | list[np.ndarray], labels: np.ndarray
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Concatenate all the samples of the same shape together, in order of first appearance"""
+    data_by_shape: dict[tuple, list[np.ndarray]] = {}
+    labels_by_shape: dict[tuple, list[np.ndarray]] = {}
+    for data_part, labels_part in split_by_sample_shape(data, labels):
+        data_by_shape.setdefault(data_part.shape[1:], []).append(data_part)
+        labels_by_shape.setdefault(data_part.shape[1:], []).append(labels_part)
+
+    return [
+        (np.concatenate(data_by_shape[shape], axis=0), np.concatenate(labels_by_shape[shape], axis=0))
+        for shape in data_by_shape
+    ]
+
+
+def _label_enum_name(labels: np.ndarray) -> str | None:
+    """Name of the enum of the labels, if they are enums"""
+    if labels.dtype != object or len(labels) == 0 or not isinstance(labels[0], Enum):
+        return None
+    enum_name = type(labels[0]).__name__
+    if enum_name not in LABEL_ENUMS or not all(isinstance(label, LABEL_ENUMS[enum_name]) for label in labels):
+        raise ValueError(f"Labels must all be of the same known enum, got {set(type(label) for label in labels)}")
+    return enum_name
+
+
+def write_dataset(
+    directory: str,
+    data: np.ndarray | list[np.ndarray],
+    labels: np.ndarray,
+    source: str,
+    metadata: dict | None = None,
+):
+    """Save a dataset in `directory`, with one shard per sample shape. `metadata` goes in the manifest as is"""
+    labels = np.asarray(labels)
+    label_enum = _label_enum_name(labels)
+    if label_enum is not None:
+        labels = np.array([label.value for label in labels])
+
+    os.makedirs(directory, exist_ok=True)
+    shards = []
+    for i, (images, shard_labels) in enumerate(_group_by_sample_shape(data, labels)):
+        shard = {
+            "images": f"shard_{i}.images.npy",
+            "labels": f"shard_{i}.labels.npy",
+            "shape": list(images.shape),
+            "dtype": str(images.dtype),
+        }
+        np.save(os.path.join(directory, shard["images"]), images)
+        np.save(os.path.join(directory, shard["labels"]), shard_labels)
+        shards.append(shard)
+
+    manifest = {
+        "format_version": DATASET_FORMAT_VERSION,
+        "source": source,
+        "label_enum": label_enum,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "shards": shards,
+    }
+    if metadata is not None:
+        manifest["metadata"] = metadata
+    # The manifest goes last: a directory without it isn't a dataset yet
+    manifest_path = os.path.join(directory, DATASET_MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8", newline="\n") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def migrate_legacy_dataset(filepath: str, remove_legacy: bool = False) -> str:
+    """Convert a legacy dill-pickled dataset file into a dataset directory next to it, and check that both hold the
+    same data. Returns the new directory"""
+    directory = filepath[: -len(LEGACY_DATASET_EXTENSION)]
+    data, labels = _load_legacy_dataset_file(filepath)
+    write_dataset(directory, data, labels, source=os.path.basename(filepath))
+
+    # Samples of mixed-shape datasets end up grouped by shape, so compare against the same grouping
+    expected_groups = _group_by_sample_shape(data, np.asarray(labels))
+    migrated_data, migrated_labels = load_dataset(directory)
+    if isinstance(migrated_data, np.ndarray):
+        migrated_data = [migrated_data]
+    same_data = len(migrated_data) == len(expected_groups) and all(
+        np.array_equal(migrated, expected) for migrated, (expected, _) in zip(migrated_data, expected_groups)
+    )
+    same_labels = np.array_equal(migrated_labels, np.concatenate([labels for _, labels in expected_groups], axis=0))
+    if not (same_data and same_labels):
+        raise ValueError(f"The migrated dataset '{directory}' doesn't match '{filepath}'")
+
+    if remove_legacy:
+        os.remove(filepath)
+    return directory
@@ -1,4 +1,3 @@
-import time
 from typing import Callable
 
 import cv2
@@ -8,8 +7,8 @@ from utilities.card_data import Card
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_fighter_interface import FightingStates, IFighter
+from utilities.interrupts import DEMONIC_BEAST_INTERRUPTS
 from utilities.utilities import (
-    capture_window,
     click_im,
     draw_rectangles,
     find,
@@ -20,12 +19,18 @@ from utilities.vision import Vision
 
 
 class DeerFighter(IFighter):
+    # Popups that show up during the fights of the demonic beasts
+    interrupts = DEMONIC_BEAST_INTERRUPTS
+
     # Keep track of what floor has been defeated
     floor_defeated = None
 
     # Keep track of what floor we're fighting
     current_floor = -1
 
+    # Stricter than the default of `count_empty_card_slots`
+    card_slots_threshold = 0.7
+
     def __init__(
         self,
         battle_strategy: IBattleStrategy,
@@ -41,16 +46,9 @@ class DeerFighter(IFighter):
 
     def fighting_state(self):
 
-        screenshot, window_location = capture_window()
-
-        # In case we've been lazy and it's the first time we're doing Demonic Beast this week...
-        find_and_click(
-            vio.weekly_mission,
-            screenshot,
-            window_location,
-            point_coordinates=Coordinates.get_coordinates("lazy_weekly_bird_mission"),
-        )
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        # Closes the weekly mission and daily quest popups
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # To skip quickly to the rewards when the fight is done
         find_and_click(vio.creature_destroyed, screenshot, window_location)
@@ -65,7 +63,7 @@ class DeerFighter(IFighter):
             print("Fighting complete! Is it true? Double check...")
             self.current_state = FightingStates.FIGHTING_COMPLETE
 
-        elif (available_card_slots := DeerFighter.count_empty_card_slots(screenshot, threshold=0.7)) > 0:
+        elif (available_card_slots := self._count_empty_card_slots(screenshot)) > 0:
             # We see empty card slots, it means its our turn
             self.available_card_slots = available_card_slots
             print(f"MY TURN, selecting {available_card_slots} cards...")
@@ -125,9 +123,8 @@ class DeerFighter(IFighter):
 
     def fight_complete_state(self):
 
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # Click on the OK button to end the fight
         find_and_click(vio.ok_main_button, screenshot, window_location)
@@ -139,9 +136,8 @@ class DeerFighter(IFighter):
 
     def defeat_state(self):
         """We've lost the battle..."""
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         find_and_click(vio.ok_main_button, screenshot, window_location)
 
@@ -176,4 +172,4 @@ class DeerFighter(IFighter):
                 print("Closing Fighter thread!")
                 return
 
-            time.sleep(0.75)
+            self.wait_for_next_iteration(0.75)
@@ -1,6 +1,6 @@
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardTypes
+from utilities.card_data import Card, CardTypes, card_ranks_array, card_types_array
 from utilities.deer_utilities import (
     is_blue_card,
     is_buff_removal_card,
@@ -32,7 +32,7 @@ class DeerBattleStrategy(IBattleStrategy):
 
         screenshot, _ = capture_window()
 
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
 
         # Get all card types
         red_card_ids = sorted(
@@ -97,9 +97,9 @@ class DeerBattleStrategy(IBattleStrategy):
     def default_strategy(self, hand_of_cards: list[Card], picked_cards: list[Card]) -> int:
         """Default strategy: Picked a card whose type has the most number of cards"""
 
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_types = card_types_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
+        card_ranks = card_ranks_array(hand_of_cards)
 
         # Play a buff card first, if we have it and haven't played it yet
         buff_ids = sorted(np.where(card_types == CardTypes.BUFF.value)[0], key=lambda idx: card_ranks[idx])
@@ -1,6 +1,5 @@
-import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardTypes
+from utilities.card_data import Card, CardTypes, card_ranks_array
 from utilities.deer_utilities import (
     count_cards,
     has_ult,
@@ -18,6 +17,7 @@ from utilities.deer_utilities import (
 )
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
 from utilities.logging_utils import LoggerWrapper
+from utilities.models import ThorCardPredictor
 from utilities.utilities import capture_window, find
 
 logger = LoggerWrapper("DeerFloor4FightingStrategies", log_file="deer_floor4_AI.log")
@@ -26,6 +26,8 @@ logger = LoggerWrapper("DeerFloor4FightingStrategies", log_file="deer_floor4_AI.
 class DeerFloor4BattleStrategy(IBattleStrategy):
     """The logic behind the battle for Floor 4"""
 
+    required_models = IBattleStrategy.required_models + (ThorCardPredictor,)
+
     # Did we use red or blue cards in phase 1 turn 1?
     _color_cards_used_p2t1 = None
 
@@ -435,7 +437,7 @@ class DeerFloor4BattleStrategy(IBattleStrategy):
 
         screenshot, _ = capture_window()
 
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
         # Get all card types
         red_card_ids = sorted(
             [i for i, card in enumerate(hand_of_cards) if is_red_card(card)], key=lambda idx: card_ranks[idx]
@@ -52,6 +52,8 @@ class IDemonFarmer(IFarmer):
     # Keep track how many missed invites we've had
     missed_invites = 0
 
+    checkpoint_attributes = ("demons_destroyed", "num_tries", "missed_invites")
+
     # To control the sleeping time
     sleeper = threading.Event()
 
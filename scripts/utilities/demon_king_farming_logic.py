@@ -13,6 +13,7 @@ from utilities.general_farmer_interface import CHECK_IN_HOUR, IFarmer
 from utilities.general_farmer_interface import States as GlobalStates
 from utilities.general_fighter_interface import IBattleStrategy, IFighter
 from utilities.logging_utils import LoggerWrapper
+from utilities.models import UnitTypePredictor
 from utilities.utilities import (
     capture_window,
     determine_unit_types,
@@ -36,9 +37,13 @@ class States(Enum):
 
 class DemonKingFarmer(IFarmer):
 
+    # To read the colors of the units
+    required_models = (UnitTypePredictor,)
+
     num_fights = 0
 
     num_clears = 0
+    checkpoint_attributes = ("num_fights", "num_clears")
 
     dk_difficulty = "hard"
 
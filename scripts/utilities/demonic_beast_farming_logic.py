@@ -44,6 +44,8 @@ class DemonicBeastFarmer(IFarmer):
     # Beast search swipe counter; class-level to survive FarmingFactory crash recovery (same pattern as num_victories).
     _swipe_attempts = 0
 
+    checkpoint_attributes = ("current_floor", "num_floor_3_victories", "num_victories", "num_losses", "_swipe_attempts")
+
     def __init__(
         self,
         starting_state=States.GOING_TO_DB,
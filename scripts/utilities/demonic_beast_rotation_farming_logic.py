@@ -65,6 +65,7 @@ class DemonicBeastRotationFarmer(DemonicBeastFarmer):
     _selected_beast_keys: tuple[str, ...] = BEAST_ORDER
     _active_beast_index = 0
     _switch_from_beast_key: str | None = None
+    checkpoint_attributes = ("_selected_beast_keys", "_active_beast_index", "_switch_from_beast_key")
 
     def __init__(
         self,
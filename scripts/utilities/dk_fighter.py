@@ -143,4 +143,4 @@ class DemonKingFighter(IFighter):
                 DemonKingFighter.first_turn = True
                 return
 
-            time.sleep(0.7)
+            self.wait_for_next_iteration(0.7)
@@ -1,6 +1,6 @@
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
 from utilities.utilities import capture_window, crop_region, find
@@ -45,7 +45,7 @@ class DemonKingHellBattleStrategy(IBattleStrategy):
         """We should be able to 1-turn it!"""
         screenshot, _ = capture_window()
 
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
 
         # To try to remove a stance if needed
         picked_stance_removal_ids = sorted(
@@ -8,18 +8,25 @@ from utilities.card_data import Card
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_fighter_interface import FightingStates, IFighter
+from utilities.interrupts import DEMONIC_BEAST_INTERRUPTS
+from utilities.models import CardSlotPredictor
 from utilities.utilities import (
+    CARD_SLOT_REGIONS,
     capture_window,
     click_im,
     draw_rectangles,
     find,
     find_and_click,
+    get_card_slot_images,
     get_card_slot_region_image,
 )
 from utilities.vision import Vision
 
 
 class DogsFighter(IFighter):
+    # Popups that show up during the fights of the demonic beasts
+    interrupts = DEMONIC_BEAST_INTERRUPTS
+
     # Keep track of what floor has been defeated
     floor_defeated = None
 
@@ -35,16 +42,9 @@ class DogsFighter(IFighter):
 
     def fighting_state(self):
 
-        screenshot, window_location = capture_window()
-
-        # In case we've been lazy and it's the first time we're doing Demonic Beast this week...
-        find_and_click(
-            vio.weekly_mission,
-            screenshot,
-            window_location,
-            point_coordinates=Coordinates.get_coordinates("lazy_weekly_bird_mission"),
-        )
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        # Closes the weekly mission and daily quest popups
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # To skip quickly to the rewards when the fight is done
         find_and_click(vio.creature_destroyed, screenshot, window_location)
@@ -98,8 +98,11 @@ class DogsFighter(IFighter):
         # (non-overlapping), so we duplicate the list once to supply the second vote.
         doubled = rectangles + rectangles if rectangles else []
         grouped_rectangles, _ = cv2.groupRectangles(doubled, groupThreshold=1, eps=0.5)
+        if debug:
+            # The slot classifier isn't checked on real battle frames yet: compare it with the templates
+            empty_slots = CardSlotPredictor.predict_empty_slots(get_card_slot_images(screenshot, num_slots=4))
+            print(f"Templates: {len(grouped_rectangles)} empty slots, classifier: {empty_slots.sum()} empty slots.")
         if debug and len(grouped_rectangles):
-            print(f"We have {len(grouped_rectangles)} empty slots.")
             # rectangles_fig = draw_rectangles(screenshot, np.array(rectangles), line_color=(0, 0, 255))
             translated_rectangles = np.array(
                 [
@@ -113,6 +116,14 @@ class DogsFighter(IFighter):
                 ]
             )
             rectangles_fig = draw_rectangles(screenshot, translated_rectangles)
+            # The crops the classifier sees, in red
+            slot_rectangles = np.array(
+                [
+                    [x1, y1, x2 - x1, y2 - y1]
+                    for x1, y1, x2, y2 in map(Coordinates.get_coordinates, CARD_SLOT_REGIONS[:4])
+                ]
+            )
+            rectangles_fig = draw_rectangles(rectangles_fig, slot_rectangles, line_color=(0, 0, 255))
             cv2.imshow("rectangles", rectangles_fig)
             cv2.waitKey(0)
             cv2.destroyAllWindows()
@@ -163,9 +174,8 @@ class DogsFighter(IFighter):
 
     def fight_complete_state(self):
 
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         if find(vio.guaranteed_reward, screenshot):
             DogsFighter.floor_defeated = 3
@@ -182,9 +192,8 @@ class DogsFighter(IFighter):
 
     def defeat_state(self):
         """We've lost the battle..."""
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         find_and_click(vio.ok_main_button, screenshot, window_location)
 
@@ -227,4 +236,4 @@ class DogsFighter(IFighter):
                 print("Closing Fighter thread!")
                 return
 
-            time.sleep(0.5)
+            self.wait_for_next_iteration(0.5)
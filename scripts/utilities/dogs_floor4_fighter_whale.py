@@ -12,6 +12,7 @@ from utilities.dogs_floor4_fighting_strategies_whale import (
     DogsFloor4WhaleBattleStrategy,
 )
 from utilities.general_fighter_interface import FightingStates, IFighter
+from utilities.hand_cache import hand_cache
 from utilities.utilities import capture_window, click_im, find
 
 
@@ -239,6 +240,7 @@ class DogsFloor4FighterWhale(DogsFighter):
 
     def finish_turn(self):
         IFighter._phase_turn_started_for_current_turn = False
+        hand_cache.clear()
         self._reset_slot_stall_guard()
         self._reset_instance_variables()
         print("Finished my turn!")
@@ -1,10 +1,9 @@
-import time
 from collections.abc import Sequence
-from copy import copy, deepcopy
 from typing import Final
 
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, copy_hand
+from utilities.card_identity import card_identity_index
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
 from utilities.utilities import (
@@ -13,6 +12,7 @@ from utilities.utilities import (
     determine_card_merge,
     find,
     find_and_click,
+    wait_for_game,
 )
 
 ESCALIN_TEMPLATES: Final[tuple[str, ...]] = ("escalin_st", "escalin_aoe", "escalin_ult")
@@ -161,7 +161,7 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
             screenshot, window_location = capture_window()
             if find_and_click(vio.talent_escalin, screenshot, window_location, threshold=0.7):
                 print("Phase 1: activating Escalin talent!")
-                time.sleep(2.5)
+                wait_for_game(2.5)
 
         # First, play one eligible stance-control card on odd turns; otherwise hide it from Smarter.
         attack_debuff_ids = self._stance_control_card_ids(hand_of_cards)
@@ -464,13 +464,13 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
             ):
                 print("Phase 3: activating Escalin talent!")
                 DogsFloor4BattleStrategy.taunt_removed = True
-                time.sleep(2.5)
+                wait_for_game(2.5)
 
             if len(played_st_gauge_ids) == 1:
                 # Gotta click light dog after we've played the first remove gauge card
                 print("Clicking light dog after playing the first remove gauge card!")
                 click_im(Coordinates.get_coordinates("light_dog"), window_location)
-                time.sleep(1)
+                wait_for_game(1)
 
             if aoe_gauge_ids:
                 DogsFloor4BattleStrategy.removed_damage_cap = True
@@ -622,7 +622,7 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
         if drag is None or card_turn != 0 or DogsFloor4BattleStrategy.taunt_removed:
             return
 
-        future_hand = deepcopy(hand_of_cards)
+        future_hand = copy_hand(hand_of_cards)
         for card in future_hand:
             if self._card_matches_any(card, self._gauge_removal_templates()):
                 card.card_type = CardTypes.ATTACK
@@ -642,7 +642,7 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
         if find_and_click(vio.talent_escalin, screenshot, window_location, threshold=0.7):
             print("Phase 3: activating Escalin talent before gauge merge!")
             DogsFloor4BattleStrategy.taunt_removed = True
-            time.sleep(2.5)
+            wait_for_game(2.5)
 
     def _matching_card_ids(
         self,
@@ -687,7 +687,7 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
         n = len(hand_of_cards)
         if n < 2:
             return None
-        scan = deepcopy(hand_of_cards)
+        scan = copy_hand(hand_of_cards)
         for card in scan:
             if self._card_matches_any(card, templates):
                 card.card_type = CardTypes.ATTACK
@@ -711,6 +711,4 @@ class DogsFloor4BattleStrategy(IBattleStrategy):
         return best
 
     def _card_matches_any(self, card: Card, template_names: Sequence[str]) -> bool:
-        if card.card_image is None:
-            return False
-        return any(find(getattr(vio, template_name), card.card_image) for template_name in template_names)
+        return card_identity_index.matches_any(card, template_names)
@@ -1,13 +1,13 @@
 import time
 from collections.abc import Sequence
-from copy import deepcopy
 from typing import Final
 
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, copy_hand
+from utilities.card_identity import card_identity_index
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy
-from utilities.utilities import capture_window, click_im, determine_card_merge, find
+from utilities.utilities import capture_window, click_im, determine_card_merge, find, wait_for_game
 
 ESCALIN_TEMPLATES: Final[tuple[str, ...]] = ("escalin_st", "escalin_aoe", "escalin_ult")
 MELI3K_TEMPLATES: Final[tuple[str, ...]] = ("meli3k_st", "meli3k_aoe", "meli3k_ult")
@@ -29,6 +29,8 @@ PHASE2_ODD_STANCE_SINS_TEMPLATES: Final[tuple[str, ...]] = (
 class DogsFloor4WhaleBattleStrategy(IBattleStrategy):
     """Dogs Floor 4 whale strategy for Escalin, Meli3k, Blue Gowther, and Nasiens."""
 
+    identity_templates = MERGE_GUARD_TEMPLATES
+
     turn = 0
     _phase_initialized = set()
     _last_phase_seen = None
@@ -710,11 +712,11 @@ class DogsFloor4WhaleBattleStrategy(IBattleStrategy):
 
             deadline = time.perf_counter() + 1.2
             while time.perf_counter() < deadline:
-                time.sleep(0.08)
+                wait_for_game(0.08)
                 screenshot, _ = capture_window()
                 if not self._dogs_talent_marker_visible(screenshot):
                     print(f"Dogs Floor 4 whale mode: confirmed Escalin talent for {context_label}.")
-                    time.sleep(2.5)
+                    wait_for_game(2.5)
                     return True
 
             if not marker_was_visible:
@@ -722,7 +724,7 @@ class DogsFloor4WhaleBattleStrategy(IBattleStrategy):
                     "Dogs Floor 4 whale mode: the Dogs talent marker was not visible before the click, "
                     "so proceeding after the normal talent delay."
                 )
-                time.sleep(2.5)
+                wait_for_game(2.5)
                 return True
 
         self.request_fight_reset(
@@ -850,7 +852,7 @@ class DogsFloor4WhaleBattleStrategy(IBattleStrategy):
         n = len(hand_of_cards)
         if n < 2:
             return None
-        scan = deepcopy(hand_of_cards)
+        scan = copy_hand(hand_of_cards)
         for card in scan:
             if self._card_matches_any(card, templates):
                 card.card_type = CardTypes.ATTACK
@@ -874,20 +876,10 @@ class DogsFloor4WhaleBattleStrategy(IBattleStrategy):
         return best
 
     def _card_matches_any(self, card: Card, template_names: Sequence[str]) -> bool:
-        if card.card_image is None:
-            return False
-        for template_name in template_names:
-            vision = getattr(vio, template_name, None)
-            if vision is None:
-                continue
-            if find(vision, card.card_image):
-                return True
-        return False
+        return card_identity_index.matches_any(card, template_names)
 
     def _card_template_name(self, card: Card, template_names: Sequence[str]) -> str | None:
-        return next(
-            (template_name for template_name in template_names if self._card_matches_any(card, (template_name,))), None
-        )
+        return card_identity_index.template_name(card, template_names)
 
     def estimate_auto_merge_count_after_play(self, hand_of_cards: list[Card], played_idx: int) -> int:
         if not (0 <= played_idx < len(hand_of_cards)):
@@ -4,8 +4,10 @@ import time
 
 from utilities.app_config import click_tracker, config
 from utilities.capture_window import capture_window
+from utilities.checkpoints import options_fingerprint
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_farmer_interface import IFarmer
+from utilities.models import IModel, warm_up_models
 from utilities.utilities import re_open_7ds_window, send_push_notification
 
 _POLL_INTERVAL_SECONDS = 2.0
@@ -133,6 +135,13 @@ class FarmingFactory:
                 incident_notification_count += 1
                 last_notification_time = now
 
+    @staticmethod
+    def _models_to_warm_up(farmer: type[IFarmer], battle_strategy: type[IBattleStrategy] | None) -> list[type[IModel]]:
+        """The models the farmer and its battle strategy will need. Farmers without an explicit strategy use a
+        default one, which still reads the hand"""
+        strategy_models = (battle_strategy or IBattleStrategy).required_models
+        return list(dict.fromkeys(farmer.required_models + strategy_models))
+
     @staticmethod
     def main_loop(farmer: IFarmer, starting_state, battle_strategy: IBattleStrategy | None = None, **kwargs):
         """Defined for any subclass of the interface IFarmer, and any subclass of the interface IBattleStrategy"""
@@ -149,6 +158,22 @@ class FarmingFactory:
         )
         runtime_monitor_thread.start()
 
+        # Load the models in the background, so that the first turn of the first fight doesn't stall on them.
+        # Fighters only wait if they need a model that is still loading.
+        threading.Thread(
+            target=warm_up_models,
+            args=(FarmingFactory._models_to_warm_up(farmer, battle_strategy),),
+            daemon=True,
+        ).start()
+
+        # Resume the same farm from its checkpoint, if a previous process was stopped in the middle of it
+        checkpointed = hasattr(farmer, "restore_checkpoint")
+        if checkpointed:
+            fingerprint = options_fingerprint(
+                farmer.__qualname__, starting_state, battle_strategy, sorted(kwargs.items(), key=lambda item: item[0])
+            )
+            starting_state = farmer.restore_checkpoint(fingerprint, starting_state)
+
         try:
             while True:
                 farmer_instance: IFarmer | None = None
@@ -168,6 +193,8 @@ class FarmingFactory:
 
                 except KeyboardInterrupt as e:
                     print(f"{e}: Exiting the program.")
+                    if checkpointed:
+                        farmer.clear_checkpoint()
                     break
 
                 except Exception as e:
@@ -175,6 +202,8 @@ class FarmingFactory:
 
                     if farmer_instance is not None and hasattr(farmer_instance, "current_state"):
                         starting_state = farmer_instance.current_state
+                    if farmer_instance is not None and hasattr(farmer_instance, "save_checkpoint"):
+                        farmer_instance.save_checkpoint(force=True)
 
                     if game_opened := re_open_7ds_window():
                         print("Re-opened the game, we'll try to login immediately!")
@@ -187,6 +216,8 @@ class FarmingFactory:
                     print("FINALLY:")
                     if farmer_instance is not None and hasattr(farmer_instance, "exit_message"):
                         farmer_instance.exit_message()
+                    if farmer_instance is not None and hasattr(farmer_instance, "print_polling_report"):
+                        farmer_instance.print_polling_report()
 
                     if farmer_instance is not None and hasattr(farmer_instance, "stop_fighter_thread"):
                         farmer_instance.stop_fighter_thread()
@@ -0,0 +1,84 @@
+"""On-disk cache of the features extracted from the datasets in 'data/', for `model_trainer.py`.
+
+Features are cached per dataset shard (see `utilities.datasets`), keyed by the hash of the shard contents, the name of
+the feature extractor and its parameters. Only new or changed shards go through the extractor again. Features are
+stored as plain `.npy` arrays and memory-mapped when read back.
+"""
+
+import hashlib
+import json
+import os
+from typing import Callable
+
+import numpy as np
+from utilities.datasets import DatasetShard, dataset_shards, held_out_mask
+
+FEATURE_CACHE_DIR = os.path.join("data", ".feature_cache")
+
+
+def feature_cache_key(shard_hash: str, feature_extractor: Callable, extractor_params: dict) -> str:
+    """Key of the features of one dataset shard. Parameters are serialized in a stable way, tuples and lists alike"""
+    description = json.dumps([shard_hash, feature_extractor.__name__, extractor_params], sort_keys=True, default=str)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def _cache_paths(key: str) -> tuple[str, str]:
+    return (
+        os.path.join(FEATURE_CACHE_DIR, f"{key}.features.npy"),
+        os.path.join(FEATURE_CACHE_DIR, f"{key}.labels.npy"),
+    )
+
+
+def _save_array(path: str, array: np.ndarray):
+    """Write the array next to its final path and move it there, so that interrupted runs don't leave broken files"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        # Labels may be enums, which need pickling
+        np.save(f, array, allow_pickle=array.dtype == object)
+    os.replace(tmp_path, path)
+
+
+def load_shard_features(
+    shard: DatasetShard, feature_extractor: Callable, **extractor_params
+) -> tuple[np.ndarray, np.ndarray]:
+    """Features and labels of a single dataset shard, extracting them only if they aren't cached yet"""
+    key = feature_cache_key(shard.checksum(), feature_extractor, extractor_params)
+    features_path, labels_path = _cache_paths(key)
+
+    if os.path.exists(features_path) and os.path.exists(labels_path):
+        features = np.load(features_path, mmap_mode="r")
+        labels = np.load(labels_path, allow_pickle=True)
+        return features, labels
+
+    print(f"Extracting features from {shard.images_path}...")
+    data, labels = shard.load(mmap=True)
+    features = feature_extractor(data if isinstance(data, list) else np.asarray(data), **extractor_params)
+
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    _save_array(features_path, np.asarray(features))
+    _save_array(labels_path, labels)
+    return features, labels
+
+
+def load_cached_features(
+    glob_pattern: str, feature_extractor: Callable, split: str | None = None, **extractor_params
+) -> tuple[np.ndarray, np.ndarray]:
+    """Features and labels of all the datasets matching the pattern, like `feature_extractor(dataset)` on the result
+    of `load_dataset(glob_pattern)`, but cached per shard.
+    `split` keeps only the samples used for training ("train") or only the held out ones ("held_out")"""
+    if split not in {None, "train", "held_out"}:
+        raise ValueError(f"Unknown split '{split}', pick between 'train' and 'held_out'")
+
+    all_features = []
+    all_labels = []
+    for shard in dataset_shards(glob_pattern):
+        features, labels = load_shard_features(shard, feature_extractor, **extractor_params)
+        if split is not None:
+            mask = held_out_mask(shard, len(labels))
+            if split == "train":
+                mask = ~mask
+            features, labels = features[mask], labels[mask]
+        all_features.append(features)
+        all_labels.append(labels)
+
+    return np.concatenate(all_features, axis=0), np.concatenate(all_labels, axis=0)
@@ -4,13 +4,11 @@ to be used in pattern matching algorithms.
 NOTE: ORB doesn't work with small images (e.g., single cards)!
 """
 
-import os
+from functools import lru_cache
 
 import cv2
 import numpy as np
 
-os.environ["LOKY_MAX_CPU_COUNT"] = "1"  # Replace '4' with the number of cores you want to use
-
 
 def extract_orb_features(image: np.ndarray, max_features=10):
     """Run the ORB detection algorithm. Fails on small images."""
@@ -49,6 +47,50 @@ def plot_orb_keypoints(image: np.ndarray):
     return cv2.drawKeypoints(image, kp, None, color=(0, 255, 0), flags=0)
 
 
+# Value ranges of the HSV channels of 8-bit images in OpenCV
+_HSV_RANGES = ((0, 180), (0, 256), (0, 256))
+
+
+@lru_cache(maxsize=8)
+def _histogram_bin_lookup_tables(bins: tuple[int, int, int]) -> np.ndarray:
+    """For each HSV channel, the bin of every possible 8-bit value, exactly as `cv2.calcHist` computes it.
+    Values outside of the channel range get an out-of-range bin, and the bins are pre-multiplied by the strides
+    of the flattened 3D histogram, so that the bin of a pixel is simply the sum of its 3 lookups."""
+    strides = (bins[1] * bins[2], bins[2], 1)
+    out_of_range = bins[0] * bins[1] * bins[2]
+    values = np.arange(256)
+    tables = []
+    for num_bins, (low, high), stride in zip(bins, _HSV_RANGES, strides):
+        scale = num_bins / (high - low)
+        channel_bins = np.clip(np.floor(values * scale - low * scale).astype(int), 0, num_bins - 1)
+        tables.append(np.where((values >= low) & (values < high), channel_bins * stride, out_of_range))
+    return np.stack(tables)
+
+
+def _batch_color_histograms(batch: np.ndarray, bins: tuple[int, int, int]) -> np.ndarray:
+    """L2-normalized HSV histograms of a whole (N, H, W, 3) batch at once, identical to running `cv2.calcHist`
+    and `cv2.normalize` on each image"""
+    num_images = batch.shape[0]
+    num_bins = bins[0] * bins[1] * bins[2]
+
+    # The color conversion is per pixel, so the whole batch can go through it as a single tall image
+    hsv = cv2.cvtColor(np.ascontiguousarray(batch).reshape(-1, batch.shape[2], 3), cv2.COLOR_BGR2HSV)
+    hsv = hsv.reshape(num_images, -1, 3)
+
+    lookup_tables = _histogram_bin_lookup_tables(tuple(bins))
+    pixel_bins = lookup_tables[0][hsv[..., 0]] + lookup_tables[1][hsv[..., 1]] + lookup_tables[2][hsv[..., 2]]
+    # Offset the bins of every image, so that a single `bincount` computes all histograms. The extra bin of
+    # each image collects the out-of-range pixels
+    pixel_bins += np.arange(num_images)[:, np.newaxis] * (num_bins + 1)
+    counts = np.bincount(pixel_bins.ravel(), minlength=num_images * (num_bins + 1))
+    histograms = counts.reshape(num_images, num_bins + 1)[:, :num_bins].astype(np.float32)
+
+    # Same as `cv2.normalize`: the norm is computed in double precision, the scaling in single precision
+    norms = np.sqrt(np.sum(histograms.astype(np.float64) ** 2, axis=1))
+    scales = np.where(norms > np.finfo(np.float64).eps, 1 / np.maximum(norms, np.finfo(np.float64).eps), 0)
+    return histograms * scales.astype(np.float32)[:, np.newaxis]
+
+
 # Function to extract color histogram features
 def extract_color_histograms_features(
     images: np.ndarray | list[np.ndarray], bins: tuple[int, int, int] = (8, 8, 8)
@@ -71,13 +113,7 @@ def extract_color_histograms_features(
         if batch.ndim != 4 or batch.shape[-1] != 3:
             raise ValueError(f"Each batch must have shape (N, H, W, 3), got {batch.shape}")
 
-        histograms = []
-        for img in batch:
-            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-            hist = cv2.calcHist([hsv], [0, 1, 2], None, bins, [0, 180, 0, 256, 0, 256])
-            cv2.normalize(hist, hist)
-            histograms.append(hist.flatten())
-        return np.array(histograms)
+        return _batch_color_histograms(batch, bins)
 
     # If single 4D array, process directly
     if isinstance(images, np.ndarray):
@@ -109,13 +145,11 @@ def extract_difference_of_histograms_features(images: np.ndarray) -> np.ndarray:
         # Assume it's an array, add the batch dimension
         images = images[np.newaxis, ...]
 
-    features = []
-
-    for batch_image in images:
-        # For each image in the batch, compute the color histogram difference between the two images,
-        # and append it to the list of features
-        histograms = extract_color_histograms_features(batch_image)
-        features.append(np.linalg.norm(histograms[0] - histograms[1]))
+    # Compute the color histograms of all the images at once, then the difference between the two of each pair
+    histograms = extract_color_histograms_features(images.reshape(-1, *images.shape[2:]))
+    differences = histograms.reshape(images.shape[0], images.shape[1], -1)
+    differences = differences[:, 0] - differences[:, 1]
+    features = [np.linalg.norm(difference) for difference in differences]
 
     # Add the final feature dimension, to make it shape (batch, 1)
     return np.array(features)[..., np.newaxis]
@@ -177,3 +211,24 @@ def extract_single_channel_features(images: np.ndarray, type="median") -> np.nda
     feature = feature_func(images, axis=(1, 2))
 
     return feature[..., np.newaxis]  # Add the feature dimension
+
+
+def perceptual_hash(image: np.ndarray, hash_size: int = 8) -> int:
+    """Average hash of each color channel, packed in a single integer. Images that look alike (e.g., the same card
+    captured twice, with some noise) have hashes that differ in only a few bits. A stack of images, like the card pairs
+    of the merges dataset, is hashed side by side."""
+
+    if image.ndim == 4:
+        image = np.concatenate(list(image), axis=1)
+    if image.ndim == 2:
+        image = image[..., np.newaxis]
+
+    small_image = cv2.resize(image.astype(np.float32), (hash_size, hash_size), interpolation=cv2.INTER_AREA)
+    small_image = small_image.reshape(hash_size * hash_size, -1)
+    bits = (small_image > small_image.mean(axis=0)).T.ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_distance(hash_1: int, hash_2: int) -> int:
+    """Number of different bits between two perceptual hashes"""
+    return (hash_1 ^ hash_2).bit_count()
@@ -2,14 +2,19 @@
 VERY IMPORTANT: They should be independent from the activity they are used on"""
 
 import abc
-from copy import deepcopy
+import importlib
 from numbers import Integral
 
 import numpy as np
 import utilities.vision_images as vio
+from utilities.app_config import config
 from utilities.battle_utilities import process_card_move, process_card_play
-from utilities.card_data import Card, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array, card_types_array, copy_hand
+from utilities.card_identity import card_identity_index
+from utilities.hand_recorder import hand_recorder
 from utilities.logging_utils import LoggerWrapper
+from utilities.models import HAND_MODELS, IModel
+from utilities.turn_planner import plan_turn
 from utilities.utilities import (
     capture_window,
     determine_card_merge,
@@ -17,6 +22,7 @@ from utilities.utilities import (
     find,
     get_hand_cards,
     get_hand_cards_3_cards,
+    hand_merge_matrix,
 )
 
 logger = LoggerWrapper(name="FightingStrategies", log_file="fighter.log")
@@ -35,6 +41,15 @@ class IBattleStrategy(abc.ABC):
     # How many turns have started in the current phase? The first started turn is 1.
     phase_turn = 0
 
+    # Card templates the strategy identifies cards with. The whole hand is matched against them once per read
+    identity_templates: tuple[str, ...] = ()
+
+    # Models the strategy predicts with, to be loaded in the background when the farmer starts
+    required_models: tuple[type[IModel], ...] = HAND_MODELS
+
+    # Rest of the planned turn, as (phase turn, card turn, predicted hand, action) per card slot (see `evaluate_turn`)
+    _turn_plan: list[tuple[int, int, list[Card], CardAction]] = []
+
     def increment_phase_turn(self):
         """Advance to the next started turn within the current phase."""
         IBattleStrategy.phase_turn += 1
@@ -48,18 +63,88 @@ class IBattleStrategy(abc.ABC):
     ) -> tuple[list[Card], list[CardAction]]:
         """**kwargs just for compatibility across classes and subclasses. Probably not the best coding..."""
 
+        # The rest of a planned turn doesn't need to read the hand again
+        if (planned_action := self._next_planned_action(kwargs.get("card_turn", 0))) is not None:
+            return planned_action
+
+        # Extract the hand cards for this specific click
+        hand_of_cards: list[Card] = get_hand_cards(num_units=num_units)
+        if not hand_recorder.enabled:
+            return self.pick_cards_from_hand(hand_of_cards, picked_cards, **kwargs)
+
+        # Keep the hand as it was read, and the screen the strategy sees, to replay the decision offline
+        read_hand, read_picked_cards = copy_hand(hand_of_cards), copy_hand(picked_cards or [])
+        phase_turn, (screenshot, _) = IBattleStrategy.phase_turn, capture_window()
+        original_hand_of_cards, card_indices = self.pick_cards_from_hand(hand_of_cards, picked_cards, **kwargs)
+        hand_recorder.record(
+            strategy_name(type(self)),
+            read_hand,
+            read_picked_cards,
+            screenshot,
+            phase_turn,
+            {"num_units": num_units, **kwargs},
+            card_indices[0] if card_indices else None,
+        )
+        return original_hand_of_cards, card_indices
+
+    def pick_turn(
+        self, picked_cards: list[Card] = None, num_units=4, card_turn: int = 0, card_slots: int = 0, **kwargs
+    ) -> list[tuple[list[Card], CardAction]]:
+        """The actions for the rest of the turn, from `card_turn` to `card_slots`, reading the hand only once.
+        Each action comes with the hand it has to be played on, as predicted after the previous actions (the cards
+        keep the positions of the hand read). The prediction stops after an action the strategy handled itself"""
+        picked_cards = copy_hand(picked_cards) if picked_cards is not None else [Card() for _ in range(card_slots)]
+        hand_of_cards, card_indices = self.pick_cards(
+            picked_cards, num_units, card_turn=card_turn, card_slots=card_slots, **kwargs
+        )
+        read_rectangles = [card.rectangle for card in hand_of_cards]
+        turn_actions = [(hand_of_cards, card_indices[0])]
+
+        for next_card_turn in range(card_turn + 1, card_slots):
+            hand, action = turn_actions[-1]
+            if action is None:
+                break
+            if isinstance(action, Integral):
+                # Negative indices too, so that the merge rules see the actual position
+                action %= len(hand)
+                if next_card_turn - 1 < len(picked_cards):
+                    picked_cards[next_card_turn - 1] = hand[action]
+
+            planned_action = self._next_planned_action(next_card_turn)
+            if planned_action is None:
+                next_hand = self._update_hand_of_cards(copy_hand(hand), [action])
+                for card, rectangle in zip(next_hand, read_rectangles):
+                    card.rectangle = rectangle
+                planned_action = self.pick_cards_from_hand(
+                    next_hand, picked_cards, card_turn=next_card_turn, card_slots=card_slots, **kwargs
+                )
+            turn_actions.append((planned_action[0], planned_action[1][0]))
+
+        return turn_actions
+
+    def pick_cards_from_hand(
+        self, hand_of_cards: list[Card], picked_cards: list[Card] = None, **kwargs
+    ) -> tuple[list[Card], list[CardAction]]:
+        """Same as `pick_cards`, on a hand that was already read (or simulated). The hand may be modified"""
+
         if picked_cards is None:
             picked_cards: list[Card] = []
 
         card_turn = kwargs.get("card_turn", 0)
 
         # Assign the given picked cards to the class variable
-        IBattleStrategy.picked_cards = deepcopy(picked_cards)
+        IBattleStrategy.picked_cards = copy_hand(picked_cards)
         IBattleStrategy.card_turn = card_turn
 
-        # Extract the hand cards for this specific click
-        hand_of_cards: list[Card] = get_hand_cards(num_units=num_units)
-        original_hand_of_cards = deepcopy(hand_of_cards)
+        card_identity_index.identify_hand(hand_of_cards, self.identity_templates)
+        hand_merge_matrix.update(hand_of_cards)
+
+        if (planned_action := self._plan_turn(hand_of_cards, **kwargs)) is not None:
+            IBattleStrategy.card_turn = 0
+            IBattleStrategy.picked_cards = []
+            return planned_action
+
+        original_hand_of_cards = copy_hand(hand_of_cards)
 
         print("Card types:", [card.card_type.name for card in hand_of_cards])
         # print("Card ranks:", [card.card_rank.name for card in hand_of_cards])
@@ -102,6 +187,59 @@ class IBattleStrategy(abc.ABC):
         # Return the result afterwards
         return original_hand_of_cards, card_indices
 
+    def evaluate_turn(self, hand_of_cards: list[Card], played_cards: list[Card], **kwargs) -> float | None:
+        """Score of the hand left and of the cards played (in order) by the end of a turn. Higher is better.
+        Strategies that return a score get their whole turns planned at once, if `plan_whole_turns` is enabled
+        in the config; the default `None` keeps picking card by card through `get_next_card_index`."""
+        return None
+
+    def _plan_turn(
+        self, hand_of_cards: list[Card], card_turn: int = 0, card_slots: int = 0, **kwargs
+    ) -> tuple[list[Card], list[CardAction]] | None:
+        """Plan the rest of the turn, and return its first action like `pick_cards`, if the strategy plans turns"""
+        IBattleStrategy._turn_plan = []
+        if (
+            card_slots <= card_turn
+            or not config.get("plan_whole_turns", False)
+            or self.evaluate_turn(hand_of_cards, [], **kwargs) is None
+        ):
+            return None
+
+        plan = plan_turn(
+            hand_of_cards,
+            card_slots - card_turn,
+            lambda hand, played_cards: self.evaluate_turn(hand, played_cards, **kwargs),
+            played_cards=IBattleStrategy.picked_cards[:card_turn],
+            time_budget=float(config.get("turn_planner_time_budget_ms", 20)) / 1000,
+        )
+        if not plan.actions:
+            return None
+        print(
+            f"Planned {len(plan.actions)} actions: {plan.actions} "
+            f"({plan.explored_states} states{'' if plan.complete else ', out of time'})"
+        )
+
+        # Predicted hands keep the positions of the hand that was read, to click on them
+        for hand in plan.hands[1:]:
+            for card, read_card in zip(hand, hand_of_cards):
+                card.rectangle = read_card.rectangle
+        IBattleStrategy._turn_plan = [
+            (IBattleStrategy.phase_turn, card_turn + i, hand, action)
+            for i, (hand, action) in enumerate(zip(plan.hands, plan.actions))
+        ][1:]
+        return plan.hands[0], [plan.actions[0]]
+
+    def _next_planned_action(self, card_turn: int) -> tuple[list[Card], list[CardAction]] | None:
+        """The planned action for this card turn, if it's still the turn that was planned"""
+        if not IBattleStrategy._turn_plan:
+            return None
+        phase_turn, planned_card_turn, hand, action = IBattleStrategy._turn_plan.pop(0)
+        if (phase_turn, planned_card_turn) != (IBattleStrategy.phase_turn, card_turn):
+            # Something didn't go as planned, read the hand again
+            IBattleStrategy._turn_plan = []
+            return None
+        return copy_hand(hand), [action]
+
     def _update_hand_of_cards(self, house_of_cards: list[Card], indices: list[CardAction]) -> list[Card]:
         """Given the selected indices, select the cards accounting for card shifts.
 
@@ -144,6 +282,33 @@ class SmarterBattleStrategy(IBattleStrategy):
     """This strategy assumes the card types can be read properly.
     It prioritizes one recovery and one stance card, and then it picks attack cards for the remaining slots."""
 
+    # How much a card is worth, by rank, when planning whole turns
+    _RANK_VALUES = {CardRanks.BRONZE: 1.0, CardRanks.SILVER: 2.0, CardRanks.GOLD: 3.5, CardRanks.ULTIMATE: 4.0}
+
+    def evaluate_turn(self, hand_of_cards: list[Card], played_cards: list[Card], **kwargs) -> float:
+        """The same priorities as `get_next_card_index`: one stance, buff and recovery card are worth more than any
+        attack card, attack cards are worth their rank, and merged cards kept in the hand are worth a bit too"""
+        score = 0.0
+        played_types = set()
+        for card in played_cards:
+            rank_value = self._RANK_VALUES.get(card.card_rank, 0.0)
+            if card.card_type in (CardTypes.ATTACK, CardTypes.ATTACK_DEBUFF, CardTypes.ULTIMATE):
+                score += rank_value
+            if card.card_type == CardTypes.ATTACK_DEBUFF and card.card_type not in played_types:
+                score += 1.0
+            elif card.card_type in (CardTypes.STANCE, CardTypes.BUFF) and card.card_type not in played_types:
+                score += 3.0 + rank_value
+            elif card.card_type == CardTypes.RECOVERY and not played_types & {CardTypes.RECOVERY, CardTypes.STANCE}:
+                score += 3.0 + rank_value
+            played_types.add(card.card_type)
+
+        score += 0.25 * sum(
+            self._RANK_VALUES[card.card_rank] - 1.0
+            for card in hand_of_cards
+            if card.card_rank in (CardRanks.SILVER, CardRanks.GOLD)
+        )
+        return score
+
     @staticmethod
     def _rightmost_playable_fallback_index(hand_of_cards: list[Card]) -> int:
         """Prefer rightmost non-GROUND/NONE/DISABLED; if only DISABLED remains, use rightmost DISABLED."""
@@ -161,9 +326,9 @@ class SmarterBattleStrategy(IBattleStrategy):
         """Apply the logic to extract the right indices."""
 
         # Extract the card types and ranks, and reverse the list to give higher priority to rightmost cards (to maximize card rotation)
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
-        picked_card_types = np.array([card.card_type.value for card in picked_cards])
+        card_types = card_types_array(hand_of_cards)
+        card_ranks = card_ranks_array(hand_of_cards)
+        picked_card_types = card_types_array(picked_cards)
 
         # STANCE CARDS
         if (stance_idx := play_stance_card(card_types, picked_card_types)) is not None:
@@ -228,7 +393,6 @@ class SmarterBattleStrategy(IBattleStrategy):
 
 def play_stance_card(card_types: np.ndarray, picked_card_types: np.ndarray, card_ranks: np.ndarray = None):
     """Play a stance card if we have it and haven't played it yet"""
-    screenshot, _ = capture_window()
     stance_ids = np.where(card_types == CardTypes.STANCE.value)[0]
     if card_ranks is not None:
         # Play higher ranked cards if possible
@@ -236,10 +400,25 @@ def play_stance_card(card_types: np.ndarray, picked_card_types: np.ndarray, card
     if (
         len(stance_ids)
         and not any(v == CardTypes.STANCE.value for v in picked_card_types)
-        and not find(vio.stance_active, screenshot, threshold=0.5)
+        # Only look at the screen if there's a stance card to play
+        and not find(vio.stance_active, capture_window()[0], threshold=0.5)
     ):
         print("We don't have a stance up, we need to enable it!")
         return stance_ids[-1]
 
     # If we don't find any stance
     return None
+
+
+def strategy_name(strategy_class: type[IBattleStrategy]) -> str:
+    """'<module in utilities>.<class>', as taken by `load_strategy`"""
+    return f"{strategy_class.__module__.removeprefix('utilities.')}.{strategy_class.__name__}"
+
+
+def load_strategy(name: str) -> type[IBattleStrategy]:
+    """A strategy class from its '<module in utilities>.<class>' name"""
+    module_name, class_name = name.rsplit(".", 1)
+    strategy_class = getattr(importlib.import_module(f"utilities.{module_name}"), class_name)
+    if not (isinstance(strategy_class, type) and issubclass(strategy_class, IBattleStrategy)):
+        raise ValueError(f"'{name}' is not a battle strategy")
+    return strategy_class
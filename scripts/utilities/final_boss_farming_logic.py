@@ -5,12 +5,12 @@ import pyautogui as pyautogui
 
 # Import all images
 import utilities.vision_images as vio
+from utilities.app_config import wait_if_paused
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_farmer_interface import IFarmer
 from utilities.utilities import (
     capture_window,
-    check_for_reconnect,
     drag_im,
     find,
     find_and_click,
@@ -29,6 +29,7 @@ class FinalBossFarmer(IFarmer):
 
     # Keep track of how many fights have been done
     num_fights = 0
+    checkpoint_attributes = ("num_fights",)
 
     def __init__(self, battle_strategy: IBattleStrategy = None, starting_state=States.GOING_TO_FB, **kwargs):
         super().__init__()
@@ -174,7 +175,9 @@ class FinalBossFarmer(IFarmer):
 
         while True:
 
-            check_for_reconnect()
+            wait_if_paused()
+            self.interrupts.evaluate(self, groups=("reconnect",))
+            self.save_checkpoint()
 
             if self.current_state == States.GOING_TO_FB:
                 self.going_to_fb_state()
@@ -35,6 +35,7 @@ class IFloor4Farmer(IFarmer):
     reset_count = 0
     dict_of_defeats = defaultdict(int)
     extra_clears_done = 0  # Here because this number changes during farming -- safe againts crashes
+    checkpoint_attributes = ("success_count", "total_count", "reset_count", "dict_of_defeats", "extra_clears_done")
 
     def __init__(
         self,
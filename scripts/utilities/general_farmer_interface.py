@@ -8,14 +8,18 @@ from enum import Enum
 
 import utilities.vision_images as vio
 from utilities.capture_window import capture_window
+from utilities.checkpoints import CheckpointStore, decode_value, encode_value
 from utilities.constants import *
 from utilities.coordinates import Coordinates
 from utilities.daily_farming_logic import DailyFarmer
 from utilities.daily_farming_logic import States as DailyFarmerStates
 from utilities.general_fighter_interface import IFighter
-from utilities.app_config import get_minutes_to_wait_before_login
+from utilities.app_config import config, get_minutes_to_wait_before_login, wait_if_paused
+from utilities.interrupts import RECONNECT, RESTART, Frame, InterruptHandler, InterruptMatch, InterruptRegistry
+from utilities.models import IModel
+from utilities.screen_events import PollingPolicy, PollingScheduler
+from utilities.state_trace import TraceEvents, state_tracer
 from utilities.utilities import (
-    check_for_reconnect,
     close_game,
     drag_im,
     find,
@@ -69,6 +73,13 @@ class IFarmer(metaclass=IFarmerMeta):
     # Keep track of the defeats in an organized manner
     dict_of_defeats = defaultdict(int)
 
+    # Class attributes saved in the checkpoints of the farmer (see `utilities.checkpoints`). Every class lists its own
+    checkpoint_attributes: tuple[str, ...] = ("_stamina_pots", "dict_of_defeats")
+    # Hash of the options the farm was started with, set by `restore_checkpoint`
+    _checkpoint_fingerprint: str = ""
+    _last_checkpoint_time: float = 0.0
+    _last_checkpoint: dict | None = None
+
     # Store the account password in this instance
     password: str | None = None
 
@@ -96,6 +107,14 @@ class IFarmer(metaclass=IFarmerMeta):
     # Preserve reset/check-in intent across FarmingFactory farmer-instance recreation.
     _reset_flow_intent: ResetFlowIntent | None = None
 
+    # Models the farmer itself predicts with, on top of the ones of its battle strategy
+    required_models: tuple[type[IModel], ...] = ()
+
+    # How `run_state_loop` waits in each state when `event_driven_loops` is enabled (see `utilities.screen_events`).
+    # States without a policy react to any change of the screen at least as fast as sleeping the loop's `sleep_seconds`
+    polling_policies: dict = {}
+    _polling_scheduler: PollingScheduler | None = None
+
     def __init__(self, *, do_daily_pvp: bool = False):
         """Just to initialize the Daily Farmer"""
         self._keepalive_until = 0.0
@@ -106,6 +125,13 @@ class IFarmer(metaclass=IFarmerMeta):
             complete_callback=None,
         )
 
+    def __setattr__(self, name, value):
+        if name == "current_state" and state_tracer.enabled:
+            previous_state = getattr(self, "current_state", None)
+            if value != previous_state:
+                state_tracer.record(TraceEvents.STATE, type(self).__name__, **{"from": previous_state, "to": value})
+        super().__setattr__(name, value)
+
     def keep_alive(self, duration_seconds: float = 120, reason: str | None = None):
         """Emit a manual keepalive to temporarily suppress runtime stuck alerts.
 
@@ -165,19 +191,27 @@ class IFarmer(metaclass=IFarmerMeta):
         check_reconnect=True,
         login_check=True,
     ):
-        """Run a farmer's local state machine with shared reconnect/login/global-state handling."""
+        """Run a farmer's local state machine with shared reconnect/login/global-state handling.
+        Every iteration evaluates the farmer's `interrupts` on a single capture of the screen"""
+        groups = {handler.group for handler in self.interrupts.handlers} - {"login"}
+        if not check_reconnect:
+            groups.discard("reconnect")
+
         while True:
-            if check_reconnect and not check_for_reconnect():
+            wait_if_paused()
+            frame = self.interrupts.evaluate(self, groups=groups)
+            if frame.fired("restart"):
                 print("Let's try to log back in immediately...")
                 IFarmer.first_login = True
 
+            self.save_checkpoint()
             self.before_state_loop_iteration()
 
             if login_check:
-                self.check_for_login_state()
+                self.interrupts.evaluate(self, frame.screenshot, frame.window_location, groups=("login",))
 
             if self.handle_global_state(login_return_state):
-                time.sleep(sleep_seconds)
+                self.wait_for_next_iteration(sleep_seconds)
                 continue
 
             state_handler = state_handlers.get(self.current_state)
@@ -185,7 +219,26 @@ class IFarmer(metaclass=IFarmerMeta):
                 self.on_unknown_state()
 
             state_handler()
+            self.wait_for_next_iteration(sleep_seconds)
+
+    def wait_for_next_iteration(self, sleep_seconds: float):
+        """Wait between two iterations of `run_state_loop`: until the screen changes, according to the current state's
+        polling policy, if `event_driven_loops` is enabled; otherwise `sleep_seconds`"""
+        if not config.get("event_driven_loops", False):
             time.sleep(sleep_seconds)
+            return
+        if self._polling_scheduler is None:
+            self._polling_scheduler = PollingScheduler(self.polling_policies)
+        self._polling_scheduler.wait(self.current_state, PollingPolicy.from_sleep(sleep_seconds))
+
+    def print_polling_report(self):
+        """Print the reaction latencies achieved in each state by the event-driven loops of the farmer and its fighter"""
+        schedulers = {"Farmer": self._polling_scheduler}
+        if isinstance(getattr(self, "fighter", None), IFighter):
+            schedulers["Fighter"] = self.fighter.polling_scheduler
+        for name, scheduler in schedulers.items():
+            if scheduler is not None and scheduler.stats:
+                print(f"{name} reaction latencies:\n{scheduler.summary()}")
 
     def stop_fighter_thread(self):
         """Send a STOP signal to the IFighter thread"""
@@ -204,6 +257,85 @@ class IFarmer(metaclass=IFarmerMeta):
             for key, val in IFarmer.dict_of_defeats.items():
                 print(f"* {key} -> Lost {val} times")
 
+    @classmethod
+    def checkpoint_store(cls) -> CheckpointStore:
+        return CheckpointStore(cls.__name__)
+
+    @classmethod
+    def _checkpointed_attributes(cls):
+        """(class, name) of the attributes in the checkpoints, from the `checkpoint_attributes` of every class"""
+        for klass in reversed(cls.__mro__):
+            for name in vars(klass).get("checkpoint_attributes", ()):
+                yield klass, name
+
+    def checkpoint(self) -> dict:
+        """The progress of the farm: its counters, and the state to resume from"""
+        return {
+            "fingerprint": type(self)._checkpoint_fingerprint,
+            "current_state": encode_value(getattr(self, "current_state", None)),
+            "attributes": {
+                f"{klass.__name__}.{name}": encode_value(getattr(klass, name))
+                for klass, name in self._checkpointed_attributes()
+            },
+        }
+
+    def save_checkpoint(self, force: bool = False):
+        """Save the checkpoint if `checkpoint_farmers` is enabled, at most every `checkpoint_interval_seconds`, and
+        only if the farm progressed since the last one"""
+        if not config.get("checkpoint_farmers", False):
+            return
+        now = time.time()
+        cls = type(self)
+        if not force and now - cls._last_checkpoint_time < float(config.get("checkpoint_interval_seconds", 15)):
+            return
+
+        checkpoint = self.checkpoint()
+        if checkpoint != cls._last_checkpoint and cls.checkpoint_store().save(checkpoint):
+            cls._last_checkpoint = checkpoint
+        cls._last_checkpoint_time = now
+
+    @classmethod
+    def restore_checkpoint(cls, fingerprint: str, starting_state):
+        """Restore the counters of the last checkpoint of the same farm (same `fingerprint`), if
+        `checkpoint_farmers` is enabled and it's recent enough. Returns the state to start from"""
+        cls._checkpoint_fingerprint = fingerprint
+        if not config.get("checkpoint_farmers", False):
+            return starting_state
+
+        max_age_seconds = float(config.get("checkpoint_max_age_minutes", 60)) * 60
+        checkpoint = cls.checkpoint_store().load(max_age_seconds)
+        if checkpoint is None:
+            return starting_state
+        if checkpoint.get("fingerprint") != fingerprint:
+            print("Ignoring the checkpoint of a farm started with different options.")
+            return starting_state
+
+        try:
+            attributes = checkpoint["attributes"]
+            restored = {}
+            for klass, name in cls._checkpointed_attributes():
+                key = f"{klass.__name__}.{name}"
+                if key in attributes:
+                    restored[klass, name] = decode_value(attributes[key], like=getattr(klass, name))
+            current_state = decode_value(checkpoint["current_state"])
+        except (KeyError, AttributeError, ValueError, ImportError) as e:
+            print(f"Ignoring an invalid checkpoint: {e}")
+            return starting_state
+
+        for (klass, name), value in restored.items():
+            # `_stamina_pots` is set directly, for `IFarmerMeta` not to count the restored pots as used ones
+            setattr(klass, name, value)
+        cls._last_checkpoint = {key: checkpoint[key] for key in ("fingerprint", "current_state", "attributes")}
+        print(f"Resuming the farm from its checkpoint, in state {current_state}.")
+        return current_state if current_state is not None else starting_state
+
+    @classmethod
+    def clear_checkpoint(cls):
+        """Delete the checkpoint, for the next farm to start from scratch"""
+        if config.get("checkpoint_farmers", False):
+            cls.checkpoint_store().clear()
+        cls._last_checkpoint = None
+
     def fight_complete_callback(self, **kwargs):
         """Callback used for the fighter to notify the farmer when the fight has ended.
         Not abstract since not all farmers use a fighter, and therefore a 'fight complete callback'.
@@ -368,28 +500,54 @@ class IFarmer(metaclass=IFarmerMeta):
             # Skip the checks if we don't have a password
             return
 
-        screenshot, window_location = capture_window()
-
-        # Check if duplicate connection, if so click on 'ok_main_button'
-        if find(vio.duplicate_connection, screenshot):
-            find_and_click(vio.ok_main_button, screenshot, window_location)
-
-            # And close the fighter thread if open
-            self.stop_fighter_thread()
-
-        elif find(vio.password, screenshot) and self.current_state != States.LOGIN_SCREEN:
-            self.current_state = States.LOGIN_SCREEN
-            IFarmer.logged_out_time = time.time()
-            print(f"We've been logged out! Waiting {get_minutes_to_wait_before_login()} mins to log back in...")
-
-            # And close the fighter thread if open
-            self.stop_fighter_thread()
-
-            # Kill the dailies thread if it's running!
-            if IFarmer.dailies_thread is not None and IFarmer.dailies_thread.is_alive():
-                print("We were doing dailies! Let's continue when we log back in...")
-                IFarmer.doing_dailies = True
-                IFarmer.daily_farmer.kill_farmer()
+        self.interrupts.evaluate(self, groups=("login",))
+
+    def _on_duplicate_connection(self, match: InterruptMatch, frame: Frame):
+        """Click on 'ok_main_button', and close the fighter thread if open"""
+        find_and_click(vio.ok_main_button, frame.screenshot, frame.window_location)
+        self.stop_fighter_thread()
+
+    def _on_logged_out(self, match: InterruptMatch, frame: Frame):
+        self.current_state = States.LOGIN_SCREEN
+        IFarmer.logged_out_time = time.time()
+        print(f"We've been logged out! Waiting {get_minutes_to_wait_before_login()} mins to log back in...")
+
+        # And close the fighter thread if open
+        self.stop_fighter_thread()
+
+        # Kill the dailies thread if it's running!
+        if IFarmer.dailies_thread is not None and IFarmer.dailies_thread.is_alive():
+            print("We were doing dailies! Let's continue when we log back in...")
+            IFarmer.doing_dailies = True
+            IFarmer.daily_farmer.kill_farmer()
+
+    # Interrupts handled on every iteration of `run_state_loop`, before the state handler (see `utilities.interrupts`).
+    # Subclasses can add theirs with `IFarmer.interrupts.extended(...)`
+    interrupts = InterruptRegistry(
+        [
+            RECONNECT,
+            RESTART,
+            InterruptHandler(
+                "duplicate_connection",
+                (vio.duplicate_connection,),
+                _on_duplicate_connection,
+                priority=90,
+                exclusive=True,
+                # Skip the login checks if we don't have a password
+                when=lambda _farmer, _screenshot: IFarmer.password is not None,
+                group="login",
+            ),
+            InterruptHandler(
+                "logged_out",
+                (vio.password,),
+                _on_logged_out,
+                priority=80,
+                when=lambda farmer, _screenshot: IFarmer.password is not None
+                and farmer.current_state != States.LOGIN_SCREEN,
+                group="login",
+            ),
+        ]
+    )
 
     def fortune_card_state(self):
         """Open the fortune card"""
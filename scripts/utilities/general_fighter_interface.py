@@ -1,5 +1,4 @@
 import abc
-import copy
 import logging
 import threading
 import time
@@ -9,9 +8,14 @@ from typing import Callable
 
 import numpy as np
 import utilities.vision_images as vio
+from utilities.app_config import config
 from utilities.card_data import Card
 from utilities.fighting_strategies import IBattleStrategy
+from utilities.hand_cache import hand_cache
+from utilities.interrupts import Frame, InterruptRegistry
 from utilities.logging_utils import LoggerWrapper
+from utilities.screen_events import PollingPolicy, PollingScheduler
+from utilities.state_trace import TraceEvents, state_tracer
 from utilities.utilities import (
     capture_hand_image,
     capture_window,
@@ -47,6 +51,27 @@ class IFighter(abc.ABC):
     _phase_turn_started_for_current_turn = False
     turn_end_zero_slot_confirmations = 1
     turn_end_zero_slot_confirmation_delay = 0.25
+    # When playing whole turns, how long a played card has to take its slot
+    whole_turn_slot_timeout = 0.6
+    # Threshold the whole turns are checked with (see `_play_whole_turn`), or `None` for the default of
+    # `count_empty_card_slots`
+    card_slots_threshold: float | None = None
+    # Popups closed by `handle_interrupts`, at the start of the states that may show them (see `utilities.interrupts`)
+    interrupts = InterruptRegistry()
+    # How the `run` loops wait in each state when `event_driven_loops` is enabled (see `utilities.screen_events`):
+    # the turns start when the card slots show up, so the enemy's animations elsewhere don't matter
+    polling_policies: dict[FightingStates, PollingPolicy] = {
+        FightingStates.FIGHTING: PollingPolicy(
+            target_latency=0.4, max_poll_rate=10, min_wait=0.2, timeout=1.0, regions=("card_slots_region",)
+        ),
+        FightingStates.MY_TURN: PollingPolicy(
+            target_latency=0.1,
+            max_poll_rate=20,
+            min_wait=0.05,
+            timeout=0.5,
+            regions=("card_slots_region", "4_cards_region"),
+        ),
+    }
 
     def __init__(self, battle_strategy: IBattleStrategy, callback: Callable | None = None):
         """Initialize the fighter instance with a (optional) callback to call when the fight has finished,
@@ -60,16 +85,38 @@ class IFighter(abc.ABC):
             self.exit_thread = False
 
         self.battle_strategy: IBattleStrategy = battle_strategy()
-        self.complete_callback = callback or (lambda: None)
+        self._farmer_callback = callback or (lambda: None)
+        # Kept across fights, to report the reaction latencies of the whole session
+        self.polling_scheduler = PollingScheduler(self.polling_policies)
 
         self._reset_instance_variables()
 
+    def __setattr__(self, name, value):
+        if name == "current_state" and state_tracer.enabled:
+            previous_state = getattr(self, "current_state", None)
+            if value != previous_state:
+                state_tracer.record(TraceEvents.STATE, type(self).__name__, **{"from": previous_state, "to": value})
+        super().__setattr__(name, value)
+
+    def complete_callback(self, *args, **kwargs):
+        """Notify the farmer that the fight has ended, with the `victory` and the `phase` it's given"""
+        victory = kwargs.get("victory", args[0] if args else None)
+        state_tracer.record(
+            TraceEvents.FIGHT_RESULT,
+            type(self).__name__,
+            victory=bool(victory) if victory is not None else None,
+            phase=IFighter.current_phase,
+        )
+        self._farmer_callback(*args, **kwargs)
+
     def _reset_instance_variables(self):
         with self._lock:
             self.exit_thread = False
             self.current_state = FightingStates.FIGHTING
             self.available_card_slots = 0
             self._consecutive_zero_empty_slot_observations = 0
+            # Whether a whole turn didn't go as planned, to go card by card until the end of the turn
+            self._whole_turn_mismatch = False
             # The hand will be a tuple of: the list of original cards in hand, and the list of indices to play
             self.current_hand: tuple[list[Card], list[int]] = None
             # Reset the list of picked cards
@@ -89,6 +136,7 @@ class IFighter(abc.ABC):
         IFighter.current_phase = self.initial_phase
         IFighter._phase_turn_started_for_current_turn = False
         self.battle_strategy.reset_phase_turn()
+        hand_cache.clear()
 
     def _identify_phase(self, screenshot: np.ndarray) -> int | None:
         """Return a positively identified phase, or ``None`` if the frame is unreadable."""
@@ -123,7 +171,10 @@ class IFighter(abc.ABC):
             return False
 
         print(f"MOVING TO PHASE {new_phase}!")
+        state_tracer.record(TraceEvents.PHASE, type(self).__name__, **{"from": IFighter.current_phase, "to": new_phase})
         IFighter.current_phase = new_phase
+        # Cards may look different in the new phase (e.g., disabled), don't trust previous classifications
+        hand_cache.clear()
         self.battle_strategy.reset_phase_turn()
         IFighter._phase_turn_started_for_current_turn = False
         return True
@@ -192,10 +243,14 @@ class IFighter(abc.ABC):
             self._consecutive_zero_empty_slot_observations = 0
             self._start_phase_turn_if_needed()
 
+            if config.get("play_whole_turns", False) and not self._whole_turn_mismatch:
+                return self._play_whole_turn(slot_index, screenshot, window_location, **kwargs)
+
             # KEY: Read the hand of cards here
             current_hand = self.battle_strategy.pick_cards(
                 picked_cards=self.picked_cards,
                 card_turn=slot_index,
+                card_slots=self.available_card_slots,
                 phase=IFighter.current_phase,
                 floor=IFighter.current_floor,
                 **kwargs,
@@ -239,10 +294,60 @@ class IFighter(abc.ABC):
                 return
             return self.finish_turn()
 
+    def _play_whole_turn(self, slot_index: int, screenshot, window_location, **kwargs):
+        """Read the hand once and play the rest of the turn back to back. After every card, check that it took its
+        slot; otherwise, the hand wasn't what the strategy predicted, so go card by card for the rest of the turn"""
+        turn_actions = self.battle_strategy.pick_turn(
+            picked_cards=self.picked_cards,
+            card_turn=slot_index,
+            card_slots=self.available_card_slots,
+            phase=IFighter.current_phase,
+            floor=IFighter.current_floor,
+            **kwargs,
+        )
+        print(f"Playing the whole turn from slot index {slot_index}: {[action for _, action in turn_actions]}")
+        # The played cards are checked with the fighter's own slot threshold, so count the starting slots with it too
+        empty_card_slots = self._count_empty_card_slots(screenshot)
+
+        for i, (hand, index_to_play) in enumerate(turn_actions):
+            if index_to_play is None:
+                print("Strategy already handled this card turn; reading the hand again.")
+                return
+
+            # Only the first hand was read from the current screen
+            card_played = self._play_card(
+                hand, index=index_to_play, window_location=window_location, screenshot=screenshot if i == 0 else None
+            )
+            if isinstance(index_to_play, Integral):
+                self.picked_cards[slot_index + i] = card_played
+
+            if not self._wait_for_empty_card_slots(empty_card_slots - i - 1):
+                print("The card slots don't match the planned turn, going card by card.")
+                self._whole_turn_mismatch = True
+                return
+
+    def _wait_for_empty_card_slots(self, expected_empty_slots: int) -> bool:
+        """Whether the empty card slots get to the expected number before `whole_turn_slot_timeout`"""
+        deadline = time.perf_counter() + self.whole_turn_slot_timeout
+        while True:
+            screenshot, _ = capture_window()
+            if self._count_empty_card_slots(screenshot) == expected_empty_slots:
+                return True
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def _count_empty_card_slots(self, screenshot) -> int:
+        """Count the empty card slots with the fighter's `card_slots_threshold`"""
+        if self.card_slots_threshold is None:
+            return self.count_empty_card_slots(screenshot)
+        return self.count_empty_card_slots(screenshot, threshold=self.card_slots_threshold)
+
     def finish_turn(self):
         """May need to re-implement (like on Rat Fighter)"""
         print("Finished my turn!")
         IFighter._phase_turn_started_for_current_turn = False
+        hand_cache.clear()
         # Reset variables
         self._reset_instance_variables()
         return 1
@@ -283,7 +388,7 @@ class IFighter(abc.ABC):
             # Just click on the card
             print("Playing card:", card_to_play.card_type.name, card_to_play.card_rank.name)
             self._click_card(card_to_play, window_location)
-            return copy.deepcopy(card_to_play)  # Return the played card, to keep track of it
+            return card_to_play.copy()  # Return the played card, to keep track of it
 
         else:
             # We have to MOVE the card!
@@ -303,6 +408,18 @@ class IFighter(abc.ABC):
         drag_im(origin_point, target_point, window_location=window_location, sleep_after_click=0.1, drag_duration=0.2)
         time.sleep(0.2)
 
+    def handle_interrupts(self) -> Frame:
+        """Capture a frame and close the popups of `interrupts` on it. The state can keep working on the frame"""
+        return self.interrupts.evaluate(self)
+
+    def wait_for_next_iteration(self, sleep_seconds: float = 0.5):
+        """Wait between two iterations of `run`: until the screen changes, according to the current state's polling
+        policy, if `event_driven_loops` is enabled; otherwise `sleep_seconds`"""
+        if not config.get("event_driven_loops", False):
+            time.sleep(sleep_seconds)
+            return
+        self.polling_scheduler.wait(self.current_state, PollingPolicy.from_sleep(sleep_seconds))
+
     @staticmethod
     def run_wrapper(func: Callable):
         """Wrapper to the `run` function to ensure proper clean-up of attributes,
@@ -311,9 +428,17 @@ class IFighter(abc.ABC):
         """
 
         def wrapper_func(self: IFighter, *args, **kwargs):
+            state_tracer.record(
+                TraceEvents.FIGHT_START,
+                type(self).__name__,
+                floor=IFighter.current_floor,
+                phase=IFighter.current_phase,
+                state=self.current_state,
+            )
             try:
                 func(self, *args, **kwargs)
             finally:
+                state_tracer.record(TraceEvents.FIGHT_END, type(self).__name__, state=self.current_state)
                 print("Resetting fighter...")
                 self._reset_instance_variables()
 
@@ -22,6 +22,7 @@ class GoldFarmer(IFarmer):
     """
 
     used_skip_tickets = 0
+    checkpoint_attributes = ("used_skip_tickets",)
 
     def __init__(
         self,
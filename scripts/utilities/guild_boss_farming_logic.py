@@ -30,6 +30,7 @@ class States(Enum):
 class GuildBossFarmer(IFarmer):
 
     num_fights = 0
+    checkpoint_attributes = ("num_fights",)
 
     def __init__(
         self,
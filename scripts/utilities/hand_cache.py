@@ -0,0 +1,77 @@
+"""Content-addressed cache of the hand card classifications.
+
+Between two card picks most of the hand is unchanged (the cards only shift), so the card crops are
+keyed by a small perceptual hash instead of by their slot, and only new or changed crops go through
+the models again. The fighter clears the cache at turn and phase boundaries.
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from utilities.card_data import CardRanks, CardTypes
+
+# Size (width, height) the card crop is downsampled to before hashing
+_HASH_SIZE = (16, 16)
+# Drop the least significant bits of each channel, so that tiny rendering noise doesn't change the hash
+_HASH_QUANTIZATION_SHIFT = 4
+# A hand has 8 cards, so this comfortably holds a whole turn
+_MAX_ENTRIES = 64
+
+
+@dataclass
+class CardClassification:
+    """Everything we know about a card crop, to be copied onto new `Card` instances"""
+
+    card_type: CardTypes
+    card_rank: CardRanks
+    # Shared with every `Card` built from this crop, so template identifications carry over between hand reads
+    template_matches: dict[str, bool] = field(default_factory=dict)
+
+
+def card_perceptual_hash(card_image: np.ndarray) -> bytes:
+    """Quantized, downsampled color thumbnail of the card. Keeps the colors, since ranks differ only by border color"""
+    thumbnail = cv2.resize(card_image, _HASH_SIZE, interpolation=cv2.INTER_AREA)
+    return (thumbnail >> _HASH_QUANTIZATION_SHIFT).tobytes()
+
+
+class HandClassificationCache:
+    """Thread-safe map from card crop hashes to their classifications"""
+
+    def __init__(self, max_entries: int = _MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, CardClassification] = {}
+        self._max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(card_image: np.ndarray, num_units: int = 4) -> tuple:
+        """The cache key of a card crop. The number of units is part of it, since crops are classified differently"""
+        return (num_units, card_image.shape, card_perceptual_hash(card_image))
+
+    def get(self, key: tuple) -> CardClassification | None:
+        with self._lock:
+            classification = self._entries.get(key)
+            if classification is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return classification
+
+    def store(self, key: tuple, classification: CardClassification) -> CardClassification:
+        with self._lock:
+            if len(self._entries) >= self._max_entries:
+                # Simply start over, the cache only needs to hold the current turn
+                self._entries.clear()
+            self._entries[key] = classification
+            return classification
+
+    def clear(self):
+        """Forget all classifications. Called at the end of every turn and on phase changes"""
+        with self._lock:
+            self._entries.clear()
+
+
+hand_cache = HandClassificationCache()
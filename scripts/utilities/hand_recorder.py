@@ -0,0 +1,200 @@
+"""Recordings of the hands that the battle strategies decide on during real fights, to replay them offline.
+
+When `record_battle_hands` is enabled in 'config/config.yaml', every hand read by `IBattleStrategy.pick_cards` is saved
+with everything the decision depended on: the card crops and their classifications, the cards picked so far this turn,
+the screenshot the hand was read from, `phase_turn`, the arguments of `pick_cards` (`card_turn`, `phase`, ...), and
+the action taken. Each hand is a compressed NumPy archive under 'data/battle_records/<session>/', written by a
+background thread so that fights never wait on the disk. If the disk can't keep up, hands are dropped.
+
+Replay them through any strategy with `replay_hands.py`.
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from numbers import Integral
+
+import numpy as np
+from utilities.app_config import config
+from utilities.card_data import Card, CardColors, CardRanks, CardTypes
+
+BATTLE_RECORDS_DIR = os.path.join("data", "battle_records")
+RECORD_FORMAT_VERSION = 1
+
+# Hands waiting for the writer thread
+_MAX_PENDING_RECORDS = 64
+
+
+def action_to_json(action) -> int | list[int] | None:
+    """A card action (`int`, `tuple[int, int]` or `None`) as plain JSON values"""
+    if action is None:
+        return None
+    if isinstance(action, Integral):
+        return int(action)
+    return [int(index) for index in action]
+
+
+def _plain_arguments(arguments: dict) -> dict:
+    """The arguments that can be saved as JSON. The others (e.g. dictionaries of images) aren't recorded"""
+    plain_arguments = {}
+    for name, value in arguments.items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or isinstance(value, (str, bool, int, float)):
+            plain_arguments[name] = value
+    return plain_arguments
+
+
+def _card_to_json(card: Card) -> dict:
+    return {
+        "card_type": card.card_type.name,
+        "card_rank": card.card_rank.name,
+        "card_color": card.card_color.name,
+        "rectangle": [float(value) for value in card.rectangle] if card.rectangle is not None else None,
+        "num_units": card.num_units,
+    }
+
+
+def _card_from_json(card_json: dict, card_image: np.ndarray | None) -> Card:
+    return Card(
+        CardTypes[card_json["card_type"]],
+        card_json["rectangle"],
+        card_image,
+        CardRanks[card_json["card_rank"]],
+        CardColors[card_json["card_color"]],
+        card_json["num_units"],
+    )
+
+
+@dataclass
+class HandRecord:
+    """A hand that a strategy decided on, and the action it took"""
+
+    strategy: str
+    hand_of_cards: list[Card]
+    picked_cards: list[Card]
+    # Full screenshot, for the strategies that look at the screen (e.g. to check if a stance is active)
+    screenshot: np.ndarray | None
+    phase_turn: int
+    # Keyword arguments of `pick_cards` that are plain values, like `card_turn`, `phase` and `floor`
+    arguments: dict
+    action: int | list[int] | None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="milliseconds"))
+
+    def save(self, filepath: str):
+        arrays = {
+            f"hand_{i}": card.card_image for i, card in enumerate(self.hand_of_cards) if card.card_image is not None
+        }
+        arrays.update(
+            (f"picked_{i}", card.card_image) for i, card in enumerate(self.picked_cards) if card.card_image is not None
+        )
+        if self.screenshot is not None:
+            arrays["screenshot"] = self.screenshot
+        metadata = {
+            "format_version": RECORD_FORMAT_VERSION,
+            "strategy": self.strategy,
+            "hand_of_cards": [_card_to_json(card) for card in self.hand_of_cards],
+            "picked_cards": [_card_to_json(card) for card in self.picked_cards],
+            "phase_turn": self.phase_turn,
+            "arguments": self.arguments,
+            "action": self.action,
+            "created_at": self.created_at,
+        }
+        np.savez_compressed(filepath, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    @classmethod
+    def load(cls, filepath: str) -> "HandRecord":
+        with np.load(filepath, allow_pickle=False) as archive:
+            metadata = json.loads(str(archive["metadata"]))
+            if metadata["format_version"] > RECORD_FORMAT_VERSION:
+                raise ValueError(f"'{filepath}' was recorded with a newer version of the recorder")
+            arrays = {name: archive[name] for name in archive.files if name != "metadata"}
+        return cls(
+            metadata["strategy"],
+            [_card_from_json(card, arrays.get(f"hand_{i}")) for i, card in enumerate(metadata["hand_of_cards"])],
+            [_card_from_json(card, arrays.get(f"picked_{i}")) for i, card in enumerate(metadata["picked_cards"])],
+            arrays.get("screenshot"),
+            metadata["phase_turn"],
+            metadata["arguments"],
+            metadata["action"],
+            metadata["created_at"],
+        )
+
+
+def recorded_sessions(records_dir: str = BATTLE_RECORDS_DIR) -> list[str]:
+    """Directories of the recorded sessions, oldest first"""
+    return sorted(path for path in glob.glob(os.path.join(records_dir, "*")) if os.path.isdir(path))
+
+
+def recorded_hands(session_dir: str) -> list[str]:
+    """Files of the hands of a session, in the order they were decided on"""
+    return sorted(glob.glob(os.path.join(session_dir, "hand_*.npz")))
+
+
+class HandRecorder:
+    """Saves the hands of the current session asynchronously, in a new directory per session"""
+
+    def __init__(self, records_dir: str = BATTLE_RECORDS_DIR):
+        self.records_dir = records_dir
+        self._lock = threading.Lock()
+        self._pending: queue.Queue = queue.Queue(maxsize=_MAX_PENDING_RECORDS)
+        self._writer_thread: threading.Thread | None = None
+        self._session_dir: str | None = None
+        self._num_records = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config.get("record_battle_hands", False))
+
+    def record(
+        self,
+        strategy: str,
+        hand_of_cards: list[Card],
+        picked_cards: list[Card],
+        screenshot: np.ndarray | None,
+        phase_turn: int,
+        arguments: dict,
+        action,
+    ):
+        """Queue a hand for saving. Never blocks on the disk. The cards must not be modified afterwards"""
+        record = HandRecord(
+            strategy,
+            hand_of_cards,
+            picked_cards,
+            # Copy, since the caller may reuse the screenshot buffer
+            np.array(screenshot) if screenshot is not None else None,
+            phase_turn,
+            _plain_arguments(arguments),
+            action_to_json(action),
+        )
+        with self._lock:
+            if self._session_dir is None:
+                self._session_dir = os.path.join(
+                    self.records_dir, f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                )
+            filepath = os.path.join(self._session_dir, f"hand_{self._num_records:06d}.npz")
+            try:
+                self._pending.put_nowait((filepath, record))
+            except queue.Full:
+                return
+            self._num_records += 1
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._write_loop, name="hand-recorder", daemon=True)
+                self._writer_thread.start()
+
+    def _write_loop(self):
+        while True:
+            filepath, record = self._pending.get()
+            try:
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                record.save(filepath)
+            except Exception as e:
+                # Losing a recorded hand is fine, stopping the farmer isn't
+                print(f"Couldn't save the recorded hand '{filepath}': {e}")
+
+
+hand_recorder = HandRecorder()
@@ -0,0 +1,199 @@
+"""Compact hand of cards, for simulations and searches that go through many hands per decision.
+
+A `HandState` keeps the type, rank and identity of every position of the hand in a single `bytearray`. The identities
+are the different cards of the hand it was read from (cards that would merge with each other share one), and whether
+two identities merge is looked up in a table computed once per read with `hand_merge_matrix`. Plays, moves and the
+merges they cause follow the rules of `utilities.battle_utilities`, but modify the bytes in place, without creating
+any `Card` or calling any model. States with the same cards in the same positions are equal and hash the same, to key
+transposition tables.
+"""
+
+from numbers import Integral
+
+from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.utilities import hand_merge_matrix
+
+_CARD_TYPES = tuple(CardTypes)
+_CARD_RANKS = tuple(CardRanks)
+_TYPE_CODES = {card_type: code for code, card_type in enumerate(_CARD_TYPES)}
+_RANK_CODES = {card_rank: code for code, card_rank in enumerate(_CARD_RANKS)}
+
+# Bytes per position of the hand: type, rank and identity codes. Identity 0 is no card
+_CELL_SIZE = 3
+_GROUND_CELL = bytes((_TYPE_CODES[CardTypes.GROUND], _RANK_CODES[CardRanks.NONE], 0))
+_NONE_CELL = bytes((_TYPE_CODES[CardTypes.NONE], _RANK_CODES[CardRanks.NONE], 0))
+_GROUND_CODE = _TYPE_CODES[CardTypes.GROUND]
+
+# Only BRONZE and SILVER cards merge, into the next rank
+_MERGING_RANK_CODES = frozenset((_RANK_CODES[CardRanks.BRONZE], _RANK_CODES[CardRanks.SILVER]))
+_RANK_UP = bytes(
+    _RANK_CODES[CardRanks(card_rank.value + 1)] if code in _MERGING_RANK_CODES else code
+    for code, card_rank in enumerate(_CARD_RANKS)
+)
+
+CardAction = int | tuple[int, int]
+
+
+class HandState:
+    """A hand of cards as bytes. Copies share the identities, the merge table and the cards built from them"""
+
+    __slots__ = ("cells", "identities", "merge_table", "_cards")
+
+    def __init__(self, cells: bytearray, identities: tuple[Card | None, ...], merge_table: bytes, cards: dict):
+        self.cells = cells
+        # The card read for each identity
+        self.identities = identities
+        # merge_table[a * len(identities) + b]: whether cards of identities `a` and `b` merge, when of the same rank
+        self.merge_table = merge_table
+        # Card of every (type, rank, identity) code seen, built on demand
+        self._cards: dict[int, Card] = cards
+
+    @classmethod
+    def from_cards(cls, hand_of_cards: list[Card]) -> "HandState":
+        """Convert a hand that was just read (after `hand_merge_matrix.update`), once per read"""
+        identities: list[Card | None] = [None]
+        cells = bytearray()
+        for card in hand_of_cards:
+            identity = 0
+            if card.card_type not in (CardTypes.NONE, CardTypes.GROUND):
+                identity = next(
+                    (
+                        i
+                        for i, other in enumerate(identities[1:], start=1)
+                        if other.card_type == card.card_type and hand_merge_matrix.predict(other, card)
+                    ),
+                    0,
+                )
+                if identity == 0:
+                    identities.append(card.copy())
+                    identity = len(identities) - 1
+            cells += bytes((_TYPE_CODES[card.card_type], _RANK_CODES[card.card_rank], identity))
+
+        merge_table = bytes(
+            a > 0 and b > 0 and (a == b or hand_merge_matrix.predict(identities[a], identities[b]))
+            for a in range(len(identities))
+            for b in range(len(identities))
+        )
+        return cls(cells, tuple(identities), merge_table, {})
+
+    def copy(self) -> "HandState":
+        return HandState(bytearray(self.cells), self.identities, self.merge_table, self._cards)
+
+    def __len__(self) -> int:
+        return len(self.cells) // _CELL_SIZE
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, HandState) and self.cells == other.cells and self.merge_table == other.merge_table
+
+    def __hash__(self) -> int:
+        return hash(bytes(self.cells))
+
+    def card_type(self, i: int) -> CardTypes:
+        return _CARD_TYPES[self.cells[i * _CELL_SIZE]]
+
+    def card_rank(self, i: int) -> CardRanks:
+        return _CARD_RANKS[self.cells[i * _CELL_SIZE + 1]]
+
+    def card_code(self, i: int) -> int:
+        """Type, rank and identity of a card as a single number, equal for equal cards of the same read"""
+        cells, start = self.cells, i * _CELL_SIZE
+        return cells[start] << 16 | cells[start + 1] << 8 | cells[start + 2]
+
+    def card(self, i: int) -> Card:
+        """The card at position `i`. It's shared by all the states with the same card, so it must not be modified"""
+        code = self.card_code(i)
+        card = self._cards.get(code)
+        if card is None:
+            card_type, card_rank, identity = self.cells[i * _CELL_SIZE : (i + 1) * _CELL_SIZE]
+            if identity == 0:
+                card = Card(_CARD_TYPES[card_type])
+            else:
+                card = self.identities[identity].copy()
+                card.card_type = _CARD_TYPES[card_type]
+                card.card_rank = _CARD_RANKS[card_rank]
+            self._cards[code] = card
+        return card
+
+    def to_cards(self) -> list[Card]:
+        """The hand as cards, shared like the ones of `card`. Copy them (e.g. with `copy_hand`) to modify them"""
+        return [self.card(i) for i in range(len(self))]
+
+    def can_merge(self, i: int, j: int) -> bool:
+        """Same as `determine_card_merge` on the cards at positions `i` and `j`"""
+        cells = self.cells
+        i, j = i * _CELL_SIZE, j * _CELL_SIZE
+        return (
+            cells[i + 1] == cells[j + 1]
+            and cells[i + 1] in _MERGING_RANK_CODES
+            and self.merge_table[cells[i + 2] * len(self.identities) + cells[j + 2]] == 1
+        )
+
+    def apply(self, action: CardAction):
+        """Play or move a card, like `IBattleStrategy._update_hand_of_cards`"""
+        if isinstance(action, Integral):
+            self.play(action)
+        else:
+            self.move(action[0], action[1])
+
+    def play(self, i: int):
+        """The cards on the left of the played one shift right, leaving ground on the far left, and the played
+        card's neighbours merge if they can (`process_card_play`)"""
+        i %= len(self)
+        self._remove(i, _GROUND_CELL)
+        if 0 < i < len(self) - 1:
+            self._merge_pair(i, i + 1)
+
+    def move(self, origin: int, target: int):
+        """Move a card onto another one, merging them if they can, and then process every merge (`process_card_move`)"""
+        origin %= len(self)
+        target %= len(self)
+        if self.can_merge(origin, target):
+            self._rank_up(target)
+            self._remove(origin, _NONE_CELL)
+        else:
+            start = origin * _CELL_SIZE
+            cell = bytes(self.cells[start : start + _CELL_SIZE])
+            del self.cells[start : start + _CELL_SIZE]
+            self.cells[target * _CELL_SIZE : target * _CELL_SIZE] = cell
+        self.merge_all()
+
+    def merge_all(self):
+        """Merge all the neighbouring cards that can merge, again and again until none can (`handle_card_merges_new`)"""
+        cells = self.cells
+        merged = True
+        while merged:
+            merged = False
+            i = 0
+            while i < len(self) - 1:
+                if self.can_merge(i, i + 1):
+                    self._rank_up(i)
+                    self._remove(i + 1, _GROUND_CELL)
+                    merged = True
+                else:
+                    if cells[(i + 1) * _CELL_SIZE] == _GROUND_CODE:
+                        self._swap(i, i + 1)
+                    i += 1
+
+    def _merge_pair(self, left: int, right: int):
+        """Merge the left card into the right one if they can, and then their new neighbours (`handle_card_merges`)"""
+        if left >= right or right >= len(self) or not self.can_merge(left, right):
+            return
+        self._rank_up(right)
+        self._remove(left, _GROUND_CELL)
+        self._merge_pair(right, right + 1)
+        self._merge_pair(right - 1, right)
+
+    def _remove(self, i: int, empty_cell: bytes):
+        """Remove the card at position `i`, shifting the cards on its left, and fill the far left with `empty_cell`"""
+        start = i * _CELL_SIZE
+        del self.cells[start : start + _CELL_SIZE]
+        self.cells[0:0] = empty_cell
+
+    def _rank_up(self, i: int):
+        self.cells[i * _CELL_SIZE + 1] = _RANK_UP[self.cells[i * _CELL_SIZE + 1]]
+
+    def _swap(self, i: int, j: int):
+        cells = self.cells
+        for k in range(_CELL_SIZE):
+            a, b = i * _CELL_SIZE + k, j * _CELL_SIZE + k
+            cells[a], cells[b] = cells[b], cells[a]
@@ -162,4 +162,4 @@ class InduraFighter(IFighter):
                 print("Closing Indura fighter thread!")
                 return
 
-            time.sleep(1)
+            self.wait_for_next_iteration(1)
@@ -1,6 +1,6 @@
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
 from utilities.utilities import capture_window, count_needle_image, crop_region, find
@@ -20,7 +20,7 @@ class InduraBattleStrategy(IBattleStrategy):
         # Common code between all 3 phases
         screenshot, _ = capture_window()
 
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
         king_debuf_card_ids = [
             i
             for i, card in enumerate(hand_of_cards)
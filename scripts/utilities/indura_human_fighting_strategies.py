@@ -2,10 +2,10 @@ import time
 
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
-from utilities.utilities import capture_window, crop_region, find
+from utilities.utilities import capture_window, crop_region, find, wait_for_game
 
 # ─── Card catalogue ───────────────────────────────────────────────────────────
 # Each entry: (vision_image, display_name, attack_type)
@@ -187,7 +187,7 @@ class InduraHumanBattleStrategy(IBattleStrategy):
         **kwargs,
     ) -> int:
         screenshot, _ = capture_window()
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
 
         # Turn number relative to the start of the current phase.
         phase_turn = IBattleStrategy.phase_turn
@@ -307,7 +307,7 @@ class InduraHumanBattleStrategy(IBattleStrategy):
                     ally_played_stance_cancel = bool(find(vio.mini_king, six_slots))
                     if not stance_up or ally_played_stance_cancel:
                         break
-                    time.sleep(1)
+                    wait_for_game(1)
                 if not stance_up:
                     print("[HumanTeam] Boss stance cleared — proceeding!")
                 elif ally_played_stance_cancel:
@@ -477,7 +477,7 @@ class InduraHumanBattleStrategy(IBattleStrategy):
                     # No ult available — wait on first card pick of the turn
                     if card_turn == 0:
                         print("[HumanTeam] P3 evasion: no ult — waiting 5.5s to observe ally...")
-                        time.sleep(5.5)
+                        wait_for_game(5.5)
                         screenshot, _ = capture_window()
                         melee_evasion_up = find(vio.melee_evasion, screenshot)
                         ranged_evasion_up = find(vio.ranged_evasion, screenshot)
@@ -0,0 +1,174 @@
+"""Popups and other interrupts that can show up on top of any state, handled once per frame by a shared registry.
+
+Instead of every state capturing the screen and probing the same popups on its own (reconnect, restart, duplicate
+connection, the Essette shop, the weekly mission of the demonic beasts...), a loop evaluates its `InterruptRegistry`
+once per iteration, before the state handler runs. The registry captures a single frame, matches the templates of all
+its handlers on it (cropping every region once, for all the templates matched in it), runs the actions of the ones
+that fired in order of priority, and returns the `Frame` with the summary of what fired. The state handlers then don't
+probe the popups themselves.
+"""
+
+import time
+from collections.abc import Callable, Collection
+from dataclasses import dataclass, field
+
+import numpy as np
+import utilities.vision_images as vio
+from utilities.app_config import click_tracker
+from utilities.capture_window import capture_window
+from utilities.coordinates import Coordinates
+from utilities.utilities import click_im
+from utilities.vision import Vision
+
+
+@dataclass(frozen=True)
+class InterruptMatch:
+    handler: "InterruptHandler"
+    # Template of the handler that matched
+    template: Vision
+    # Where it matched, as (x, y, w, h) in the screenshot
+    rectangle: np.ndarray
+
+
+@dataclass
+class Frame:
+    """A screenshot and the interrupts that fired on it"""
+
+    screenshot: np.ndarray
+    window_location: tuple
+    # Matches of the interrupts that fired, by handler name, in order of priority
+    interrupts: dict[str, InterruptMatch] = field(default_factory=dict)
+    # Whether an action ran, so that the screen may not look like the screenshot anymore
+    acted: bool = False
+
+    def fired(self, *names: str) -> bool:
+        """Whether any of the given interrupts fired"""
+        return any(name in self.interrupts for name in names)
+
+
+# Called with the owner of the registry (the farmer or fighter that evaluates it), the match and the frame
+InterruptAction = Callable[[object, InterruptMatch, Frame], None]
+
+
+@dataclass(frozen=True)
+class InterruptHandler:
+    name: str
+    templates: tuple[Vision, ...]
+    # None to only report it in the frame
+    action: InterruptAction | None = None
+    # Actions run from the highest priority to the lowest
+    priority: int = 0
+    # `Coordinates` region to match the templates in. None for the whole screen
+    region: str | None = None
+    threshold: float = 0.7
+    # For popups that cover the screen: once its action ran, the actions of lower priorities don't
+    exclusive: bool = False
+    # Only evaluated if it returns True for the owner and the screenshot
+    when: Callable[[object, np.ndarray], bool] | None = None
+    # To evaluate only some of the handlers of a registry, e.g. "reconnect" or "login"
+    group: str = "popup"
+
+
+def click_on_match(
+    point_coordinates: tuple[float, float] | None = None, message: str | None = None, sleep_time: float = 0
+) -> InterruptAction:
+    """Action that clicks on the match (or on `point_coordinates`), like `find_and_click`"""
+
+    def action(_owner, match: InterruptMatch, frame: Frame):
+        click_im(point_coordinates or match.rectangle, frame.window_location)
+        print(message or f"Clicked on '{match.template.image_name}'")
+        click_tracker.record_image_click(match.template.image_name)
+        time.sleep(0.2 + max(0, sleep_time))
+
+    return action
+
+
+class InterruptRegistry:
+    """The interrupts a loop handles on every frame"""
+
+    def __init__(self, handlers: Collection[InterruptHandler] = ()):
+        self.handlers: tuple[InterruptHandler, ...] = tuple(sorted(handlers, key=lambda handler: -handler.priority))
+
+    def extended(self, *handlers: InterruptHandler) -> "InterruptRegistry":
+        """A new registry with more handlers. Handlers with the same name replace the existing ones"""
+        names = {handler.name for handler in handlers}
+        return InterruptRegistry([handler for handler in self.handlers if handler.name not in names] + list(handlers))
+
+    def match(self, owner, screenshot: np.ndarray, groups: Collection[str] | None = None) -> dict[str, InterruptMatch]:
+        """Match the handlers (of the given groups) on the screenshot, without running their actions"""
+        crops: dict[str | None, tuple[np.ndarray, tuple[int, int]]] = {}
+        matches = {}
+        for handler in self.handlers:
+            if groups is not None and handler.group not in groups:
+                continue
+            if handler.when is not None and not handler.when(owner, screenshot):
+                continue
+
+            if handler.region not in crops:
+                if handler.region is None:
+                    crops[None] = (screenshot, (0, 0))
+                else:
+                    x1, y1, x2, y2 = Coordinates.get_coordinates(handler.region)
+                    crops[handler.region] = (screenshot[y1:y2, x1:x2], (x1, y1))
+            crop, (x_offset, y_offset) = crops[handler.region]
+
+            for template in handler.templates:
+                rectangle = template.find(crop, threshold=handler.threshold)
+                if rectangle is not None and rectangle.size:
+                    rectangle = np.array(rectangle, copy=True)
+                    rectangle[:2] += (x_offset, y_offset)
+                    matches[handler.name] = InterruptMatch(handler, template, rectangle)
+                    break
+        return matches
+
+    def evaluate(
+        self,
+        owner,
+        screenshot: np.ndarray | None = None,
+        window_location: tuple | None = None,
+        *,
+        groups: Collection[str] | None = None,
+    ) -> Frame:
+        """Capture a frame (unless given), match the handlers on it, and run the actions of the ones that fired"""
+        if screenshot is None:
+            screenshot, window_location = capture_window()
+        frame = Frame(screenshot, window_location, self.match(owner, screenshot, groups))
+        for match in frame.interrupts.values():
+            if match.handler.action is None:
+                continue
+            match.handler.action(owner, match, frame)
+            frame.acted = True
+            if match.handler.exclusive:
+                break
+        return frame
+
+
+RECONNECT = InterruptHandler(
+    "reconnect",
+    (vio.reconnect,),
+    click_on_match(message="Reconnecting..."),
+    priority=100,
+    exclusive=True,
+    group="reconnect",
+)
+RESTART = InterruptHandler(
+    "restart",
+    (vio.restart,),
+    click_on_match(message="No reconnection possible, restarting the game..."),
+    priority=100,
+    exclusive=True,
+    group="reconnect",
+)
+ESSETTE_SHOP = InterruptHandler("essette_shop", (vio.essette_shop,), click_on_match(), priority=20)
+DAILY_TASKS_COMPLETE = InterruptHandler("daily_tasks_complete", (vio.daily_tasks_complete,), click_on_match())
+DAILY_QUEST_INFO = InterruptHandler("daily_quest_info", (vio.daily_quest_info,), click_on_match())
+# In case we've been lazy and it's the first time we're doing Demonic Beast this week...
+WEEKLY_MISSION = InterruptHandler(
+    "weekly_mission",
+    (vio.weekly_mission,),
+    click_on_match(Coordinates.get_coordinates("lazy_weekly_bird_mission")),
+    priority=10,
+)
+
+# Popups that can show up during the fights of the demonic beasts
+DEMONIC_BEAST_INTERRUPTS = InterruptRegistry([WEEKLY_MISSION, DAILY_QUEST_INFO])
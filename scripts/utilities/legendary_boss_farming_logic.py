@@ -5,12 +5,12 @@ import pyautogui as pyautogui
 
 # Import all images
 import utilities.vision_images as vio
+from utilities.app_config import wait_if_paused
 from utilities.coordinates import Coordinates
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_farmer_interface import IFarmer
 from utilities.utilities import (
     capture_window,
-    check_for_reconnect,
     click_im,
     find,
     find_and_click,
@@ -30,6 +30,7 @@ class LegendaryBossFarmer(IFarmer):
 
     # Keep track of how many fights have been done
     num_fights = 0
+    checkpoint_attributes = ("num_fights",)
 
     difficulty_visions = {
         "extreme": vio.extreme_difficulty,
@@ -194,7 +195,9 @@ class LegendaryBossFarmer(IFarmer):
 
         while True:
 
-            check_for_reconnect()
+            wait_if_paused()
+            self.interrupts.evaluate(self, groups=("reconnect",))
+            self.save_checkpoint()
 
             if self.current_state == States.GOING_TO_LB:
                 self.going_to_lb_state()
@@ -0,0 +1,187 @@
+"""Versioned registry of the trained models inside 'models/'.
+
+'models/manifest.json' records, for every model name (the filename the predictors ask for, like
+'card_type_predictor.svm'), its current version and file, how the features are extracted, the transforms applied
+before it, the hash of the dataset it was trained on and the checksums of its files. Training registers a new
+version, and running farmers swap to it the next time they predict with that model.
+Models missing from the manifest (or all of them, if there's no manifest) are loaded from their bare filename.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+MODELS_DIR = "models"
+MANIFEST_FILENAME = "manifest.json"
+# How often to look for a new manifest, at most. Checked lazily, when a model is used
+_REFRESH_INTERVAL_SECONDS = 5.0
+_CHECKSUM_CHUNK_SIZE = 1 << 20
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of the contents of a file"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHECKSUM_CHUNK_SIZE):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def dataset_hash(paths: Iterable[str]) -> str:
+    """SHA-256 of a whole dataset, i.e. of the names and contents of all its files"""
+    sha = hashlib.sha256()
+    for path in sorted(paths):
+        sha.update(os.path.basename(path).encode())
+        sha.update(file_checksum(path).encode())
+    return sha.hexdigest()
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    """The current version of a model, as recorded in the manifest"""
+
+    name: str
+    path: str
+    # None for models that aren't in the manifest
+    version: int | None = None
+    # Names of the models (themselves in the registry) that transform the features before this one, in order
+    transforms: tuple[str, ...] = ()
+    # Histogram bins of the features the model was trained on, for models that use color histograms
+    bins: tuple[int, ...] | None = None
+    # Filename -> SHA-256, for every file of this version
+    checksums: dict[str, str] = field(default_factory=dict)
+    # Whether it was trained without the held-out samples (see `utilities.datasets.held_out_mask`), so that they can
+    # evaluate it
+    held_out_excluded: bool = False
+
+    def verify(self, path: str):
+        """Make sure the file is the one that was registered. Files without a recorded checksum are trusted"""
+        expected_checksum = self.checksums.get(os.path.basename(path))
+        if expected_checksum is not None and file_checksum(path) != expected_checksum:
+            raise ValueError(f"Checksum mismatch for '{path}', version {self.version} of '{self.name}'")
+
+
+class ModelRegistry:
+    """Thread-safe view of the manifest, reloaded whenever the file changes"""
+
+    def __init__(self, models_dir: str = MODELS_DIR):
+        self.models_dir = models_dir
+        self._lock = threading.Lock()
+        self._entries: dict[str, ModelEntry] = {}
+        self._manifest_mtime: float | None = None
+        self._last_refresh_time = float("-inf")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.models_dir, MANIFEST_FILENAME)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the manifest if it changed on disk. Returns whether it did"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh_time < _REFRESH_INTERVAL_SECONDS:
+                return False
+            self._last_refresh_time = now
+
+            try:
+                mtime = os.path.getmtime(self.manifest_path)
+            except OSError:
+                mtime = None
+            if mtime == self._manifest_mtime:
+                return False
+
+            self._entries = self._parse_manifest(self._read_manifest()) if mtime is not None else {}
+            self._manifest_mtime = mtime
+            return True
+
+    def entry(self, name: str) -> ModelEntry:
+        """The current version of the model"""
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(name)
+        return entry or ModelEntry(name=name, path=os.path.join(self.models_dir, name))
+
+    def version(self, name: str) -> int | None:
+        return self.entry(name).version
+
+    def next_version(self, name: str) -> int:
+        model_info = self._read_manifest()["models"].get(name, {})
+        return model_info.get("version", 0) + 1
+
+    @staticmethod
+    def versioned_filename(name: str, version: int) -> str:
+        """E.g. 'card_type_predictor.svm' -> 'card_type_predictor.v3.svm'"""
+        stem, extension = os.path.splitext(name)
+        return f"{stem}.v{version}{extension}"
+
+    def register(
+        self,
+        name: str,
+        version: int,
+        filenames: list[str],
+        feature_extractor: str,
+        bins: tuple[int, ...] | None = None,
+        transforms: tuple[str, ...] = (),
+        training_dataset_hash: str | None = None,
+        held_out_excluded: bool = False,
+    ):
+        """Record a newly trained version of a model. `filenames[0]` is the model itself, the rest are other
+        formats of it (e.g. its numpy export)"""
+        manifest = self._read_manifest()
+        manifest["models"][name] = {
+            "version": version,
+            "file": filenames[0],
+            "feature_extractor": feature_extractor,
+            "bins": list(bins) if bins is not None else None,
+            "transforms": list(transforms),
+            "dataset_hash": training_dataset_hash,
+            "held_out_excluded": held_out_excluded,
+            "checksums": {filename: file_checksum(os.path.join(self.models_dir, filename)) for filename in filenames},
+            "trained_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._write_manifest(manifest)
+        self.refresh(force=True)
+        print(f"Registered version {version} of '{name}'")
+
+    def _parse_manifest(self, manifest: dict) -> dict[str, ModelEntry]:
+        return {
+            name: ModelEntry(
+                name=name,
+                path=os.path.join(self.models_dir, model_info["file"]),
+                version=model_info["version"],
+                transforms=tuple(model_info.get("transforms", ())),
+                bins=tuple(model_info["bins"]) if model_info.get("bins") else None,
+                checksums=model_info.get("checksums", {}),
+                held_out_excluded=model_info.get("held_out_excluded", False),
+            )
+            for name, model_info in manifest["models"].items()
+        }
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"models": {}}
+
+    def _write_manifest(self, manifest: dict):
+        """Atomically replace the manifest, so that running farmers never read half of it"""
+        fd, tmp_path = tempfile.mkstemp(prefix="manifest_", suffix=".json.tmp", dir=self.models_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+model_registry = ModelRegistry()
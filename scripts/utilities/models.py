@@ -1,106 +1,490 @@
 import os
+import threading
+from collections.abc import Callable, Iterable
+from enum import Enum
+from typing import TYPE_CHECKING
 
-import dill as pickle
 import numpy as np
-from sklearn.decomposition import PCA
-from sklearn.linear_model import LogisticRegression
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.svm import SVC
+from utilities.active_learning import low_confidence_capture
 from utilities.card_data import CardColors, CardTypes
 from utilities.feature_extractors import extract_color_features  # For card types KNN
 from utilities.feature_extractors import extract_color_histograms_features  # For SVM
 from utilities.feature_extractors import (
     extract_difference_of_histograms_features,  # For LR card merges
 )
+from utilities.model_registry import ModelEntry, model_registry
+
+if TYPE_CHECKING:
+    from sklearn.decomposition import PCA
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+# Extension of the numeric models exported by `model_trainer.export_model`, appended to the original model filename
+NUMPY_MODEL_EXTENSION = ".npz"
+
+
+def _squared_distances(X: np.ndarray, Y: np.ndarray, Y_squared_norms: np.ndarray) -> np.ndarray:
+    """Squared euclidean distances between the rows of `X` and the rows of `Y`"""
+    distances = (X**2).sum(axis=1)[:, np.newaxis] + Y_squared_norms[np.newaxis, :] - 2 * X @ Y.T
+    return np.maximum(distances, 0, out=distances)
+
+
+class NumpyRBFSVC:
+    """`SVC(kernel="rbf")` inference, with the same one-vs-one voting as libsvm"""
+
+    kind = "rbf_svc"
+
+    def __init__(self, support_vectors, dual_coef, intercept, n_support, gamma, classes):
+        self.support_vectors = np.asarray(support_vectors, dtype=np.float64)
+        # Raw libsvm coefficients and intercepts (`SVC._dual_coef_` and `SVC._intercept_`), not the sign-flipped ones
+        self.dual_coef = np.asarray(dual_coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.gamma = float(gamma)
+        self.classes = np.asarray(classes)
+        self.n_features_in_ = self.support_vectors.shape[1]
+        self._sv_starts = np.concatenate([[0], np.cumsum(n_support)])
+        self._sv_squared_norms = (self.support_vectors**2).sum(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_with_confidence(X)[0]
+
+    def predict_with_confidence(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Predicted labels, and how far each sample is from the decision boundaries of its class, from 0 (on one of
+        them) to 1 (outside of the margins)"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        kernel = np.exp(-self.gamma * _squared_distances(X, self.support_vectors, self._sv_squared_norms))
+
+        num_classes = len(self.classes)
+        votes = np.zeros((X.shape[0], num_classes), dtype=int)
+        # Smallest decision value of the pairs involving each class
+        margins = np.full((X.shape[0], num_classes), np.inf)
+        pair_idx = 0
+        for i in range(num_classes):
+            sv_i = slice(self._sv_starts[i], self._sv_starts[i + 1])
+            for j in range(i + 1, num_classes):
+                sv_j = slice(self._sv_starts[j], self._sv_starts[j + 1])
+                decision = (
+                    kernel[:, sv_i] @ self.dual_coef[j - 1, sv_i]
+                    + kernel[:, sv_j] @ self.dual_coef[i, sv_j]
+                    + self.intercept[pair_idx]
+                )
+                votes[:, i] += decision > 0
+                votes[:, j] += decision <= 0
+                np.minimum(margins[:, i], np.abs(decision), out=margins[:, i])
+                np.minimum(margins[:, j], np.abs(decision), out=margins[:, j])
+                pair_idx += 1
+
+        # Ties go to the first class, like in libsvm
+        predicted = np.argmax(votes, axis=1)
+        confidences = np.minimum(margins[np.arange(X.shape[0]), predicted], 1.0)
+        return self.classes[predicted], confidences
+
+
+class NumpyKNN:
+    """`KNeighborsClassifier` inference, for uniform weights and euclidean distances"""
+
+    kind = "knn"
+
+    def __init__(self, fit_X, fit_y, n_neighbors, classes):
+        self.fit_X = np.asarray(fit_X, dtype=np.float64)
+        # Indices into `classes`, as `KNeighborsClassifier._y`
+        self.fit_y = np.asarray(fit_y, dtype=int)
+        self.n_neighbors = int(n_neighbors)
+        self.n_features_in_ = self.fit_X.shape[1]
+        self.classes = np.asarray(classes)
+        self._fit_X_squared_norms = (self.fit_X**2).sum(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_with_confidence(X)[0]
+
+    def predict_with_confidence(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Predicted labels, and the lead of the winning class over the runner-up, as a fraction of the neighbors"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        distances = _squared_distances(X, self.fit_X, self._fit_X_squared_norms)
+        neighbors = np.argsort(distances, axis=1, kind="stable")[:, : self.n_neighbors]
+
+        votes = np.zeros((X.shape[0], len(self.classes)), dtype=int)
+        np.add.at(votes, (np.arange(X.shape[0])[:, np.newaxis], self.fit_y[neighbors]), 1)
+        # Ties go to the smallest class, like sklearn's mode
+        predicted = np.argmax(votes, axis=1)
+        top_votes = np.sort(votes, axis=1)[:, ::-1]
+        runner_up_votes = top_votes[:, 1] if len(self.classes) > 1 else 0
+        return self.classes[predicted], (top_votes[:, 0] - runner_up_votes) / self.n_neighbors
+
+
+class NumpyLogisticRegression:
+    """`LogisticRegression` inference"""
+
+    kind = "logistic_regression"
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.n_features_in_ = self.coef.shape[1]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_with_confidence(X)[0]
+
+    def predict_with_confidence(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Predicted labels, and the lead of the most probable class over the runner-up, in probability"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        scores = X @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:
+            # Binary case: a single decision function for the second class
+            probabilities = 1 / (1 + np.exp(-scores[:, 0]))
+            return self.classes[(scores[:, 0] > 0).astype(int)], np.abs(2 * probabilities - 1)
+
+        # Multinomial case, with the same softmax as sklearn
+        probabilities = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        top_probabilities = np.sort(probabilities, axis=1)[:, ::-1]
+        return self.classes[np.argmax(scores, axis=1)], top_probabilities[:, 0] - top_probabilities[:, 1]
+
+
+class NumpyPCA:
+    """`PCA` transform"""
+
+    kind = "pca"
+
+    def __init__(self, components, mean, scale):
+        self.components = np.asarray(components, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        # Ones, unless the PCA whitens its output
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.n_features_in_ = self.components.shape[1]
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return (X - self.mean) @ self.components.T / self.scale
+
+
+class NumpyStandardScaler:
+    """`StandardScaler` transform"""
+
+    kind = "standard_scaler"
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.n_features_in_ = self.mean.shape[0]
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return (X - self.mean) / self.scale
 
-os.environ["LOKY_MAX_CPU_COUNT"] = "1"  # Replace '4' with the number of cores you want to use
+
+NUMPY_MODEL_TYPES = {
+    model_type.kind: model_type
+    for model_type in (NumpyRBFSVC, NumpyKNN, NumpyLogisticRegression, NumpyPCA, NumpyStandardScaler)
+}
+
+
+def load_numpy_model(model_path: str):
+    """Load a model exported by `model_trainer.export_model`"""
+    with np.load(model_path, allow_pickle=False) as arrays:
+        kind = str(arrays["kind"])
+        parameters = {name: arrays[name] for name in arrays.files if name != "kind"}
+    return NUMPY_MODEL_TYPES[kind](**parameters)
+
+
+def predict_with_confidence(model, features: np.ndarray) -> tuple[np.ndarray, np.ndarray] | None:
+    """Predicted labels, and how confident the model is about each of them from 0 to 1, like the numpy models'
+    `predict_with_confidence`. For sklearn estimators, the lead of the most probable class over the runner-up, or
+    the same lead in decision values. None if the model can't tell"""
+    if hasattr(model, "predict_with_confidence"):
+        return model.predict_with_confidence(features)
+
+    # `SVC.predict_proba` only exists if it was trained with `probability=True`
+    if hasattr(model, "predict_proba"):
+        scores = model.predict_proba(features)
+    elif hasattr(model, "decision_function_shape") and len(model.classes_) > 2:
+        # One-vs-one SVC: the smallest decision value of the pairs involving the predicted class, like `NumpyRBFSVC`
+        labels = model.predict(features)
+        class_indices = {label: i for i, label in enumerate(model.classes_.tolist())}
+        predicted = np.array([class_indices[label] for label in labels.tolist()])
+        decisions = np.abs(model._decision_function(features))
+        margins = np.full(len(labels), np.inf)
+        pairs = [(i, j) for i in range(len(model.classes_)) for j in range(i + 1, len(model.classes_))]
+        for pair_idx, (i, j) in enumerate(pairs):
+            involved = (predicted == i) | (predicted == j)
+            margins[involved] = np.minimum(margins[involved], decisions[involved, pair_idx])
+        return labels, np.minimum(margins, 1.0)
+    elif hasattr(model, "decision_function"):
+        scores = model.decision_function(features)
+    else:
+        return None
+
+    if scores.ndim == 1:
+        # Binary decision function, of the second class
+        confidences = np.abs(scores)
+    else:
+        top_scores = np.sort(scores, axis=1)[:, ::-1]
+        confidences = top_scores[:, 0] - top_scores[:, 1] if scores.shape[1] > 1 else np.ones(len(scores))
+    return model.predict(features), np.minimum(confidences, 1.0)
+
+
+# One lock per model file, so that a fighter only waits for the warm-up if it needs the model being loaded
+_model_file_locks: dict[str, threading.Lock] = {}
+_model_file_locks_guard = threading.Lock()
+
+
+def _model_file_lock(model_filename: str) -> threading.Lock:
+    with _model_file_locks_guard:
+        return _model_file_locks.setdefault(model_filename, threading.Lock())
+
+
+def _load_model_file(entry: ModelEntry):
+    """Load the exported numeric version of a model if there is one. Otherwise, unpickle the sklearn model.
+    Either way, the file must match the checksum in the manifest"""
+    numpy_model_path = entry.path + NUMPY_MODEL_EXTENSION
+    if os.path.exists(numpy_model_path):
+        entry.verify(numpy_model_path)
+        return load_numpy_model(numpy_model_path)
+
+    # Only needed for models that haven't been exported yet, and it pulls in sklearn
+    import dill as pickle
+
+    entry.verify(entry.path)
+    with open(entry.path, "rb") as model_file:
+        return pickle.load(model_file)
+
+
+class TransformChain:
+    """Several feature transforms applied one after the other, as recorded in the manifest"""
+
+    def __init__(self, transforms: list):
+        self.transforms = transforms
+        self.n_features_in_ = transforms[0].n_features_in_
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        for transform_model in self.transforms:
+            X = transform_model.transform(X)
+        return X
 
 
 class IModel:
     """Interface class for any models needed. Is there anything they all share, to group here?"""
 
     # Class variable for the model
-    model: KNeighborsClassifier | LogisticRegression | SVC = None
+    model: "KNeighborsClassifier | LogisticRegression | SVC | NumpyRBFSVC | NumpyKNN | NumpyLogisticRegression" = None
     # Model for transforming features before the classifier
-    feature_transform_model: PCA | StandardScaler | None = None
+    feature_transform_model: "PCA | StandardScaler | NumpyPCA | NumpyStandardScaler | None" = None
+
+    # Names in the model registry of the model and of its (optional) feature transform
+    model_filename: str = ""
+    feature_transform_model_filename: str | None = None
+
+    # Histogram bins the loaded model was trained with, as recorded in the registry, or the default otherwise
+    default_feature_bins: tuple[int, int, int] | None = None
+    feature_bins: tuple[int, int, int] | None = None
+
+    # Dataset that the low-confidence samples go to (see `utilities.active_learning`), and the enum of its labels
+    dataset_name: str | None = None
+    label_enum: type[Enum] | None = None
+
+    # Registry version of the loaded model, and the last version that failed to load
+    model_version: int | None = None
+    _rejected_model_version: int | None = None
+
+    # Whether we already warned that the loaded model can't report its confidence, for the capture
+    _warned_no_confidence: bool = False
 
     @classmethod
     def _load_feature_transform_model(cls, model_filename: str):
         if cls.feature_transform_model is None:
-            with open(os.path.join("models", model_filename), "rb") as model_file:
-                print("Loading model!")
-                cls.feature_transform_model = pickle.load(model_file)
+            with _model_file_lock(model_filename):
+                # The warm-up thread may have loaded it while we were waiting
+                if cls.feature_transform_model is None:
+                    print("Loading model!")
+                    cls.feature_transform_model = _load_model_file(model_registry.entry(model_filename))
 
     @classmethod
     def _load_model(cls, model_filename: str):
-        """Load the model and assign it to the class variable."""
-        if cls.model is None:
-            with open(os.path.join("models", model_filename), "rb") as model_file:
-                cls.model = pickle.load(model_file)
-            print(f"Loaded model: {model_filename}")
+        """Load the model and assign it to the class variable. If a new version was registered since, swap to it"""
+        if cls.model is not None and model_registry.version(model_filename) in {
+            cls.model_version,
+            cls._rejected_model_version,
+        }:
+            return
+
+        with _model_file_lock(model_filename):
+            entry = model_registry.entry(model_filename)
+            if cls.model is not None and entry.version in {cls.model_version, cls._rejected_model_version}:
+                return
+
+            try:
+                # Load everything before swapping, so that predictions never mix versions
+                transforms = [_load_model_file(model_registry.entry(name)) for name in entry.transforms]
+                model = _load_model_file(entry)
+            except Exception as e:
+                if cls.model is None:
+                    raise
+                print(f"Couldn't swap to version {entry.version} of '{model_filename}', keeping the current one: {e}")
+                cls._rejected_model_version = entry.version
+                return
+
+            if transforms:
+                cls.feature_transform_model = transforms[0] if len(transforms) == 1 else TransformChain(transforms)
+            cls.model = model
+            cls.model_version = entry.version
+            cls.feature_bins = entry.bins or cls.default_feature_bins
+            print(f"Loaded model: {model_filename}" + (f" (version {entry.version})" if entry.version else ""))
+
+    @classmethod
+    def unload(cls):
+        """Forget the loaded models, so that the next prediction loads them again"""
+        with _model_file_lock(cls.model_filename):
+            cls.model = None
+            cls.feature_transform_model = None
+            cls.model_version = None
+            cls._rejected_model_version = None
+
+    @classmethod
+    def warm_up(cls):
+        """Load the models and run a dummy prediction, to get any lazy initialization out of the way"""
+        if cls.feature_transform_model_filename is not None:
+            cls._load_feature_transform_model(cls.feature_transform_model_filename)
+        cls._load_model(cls.model_filename)
+
+        input_model = cls.feature_transform_model if cls.feature_transform_model_filename is not None else cls.model
+        features = np.zeros((1, input_model.n_features_in_))
+        if cls.feature_transform_model_filename is not None:
+            features = cls.feature_transform_model.transform(features)
+        cls.model.predict(features)
 
     @classmethod
     def predict(cls):
         return cls.model.predict()
 
+    @classmethod
+    def _classify(cls, features: np.ndarray, samples: Callable[[int], np.ndarray | None] | None = None) -> np.ndarray:
+        """Predict the labels of the (already transformed) features. If capturing is enabled, queue the samples the
+        model isn't confident about for labeling; `samples(i)` returns the image of the i-th one, or None to skip it"""
+        if samples is None or cls.dataset_name is None or not low_confidence_capture.enabled:
+            return cls.model.predict(features)
+
+        prediction = predict_with_confidence(cls.model, features)
+        if prediction is None:
+            if not cls._warned_no_confidence:
+                cls._warned_no_confidence = True
+                print(f"Can't capture low-confidence samples of {cls.__name__}, its model doesn't report confidences")
+            return cls.model.predict(features)
+
+        labels, confidences = prediction
+        for i in np.flatnonzero(confidences < low_confidence_capture.threshold):
+            sample = samples(i)
+            if sample is not None:
+                label = cls.label_enum(labels[i].item()) if cls.label_enum is not None else labels[i].item()
+                low_confidence_capture.submit(cls.dataset_name, sample, label, confidences[i].item())
+        return labels
+
 
 class CardTypePredictor(IModel):
     """Predictor for card types"""
 
+    model_filename = "card_type_predictor.svm"
+    default_feature_bins = (4, 4, 4)
+    dataset_name = "card_types_data"
+    label_enum = CardTypes
+
     @staticmethod
     def predict_card_type(card_type_image: np.ndarray, feature_type: str = "median") -> CardTypes:
         """Extract the features from the card and predict its type"""
 
         # Ensure the model is properly loaded
         # CardTypePredictor._load_model("card_type_predictor.knn")
-        CardTypePredictor._load_model("card_type_predictor.svm")
+        CardTypePredictor._load_model(CardTypePredictor.model_filename)
 
         ## KNN
         # features = extract_color_features(card_type_image[np.newaxis, ...], type=feature_type)
         ## SVM
-        features = extract_color_histograms_features(images=card_type_image[np.newaxis, ...], bins=(4, 4, 4))
+        features = extract_color_histograms_features(
+            images=card_type_image[np.newaxis, ...], bins=CardTypePredictor.feature_bins
+        )
 
-        predicted_label = CardTypePredictor.model.predict(features).item()
+        predicted_label = CardTypePredictor._classify(features, lambda _: card_type_image).item()
         return CardTypes(predicted_label)
 
 
 class UnitTypePredictor(IModel):
     """Predictor for card types"""
 
+    model_filename = "unit_type_predictor.svm"
+    default_feature_bins = (4, 4, 4)
+    dataset_name = "unit_type"
+    label_enum = CardColors
+
     @staticmethod
     def predict_unit_type(unit_type_image: np.ndarray) -> CardColors:
         """Extract the features from the card and predict its type"""
 
         # Ensure the model is properly loaded
         # CardTypePredictor._load_model("card_type_predictor.knn")
-        UnitTypePredictor._load_model("unit_type_predictor.svm")
+        UnitTypePredictor._load_model(UnitTypePredictor.model_filename)
 
         ## KNN
         # features = extract_color_features(card_type_image[np.newaxis, ...], type=feature_type)
         ## SVM
-        features = extract_color_histograms_features(images=unit_type_image[np.newaxis, ...], bins=(4, 4, 4))
+        features = extract_color_histograms_features(
+            images=unit_type_image[np.newaxis, ...], bins=UnitTypePredictor.feature_bins
+        )
 
-        predicted_label = UnitTypePredictor.model.predict(features).item()
+        predicted_label = UnitTypePredictor._classify(features, lambda _: unit_type_image).item()
         return CardColors(predicted_label)
 
 
 class CardMergePredictor(IModel):
+    """Predictor for card merges"""
+
+    model_filename = "card_merges_predictor.lr"
+    dataset_name = "card_merges_data"
 
     @staticmethod
     def predict_card_merge(card_1: np.ndarray, card_2: np.ndarray) -> bool:
         """Extract the features and use the model to predict whether two cards are going to merge"""
 
         # Ensure the model is properly loaded
-        CardMergePredictor._load_model("card_merges_predictor.lr")
+        CardMergePredictor._load_model(CardMergePredictor.model_filename)
 
         features = extract_difference_of_histograms_features((card_1, card_2))
-        return int(CardMergePredictor.model.predict(features).item())
+        return int(
+            CardMergePredictor._classify(
+                features, lambda _: np.stack((card_1, card_2), axis=0) if card_1.shape == card_2.shape else None
+            ).item()
+        )
+
+    @staticmethod
+    def predict_card_merges(
+        histogram_distances: np.ndarray, card_pairs: Callable[[tuple[int, ...]], np.ndarray | None] | None = None
+    ) -> np.ndarray:
+        """Batched version of `predict_card_merge`, given the norms of the histogram differences of many card pairs.
+        Returns a boolean array with the same shape as `histogram_distances`.
+        `card_pairs(index)` returns the stacked images of the pair at that index of `histogram_distances`, to capture
+        the low-confidence ones (or None to skip it)."""
+
+        CardMergePredictor._load_model(CardMergePredictor.model_filename)
+
+        features = np.reshape(histogram_distances, (-1, 1))
+        samples = (
+            (lambda i: card_pairs(np.unravel_index(i, np.shape(histogram_distances))))
+            if card_pairs is not None
+            else None
+        )
+        predictions = CardMergePredictor._classify(features, samples).astype(bool)
+        return predictions.reshape(np.shape(histogram_distances))
 
 
 class AmplifyCardPredictor(IModel):
     """Model that identifies if a card should be played in phase 3"""
 
+    model_filename = "amplify_cards_predictor.knn"
+    feature_transform_model_filename = "pca_amplify_model.pca"
+    default_feature_bins = (8, 8, 8)
+    dataset_name = "amplify_cards_data"
+
     @staticmethod
     def is_amplify_card(card_1: np.ndarray | None) -> bool:
         """Predict if a card ia amplify or Thor's"""
@@ -109,21 +493,26 @@ class AmplifyCardPredictor(IModel):
             return 0
 
         # Ensure the models are properly loaded
-        AmplifyCardPredictor._load_feature_transform_model("pca_amplify_model.pca")
-        AmplifyCardPredictor._load_model("amplify_cards_predictor.knn")
+        AmplifyCardPredictor._load_feature_transform_model(AmplifyCardPredictor.feature_transform_model_filename)
+        AmplifyCardPredictor._load_model(AmplifyCardPredictor.model_filename)
 
         # TODO: Apply PCA to reduce dimensionality! And use SVM with RBF kernel, or even K-NN?
-        features = extract_color_histograms_features(card_1, bins=(8, 8, 8))
+        features = extract_color_histograms_features(card_1, bins=AmplifyCardPredictor.feature_bins)
 
         # Transform features with the PCA
         features_reduced = AmplifyCardPredictor.feature_transform_model.transform(features)
 
-        return int(AmplifyCardPredictor.model.predict(features_reduced).item())
+        return int(AmplifyCardPredictor._classify(features_reduced, lambda _: card_1).item())
 
 
 class HAMCardPredictor(IModel):
     """Class that predicts whether a card is hard-hitting"""
 
+    model_filename = "HAM_cards_predictor.knn"
+    feature_transform_model_filename = "pca_HAM_cards_model.pca"
+    default_feature_bins = (8, 8, 8)
+    dataset_name = "ham_cards_data"
+
     @staticmethod
     def is_HAM_card(card: np.ndarray | None) -> bool:
         """Predict if a card is hard-hitting"""
@@ -132,22 +521,27 @@ class HAMCardPredictor(IModel):
             return 0
 
         # Ensure all models are properly loaded
-        HAMCardPredictor._load_feature_transform_model("pca_HAM_cards_model.pca")
-        HAMCardPredictor._load_model("HAM_cards_predictor.knn")
+        HAMCardPredictor._load_feature_transform_model(HAMCardPredictor.feature_transform_model_filename)
+        HAMCardPredictor._load_model(HAMCardPredictor.model_filename)
 
         # Extract the features
-        features = extract_color_histograms_features(card, bins=(8, 8, 8))
+        features = extract_color_histograms_features(card, bins=HAMCardPredictor.feature_bins)
 
         # Transform features with the PCA
         features_reduced = HAMCardPredictor.feature_transform_model.transform(features)
 
         # Finally, predict HAM card
-        return int(HAMCardPredictor.model.predict(features_reduced).item())
+        return int(HAMCardPredictor._classify(features_reduced, lambda _: card).item())
 
 
 class ThorCardPredictor(IModel):
     """Class that identifies Thor cards"""
 
+    model_filename = "Thor_cards_predictor.svm"
+    feature_transform_model_filename = "pca_Thor_cards_model.pca"
+    default_feature_bins = (8, 8, 8)
+    dataset_name = "thor_cards_data"
+
     @staticmethod
     def is_Thor_card(card: np.ndarray | None) -> bool:
         """Predict if a card is hard-hitting"""
@@ -156,35 +550,73 @@ class ThorCardPredictor(IModel):
             return 0
 
         # Ensure all models are properly loaded
-        ThorCardPredictor._load_feature_transform_model("pca_Thor_cards_model.pca")
-        ThorCardPredictor._load_model("Thor_cards_predictor.svm")
+        ThorCardPredictor._load_feature_transform_model(ThorCardPredictor.feature_transform_model_filename)
+        ThorCardPredictor._load_model(ThorCardPredictor.model_filename)
 
         # Extract the features
-        features = extract_color_histograms_features(card, bins=(8, 8, 8))
+        features = extract_color_histograms_features(card, bins=ThorCardPredictor.feature_bins)
 
         # Transform features with the PCA
         features_reduced = ThorCardPredictor.feature_transform_model.transform(features)
 
         # Finally, predict HAM card
-        return int(ThorCardPredictor.model.predict(features_reduced).item())
+        return int(ThorCardPredictor._classify(features_reduced, lambda _: card).item())
+
+
+class CardSlotPredictor(IModel):
+    """Predictor of the empty card slots, from crops at the fixed positions of the slots"""
+
+    model_filename = "card_slots_predictor.knn"
+    dataset_name = "card_slots_data"
+
+    # Label of the empty slots in the 'card_slots_data' datasets
+    EMPTY_SLOT_LABEL = 1
+
+    @staticmethod
+    def predict_empty_slots(slot_images: np.ndarray) -> np.ndarray:
+        """Whether each slot is empty, given a batch of slot crops of shape (slots, height, width, 3)"""
+
+        CardSlotPredictor._load_model(CardSlotPredictor.model_filename)
+
+        features = extract_color_features(slot_images, type="median")
+        predictions = CardSlotPredictor._classify(features, lambda i: slot_images[i])
+        return predictions == CardSlotPredictor.EMPTY_SLOT_LABEL
 
 
 class GroundCardPredictor(IModel):
     """Class that identifies if a card is ground or not"""
 
+    model_filename = "ground_cards_predictor.svc"
+    default_feature_bins = (8, 8, 8)
+    dataset_name = "ground_data"
+
     @staticmethod
     def is_ground_card(card: np.ndarray) -> bool:
         """Predict ground card"""
 
-        # Extract the features
-        features = extract_color_histograms_features(card, bins=(8, 8, 8))
-
         ## Current behavior: raw histogram + SVC
-        GroundCardPredictor._load_model("ground_cards_predictor.svc")
-        return int(GroundCardPredictor.model.predict(features).item())
+        GroundCardPredictor._load_model(GroundCardPredictor.model_filename)
+
+        # Extract the features
+        features = extract_color_histograms_features(card, bins=GroundCardPredictor.feature_bins)
+        return int(GroundCardPredictor._classify(features, lambda _: card).item())
 
         ## Backwards compatibility: raw histogram + scaling + logistic regression
         # GroundCardPredictor._load_feature_transform_model("scaler_ground_cards_model.scaler")
         # GroundCardPredictor._load_model("ground_cards_predictor.lr")
         # features_scaled = GroundCardPredictor.feature_transform_model.transform(features)
         # return int(GroundCardPredictor.model.predict(features_scaled).item())
+
+
+# Models needed to read any hand of cards
+HAND_MODELS: tuple[type[IModel], ...] = (GroundCardPredictor, CardTypePredictor, CardMergePredictor)
+
+
+def warm_up_models(predictors: Iterable[type[IModel]]):
+    """Load the given models one by one, e.g. from a background thread at farmer startup"""
+    for predictor in dict.fromkeys(predictors):
+        try:
+            predictor.warm_up()
+        except Exception as e:
+            # Not fatal, the model will be loaded again (and fail loudly) when it's first needed
+            print(f"Couldn't warm up {predictor.__name__}: {e}")
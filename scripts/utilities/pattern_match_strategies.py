@@ -77,3 +77,20 @@ class TemplateMatchingStrategy:
     def find_with_confidence(image: np.ndarray, template: np.ndarray, **kwargs) -> tuple[np.ndarray, np.ndarray]:
         """Like `find`, but returning confidence value as well"""
         return TemplateMatchingStrategy._best_match(image, template, **kwargs)
+
+
+class NoMatchStrategy:
+    """Finds nothing, without looking at the image. For screens that have nothing to find, e.g. the blank screen of
+    the battle simulator"""
+
+    @staticmethod
+    def find_all_rectangles(image: np.ndarray, template: np.ndarray, **kwargs):
+        return np.empty(0), np.empty(0)
+
+    @staticmethod
+    def find(image: np.ndarray, template: np.ndarray, **kwargs) -> np.ndarray:
+        return np.array([], dtype=np.int32).reshape(0, 4)
+
+    @staticmethod
+    def find_with_confidence(image: np.ndarray, template: np.ndarray, **kwargs) -> tuple[np.ndarray, None]:
+        return np.array([], dtype=np.int32).reshape(0, 4), None
@@ -4,6 +4,7 @@ import numpy as np
 import utilities.vision_images as vio
 from utilities.coordinates import Coordinates
 from utilities.general_fighter_interface import FightingStates, IFighter
+from utilities.interrupts import DEMONIC_BEAST_INTERRUPTS
 from utilities.rat_fighting_strategies import RatFightingStrategy
 from utilities.rat_utilities import detect_stump_from_screen
 from utilities.utilities import (
@@ -16,22 +17,18 @@ from utilities.utilities import (
 
 class RatFighter(IFighter):
 
+    # Popups that show up during the fights of the demonic beasts
+    interrupts = DEMONIC_BEAST_INTERRUPTS
+
     # 0, 1 or 2 (left, middle, right). We start in the middle
     current_stump = -1
     next_stump = 1
 
     def fighting_state(self):
 
-        screenshot, window_location = capture_window()
-
-        # In case we've been lazy and it's the first time we're doing Demonic Beast this week...
-        find_and_click(
-            vio.weekly_mission,
-            screenshot,
-            window_location,
-            point_coordinates=Coordinates.get_coordinates("lazy_weekly_bird_mission"),
-        )
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        # Closes the weekly mission and daily quest popups
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # To skip quickly to the rewards when the fight is done
         find_and_click(vio.creature_destroyed, screenshot, window_location, threshold=0.6)
@@ -143,9 +140,8 @@ class RatFighter(IFighter):
 
     def defeat_state(self):  # sourcery skip: class-extract-method
         """We've lost the battle..."""
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # Click on the OK button to end the fight
         find_and_click(vio.ok_main_button, screenshot, window_location)
@@ -159,9 +155,8 @@ class RatFighter(IFighter):
     def fight_complete_state(self):
         """We've completed the battle successfully!"""
 
-        screenshot, window_location = capture_window()
-
-        find_and_click(vio.daily_quest_info, screenshot, window_location)
+        frame = self.handle_interrupts()
+        screenshot, window_location = frame.screenshot, frame.window_location
 
         # Click on the OK button to end the fight
         find_and_click(vio.ok_main_button, screenshot, window_location)
@@ -201,4 +196,4 @@ class RatFighter(IFighter):
                 print("Closing Fighter thread!")
                 return
 
-            time.sleep(0.5)
+            self.wait_for_next_iteration(0.5)
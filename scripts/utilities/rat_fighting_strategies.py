@@ -1,4 +1,3 @@
-import time
 from enum import Enum, auto
 
 import utilities.vision_images as vio
@@ -10,6 +9,7 @@ from utilities.fighting_strategies import (
     play_stance_card,
 )
 from utilities.logging_utils import LoggerWrapper
+from utilities.models import AmplifyCardPredictor, HAMCardPredictor, ThorCardPredictor
 from utilities.rat_utilities import (
     count_rat_buffs,
     is_bleed_card,
@@ -26,6 +26,7 @@ from utilities.utilities import (
     is_amplify_card,
     is_hard_hitting_card,
     is_Thor_card,
+    wait_for_game,
 )
 
 
@@ -42,6 +43,8 @@ logger = LoggerWrapper("RatFightingStrategies", log_file="rat_AI.log")
 class RatFightingStrategy(IBattleStrategy):
     """The logic behind Rat. It's gonna be complex, brace yourself..."""
 
+    required_models = IBattleStrategy.required_models + (AmplifyCardPredictor, HAMCardPredictor, ThorCardPredictor)
+
     turns_in_f2p2 = 0
 
     def get_next_card_index(
@@ -357,9 +360,9 @@ class RatFightingStrategy(IBattleStrategy):
             if card_turn == 0:
                 print("Rat hidden: clicking non-center stump to avoid wasting damage...")
                 click_im(Coordinates.get_coordinates("left_log"), window_location)
-                time.sleep(0.5)
+                wait_for_game(0.5)
                 click_im(Coordinates.get_coordinates("right_log"), window_location)
-                time.sleep(0.3)
+                wait_for_game(0.3)
 
             if len(debuff_ids):
                 return debuff_ids[-1]
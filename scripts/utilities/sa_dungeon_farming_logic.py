@@ -4,13 +4,14 @@ from enum import Enum, auto
 import cv2
 import numpy as np
 import utilities.vision_images as vio
+from utilities.app_config import wait_if_paused
 from utilities.coordinates import Coordinates
 from utilities.general_farmer_interface import IFarmer
+from utilities.interrupts import ESSETTE_SHOP
 from utilities.logging_utils import LoggerWrapper, logging
 from utilities.utilities import (
     Color,
     capture_window,
-    check_for_reconnect,
     crop_roi_from_rect,
     drag_im,
     find,
@@ -58,6 +59,10 @@ class SADungeonFarmer(IFarmer):
 
     # How many chests we've collected so far
     collected_chests: dict[ChestTier, int] = {ChestTier.BRONZE: 0, ChestTier.SILVER: 0, ChestTier.GOLD: 0}
+    checkpoint_attributes = ("num_resets", "num_runs_complete", "collected_chests")
+
+    # The Essette shop popup shows up on top of the dungeon screens
+    interrupts = IFarmer.interrupts.extended(ESSETTE_SHOP)
 
     # Detection flags
     chest_found: bool = False
@@ -378,19 +383,15 @@ class SADungeonFarmer(IFarmer):
         if not find(vio.fs_loading_screen, screenshot):
             press_key("esc")
 
-    def check_for_esette_popup(self):
-        """Check if we have the Essette shop, and click on it if so to remove the popup"""
-        screenshot, window_location = capture_window()
-        find_and_click(vio.essette_shop, screenshot, window_location)
-
     def run(self):
 
         print("Farming SA coin dungeon!")
 
         while True:
 
-            check_for_reconnect()
-            self.check_for_esette_popup()
+            wait_if_paused()
+            self.interrupts.evaluate(self, groups=("reconnect", "popup"))
+            self.save_checkpoint()
 
             if self.current_state == States.GOING_TO_DUNGEON:
                 self.going_to_dungeon_state()
@@ -0,0 +1,196 @@
+"""Waiting for something to happen on the screen, instead of sleeping a fixed time between two looks at it.
+
+The loops of the fighters and the farmers wait with a `PollingScheduler` between two runs of their state handlers, when
+`event_driven_loops` is enabled in 'config/config.yaml'. The wait ends as soon as the regions of the screen that matter
+in the current state change, or after the state's timeout, so transitions are handled right away and the handlers
+(and their template matching) don't run over and over while nothing happens.
+
+Each state waits according to its `PollingPolicy`. Right after a change, the screen is polled at the state's maximum
+rate; while it stays static, the polls back off exponentially, up to the state's target reaction latency. The
+scheduler keeps the reaction latencies it achieves in every state, and how long the handlers wait between two runs
+(see `PollingScheduler.report`). Changes seen by the first poll after `min_wait` are mostly the game reacting to the
+handler's own clicks, so they're only counted: they say nothing about how fast the loop notices the game.
+
+Detecting a change only compares small grayscale thumbnails of the watched regions, far cheaper than the handlers.
+"""
+
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from enum import Enum
+
+import cv2
+import numpy as np
+from utilities.capture_window import capture_window
+from utilities.coordinates import Coordinates
+
+# Size of the thumbnail of every watched region
+_THUMBNAIL_SIZE = (16, 16)
+# Mean absolute difference between thumbnails (out of 255) above which the screen changed
+CHANGE_THRESHOLD = 3.0
+# Reaction latencies kept per state, for the reports
+_MAX_LATENCY_SAMPLES = 1000
+
+
+@dataclass(frozen=True)
+class PollingPolicy:
+    """How a loop waits between two runs of a state handler"""
+
+    # Longest acceptable delay between a change of the screen and the handler running. Polls back off up to it
+    target_latency: float = 0.5
+    # Polls per second right after the screen changed
+    max_poll_rate: float = 10.0
+    # Time to leave the game after the handler ran, e.g. to react to its clicks
+    min_wait: float = 0.1
+    # Longest wait, after which the handler runs again even if nothing changed
+    timeout: float = 1.0
+    # Names of the `Coordinates` regions whose changes matter. Empty for the whole screen
+    regions: tuple[str, ...] = ()
+
+    @property
+    def min_poll_interval(self) -> float:
+        return min(1.0 / self.max_poll_rate, self.target_latency)
+
+    @classmethod
+    def from_sleep(cls, sleep_seconds: float) -> "PollingPolicy":
+        """A policy that reacts to changes at least as fast as sleeping `sleep_seconds` between iterations"""
+        return cls(
+            target_latency=sleep_seconds,
+            max_poll_rate=max(10.0, 1.0 / max(sleep_seconds, 1e-3)),
+            min_wait=min(0.2, sleep_seconds),
+            # The handler still runs at least as often as before, for what doesn't change the watched regions
+            timeout=sleep_seconds,
+        )
+
+
+def screen_signature(screenshot: np.ndarray, regions: tuple[str, ...] = ()) -> np.ndarray:
+    """Grayscale thumbnails of the regions of the screenshot, to tell whether they changed"""
+    crops = [screenshot] if not regions else []
+    for region in regions:
+        x1, y1, x2, y2 = Coordinates.get_coordinates(region)
+        crops.append(screenshot[y1:y2, x1:x2])
+    thumbnails = [cv2.resize(crop, _THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA) for crop in crops]
+    return np.concatenate([thumbnail.reshape(-1, thumbnail.shape[-1]).mean(axis=-1) for thumbnail in thumbnails])
+
+
+class ScreenWatcher:
+    """Tells whether the screen changed since the previous look at it"""
+
+    def __init__(self, change_threshold: float = CHANGE_THRESHOLD):
+        self.change_threshold = change_threshold
+        self._last_signature: np.ndarray | None = None
+
+    def poll(self, regions: tuple[str, ...] = ()) -> bool:
+        """Capture the screen, and return whether the regions changed since the previous poll"""
+        screenshot, _ = capture_window()
+        signature = screen_signature(screenshot, regions)
+        changed = (
+            self._last_signature is None
+            or self._last_signature.shape != signature.shape
+            or float(np.abs(signature - self._last_signature).mean()) > self.change_threshold
+        )
+        self._last_signature = signature
+        return changed
+
+
+@dataclass
+class StatePollingStats:
+    polls: int = 0
+    changes: int = 0
+    # Changes seen by the first poll, right after `min_wait`. Not reaction latencies
+    changes_after_handler: int = 0
+    timeouts: int = 0
+    # Of the policy the state was last polled with
+    target_latency: float = 0.0
+    # Upper bounds of the delays between the changes and their detection: the time since the previous poll
+    reaction_latencies: deque = field(default_factory=lambda: deque(maxlen=_MAX_LATENCY_SAMPLES))
+    # Time between the end of the handler and its next run
+    waits: deque = field(default_factory=lambda: deque(maxlen=_MAX_LATENCY_SAMPLES))
+
+
+class PollingScheduler:
+    """Waits between the iterations of a state loop, with the policy of the current state"""
+
+    def __init__(self, policies: dict | None = None, watcher: ScreenWatcher | None = None):
+        self.policies = policies if policies is not None else {}
+        self.watcher = watcher or ScreenWatcher()
+        self.stats: dict[object, StatePollingStats] = defaultdict(StatePollingStats)
+        self._state = None
+        self._poll_interval = 0.0
+
+    def wait(self, state, default_policy: PollingPolicy | None = None) -> bool:
+        """Wait until the state's regions change, or until its timeout. Returns whether they changed"""
+        policy = self.policies.get(state) or default_policy or PollingPolicy()
+        stats = self.stats[state]
+        stats.target_latency = policy.target_latency
+        if state != self._state:
+            # A new state may change at any moment, poll it fast
+            self._state = state
+            self._poll_interval = policy.min_poll_interval
+
+        start_time = time.perf_counter()
+        last_poll_time = None
+        time.sleep(policy.min_wait)
+        while True:
+            changed = self.watcher.poll(policy.regions)
+            now = time.perf_counter()
+            stats.polls += 1
+            if changed:
+                stats.changes += 1
+                if last_poll_time is None:
+                    stats.changes_after_handler += 1
+                else:
+                    stats.reaction_latencies.append(now - last_poll_time)
+                stats.waits.append(now - start_time)
+                self._poll_interval = policy.min_poll_interval
+                return True
+            if now - start_time + self._poll_interval > policy.timeout:
+                stats.timeouts += 1
+                stats.waits.append(now - start_time)
+                return False
+
+            last_poll_time = now
+            time.sleep(self._poll_interval)
+            self._poll_interval = min(2 * self._poll_interval, policy.target_latency)
+
+    def report(self) -> dict[str, dict]:
+        """Achieved reaction latencies and waits (in ms), and polls of every state seen, against their target latency"""
+        return {
+            state.name if isinstance(state, Enum) else str(state): {
+                "polls": stats.polls,
+                "changes": stats.changes,
+                "changes_after_handler": stats.changes_after_handler,
+                "timeouts": stats.timeouts,
+                "target_latency_ms": round(stats.target_latency * 1e3, 1),
+                "reaction_latency_ms": _milliseconds_summary(stats.reaction_latencies),
+                "wait_ms": _milliseconds_summary(stats.waits),
+            }
+            for state, stats in self.stats.items()
+        }
+
+    def summary(self) -> str:
+        """The report as one line per state"""
+        lines = []
+        for state, stats in self.report().items():
+            lines.append(
+                f"* {state}: reaction mean/p95/max {_milliseconds_text(stats['reaction_latency_ms'])} "
+                f"(target {stats['target_latency_ms']} ms), wait mean/p95/max {_milliseconds_text(stats['wait_ms'])}, "
+                f"{stats['changes']} changes ({stats['changes_after_handler']} right after the handler), "
+                f"{stats['timeouts']} timeouts, {stats['polls']} polls"
+            )
+        return "\n".join(lines)
+
+
+def _milliseconds_summary(seconds: deque) -> dict | None:
+    if not seconds:
+        return None
+    milliseconds = np.array(seconds) * 1e3
+    return {
+        "mean": round(float(milliseconds.mean()), 1),
+        "p95": round(float(np.percentile(milliseconds, 95)), 1),
+        "max": round(float(milliseconds.max()), 1),
+    }
+
+
+def _milliseconds_text(summary: dict | None) -> str:
+    return f"{summary['mean']}/{summary['p95']}/{summary['max']} ms" if summary else "-"
@@ -1,8 +1,10 @@
 import numpy as np
 import utilities.vision_images as vio
-from utilities.card_data import Card, CardRanks, CardTypes
+from utilities.card_data import Card, CardRanks, CardTypes, card_ranks_array, card_types_array
 from utilities.fighting_strategies import IBattleStrategy, SmarterBattleStrategy
 from utilities.utilities import (
+    SNAKE_HAM_TEMPLATES,
+    STANCE_CANCEL_TEMPLATES,
     capture_window,
     determine_card_merge,
     find,
@@ -14,6 +16,8 @@ from utilities.utilities import (
 class SnakeBattleStrategy(IBattleStrategy):
     """The logic behind the AI for Snake"""
 
+    identity_templates = tuple(dict.fromkeys(SNAKE_HAM_TEMPLATES + STANCE_CANCEL_TEMPLATES))
+
     def get_next_card_index(
         self, hand_of_cards: list[Card], picked_cards: list[Card], floor: int, phase: int, card_turn=0, **kwargs
     ) -> int:
@@ -75,7 +79,7 @@ class SnakeBattleStrategy(IBattleStrategy):
         screenshot, _ = capture_window()
 
         # Card ranks for sorting
-        card_ranks = np.array([card.card_rank.value for card in hand_of_cards])
+        card_ranks = card_ranks_array(hand_of_cards)
 
         played_freyja_ids = [
             i for i, card in enumerate(picked_cards)
@@ -157,7 +161,7 @@ class SnakeBattleStrategy(IBattleStrategy):
                 hand_of_cards[i].card_type = CardTypes.DISABLED
 
         # Extract the card types AFTER disabling stance cards
-        card_types = np.array([card.card_type.value for card in hand_of_cards])
+        card_types = card_types_array(hand_of_cards)
 
         # ULTIMATES
         ult_ids = np.where(card_types == CardTypes.ULTIMATE.value)[0]
@@ -0,0 +1,126 @@
+"""Trace of the state machines of the farmers and the fighters, to find out offline where the wall-clock time goes.
+
+When `trace_state_transitions` is enabled in 'config/config.yaml', every change of `IFarmer.current_state` and
+`IFighter.current_state`, the start and end of every fight, its result and every phase change are appended to a trace
+file under 'data/traces/', one JSON object per line. Events are timestamped with `time.monotonic()` when they happen,
+and written by a background thread, so the loops never wait on the disk. If the disk can't keep up, events are dropped.
+
+Each trace starts with a header relating the monotonic clock to the wall clock. Analyze the traces with
+`analyze_traces.py`.
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from enum import Enum
+
+from utilities.app_config import config
+
+TRACES_DIR = os.path.join("data", "traces")
+TRACE_FORMAT_VERSION = 1
+
+# Events waiting for the writer thread
+_MAX_PENDING_EVENTS = 4096
+
+
+class TraceEvents:
+    """Kinds of traced events"""
+
+    HEADER = "header"
+    # A farmer or a fighter changed `current_state`, from `from` to `to`
+    STATE = "state"
+    FIGHT_START = "fight_start"
+    FIGHT_END = "fight_end"
+    # The fighter reported the result of the fight, `victory`, to its farmer
+    FIGHT_RESULT = "fight_result"
+    # The fighter moved from phase `from` to phase `to`
+    PHASE = "phase"
+
+
+def _plain(value):
+    """An enum member by name, and anything else JSON can't write as a string"""
+    if isinstance(value, Enum):
+        return value.name
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def trace_files(traces_dir: str = TRACES_DIR) -> list[str]:
+    """The trace files, oldest first"""
+    return sorted(glob.glob(os.path.join(traces_dir, "trace_*.jsonl")))
+
+
+def read_trace(filepath: str) -> list[dict]:
+    """The events of a trace, in the order they happened. A partly written last line is skipped"""
+    events = []
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+class StateTracer:
+    """Appends the events of the current session to a new trace file, asynchronously"""
+
+    def __init__(self, traces_dir: str = TRACES_DIR):
+        self.traces_dir = traces_dir
+        self._lock = threading.Lock()
+        self._pending: queue.Queue = queue.Queue(maxsize=_MAX_PENDING_EVENTS)
+        self._writer_thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config.get("trace_state_transitions", False))
+
+    def record(self, kind: str, source: str, **fields):
+        """Queue an event of `source` (e.g. the farmer's class name), if tracing is enabled. Never blocks"""
+        if not self.enabled:
+            return
+        event = {"t": round(time.monotonic(), 4), "ev": kind, "src": source}
+        event.update((name, _plain(value)) for name, value in fields.items())
+        try:
+            self._pending.put_nowait(event)
+        except queue.Full:
+            return
+        if self._writer_thread is None:
+            with self._lock:
+                if self._writer_thread is None:
+                    self._writer_thread = threading.Thread(target=self._write_loop, name="state-tracer", daemon=True)
+                    self._writer_thread.start()
+
+    def _write_loop(self):
+        filepath = os.path.join(self.traces_dir, f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        header = {
+            "t": round(time.monotonic(), 4),
+            "ev": TraceEvents.HEADER,
+            "format_version": TRACE_FORMAT_VERSION,
+            "wall_time": time.time(),
+        }
+        try:
+            os.makedirs(self.traces_dir, exist_ok=True)
+            with open(filepath, "a", encoding="utf-8", newline="\n") as f:
+                f.write(json.dumps(header, separators=(",", ":")) + "\n")
+                while True:
+                    # Write everything pending at once, then wait for more
+                    events = [self._pending.get()]
+                    while len(events) < _MAX_PENDING_EVENTS:
+                        try:
+                            events.append(self._pending.get_nowait())
+                        except queue.Empty:
+                            break
+                    f.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events))
+                    f.flush()
+        except Exception as e:
+            # Losing the trace is fine, stopping the farmer isn't
+            print(f"Couldn't write the state trace '{filepath}': {e}")
+
+
+state_tracer = StateTracer()
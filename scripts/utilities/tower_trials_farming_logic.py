@@ -6,11 +6,11 @@ import pyautogui as pyautogui
 
 # Import all images
 import utilities.vision_images as vio
+from utilities.app_config import wait_if_paused
 from utilities.fighting_strategies import IBattleStrategy
 from utilities.general_farmer_interface import IFarmer
 from utilities.utilities import (
     capture_window,
-    check_for_reconnect,
     find,
     find_and_click,
     find_floor_coordinates,
@@ -26,6 +26,7 @@ class States(Enum):
 class TowerTrialsFarmer(IFarmer):
 
     num_fights = 0
+    checkpoint_attributes = ("num_fights",)
 
     def __init__(self, battle_strategy: IBattleStrategy | None = None, starting_state=States.READY_TO_FIGHT, **kwargs):
         super().__init__()
@@ -101,7 +102,9 @@ class TowerTrialsFarmer(IFarmer):
 
         while True:
 
-            check_for_reconnect()
+            wait_if_paused()
+            self.interrupts.evaluate(self, groups=("reconnect",))
+            self.save_checkpoint()
 
             if self.current_state == States.READY_TO_FIGHT:
                 self.ready_to_fight_state()
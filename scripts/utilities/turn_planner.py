@@ -0,0 +1,125 @@
+"""Lookahead planning of a whole turn: which cards to play (and move) in the remaining card slots, and in which order.
+
+Every sequence of plays, and of moves that generate a merge, is simulated on a `HandState` with the rules of
+`utilities.battle_utilities`, and the hand and cards played at the end are scored by the strategy. The search goes
+depth-first, trying the best-scored actions first, and remembers the best continuation of every hand state it has
+seen, so that sequences reaching the same state (e.g. playing either of two identical cards) are only explored once.
+
+Past the time budget, no new alternatives are explored: the plan is the best one found so far, which is at least the
+one that follows the best-scored action at every step.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from numbers import Integral
+
+from utilities.card_data import Card, CardTypes, copy_hand
+from utilities.hand_state import CardAction, HandState
+
+# Score of the hand left and the cards played (in order) after some actions. Higher is better
+TurnEvaluation = Callable[[list[Card], list[Card]], float]
+
+_UNPLAYABLE_CARD_TYPES = (CardTypes.GROUND, CardTypes.NONE, CardTypes.DISABLED)
+
+
+@dataclass
+class TurnPlan:
+    actions: list[CardAction]
+    # The predicted hand before each action, the first one being the hand the plan was made for
+    hands: list[list[Card]]
+    score: float
+    # Different hand states evaluated, and whether all of them could be explored within the time budget
+    explored_states: int
+    complete: bool
+
+
+def candidate_actions(hand: HandState, allow_moves: bool = True) -> list[CardAction]:
+    """Every card play, and every move that generates a merge"""
+    playable_ids = [i for i in range(len(hand)) if hand.card_type(i) not in _UNPLAYABLE_CARD_TYPES]
+    actions: list[CardAction] = list(playable_ids)
+    if allow_moves:
+        actions.extend((i, j) for i in playable_ids for j in playable_ids if i != j and hand.can_merge(i, j))
+    return actions
+
+
+def apply_action(hand: HandState, action: CardAction) -> HandState:
+    """The hand after the action, as predicted by the merge rules"""
+    next_hand = hand.copy()
+    next_hand.apply(action)
+    return next_hand
+
+
+class _TurnSearch:
+    def __init__(self, evaluate: TurnEvaluation, played_cards: list[Card], deadline: float, allow_moves: bool):
+        self.evaluate = evaluate
+        # Cards played this turn before planning
+        self.played_cards = played_cards
+        self.deadline = deadline
+        self.allow_moves = allow_moves
+        # (hand state, codes of the cards played, slots left) -> (best score, best actions from there)
+        self.best_continuations: dict[tuple, tuple[float, list[CardAction]]] = {}
+        self.explored_states = 0
+        self.complete = True
+
+    def best_continuation(
+        self, hand: HandState, played: tuple[tuple[int, Card], ...], slots_left: int
+    ) -> tuple[float, list[CardAction]]:
+        """`played` holds the code and card of every card played since planning"""
+        key = (hand, tuple(code for code, _ in played), slots_left)
+        if key in self.best_continuations:
+            return self.best_continuations[key]
+        self.explored_states += 1
+
+        children = []
+        if slots_left > 0:
+            for action in candidate_actions(hand, self.allow_moves):
+                next_hand = apply_action(hand, action)
+                next_played = (
+                    (*played, (hand.card_code(action), hand.card(action))) if isinstance(action, Integral) else played
+                )
+                children.append((self._evaluate(next_hand, next_played), action, next_hand, next_played))
+
+        if not children:
+            result = (self._evaluate(hand, played), [])
+        else:
+            children.sort(key=lambda child: child[0], reverse=True)
+            result = None
+            for i, (_, action, next_hand, next_played) in enumerate(children):
+                # Always follow the best action, so that the plan fills all the slots
+                if i > 0 and time.perf_counter() > self.deadline:
+                    self.complete = False
+                    break
+                score, actions = self.best_continuation(next_hand, next_played, slots_left - 1)
+                if result is None or score > result[0]:
+                    result = (score, [action, *actions])
+
+        # Cut searches may have missed the best continuation, so only the complete ones are remembered
+        if self.complete:
+            self.best_continuations[key] = result
+        return result
+
+    def _evaluate(self, hand: HandState, played: tuple[tuple[int, Card], ...]) -> float:
+        return self.evaluate(hand.to_cards(), [*self.played_cards, *(card for _, card in played)])
+
+
+def plan_turn(
+    hand_of_cards: list[Card],
+    num_slots: int,
+    evaluate: TurnEvaluation,
+    played_cards: list[Card] | None = None,
+    time_budget: float = 0.02,
+    allow_moves: bool = True,
+) -> TurnPlan:
+    """Best sequence of actions for the next `num_slots` card slots (moves take a slot too), within `time_budget`
+    seconds. `played_cards` are the cards already played this turn"""
+    search = _TurnSearch(evaluate, list(played_cards or []), time.perf_counter() + time_budget, allow_moves)
+    hand = HandState.from_cards(hand_of_cards)
+    score, actions = search.best_continuation(hand, (), num_slots)
+
+    hands = [copy_hand(hand_of_cards)]
+    for action in actions[:-1]:
+        hand = apply_action(hand, action)
+        hands.append(copy_hand(hand.to_cards()))
+
+    return TurnPlan(actions, hands, score, search.explored_states, search.complete)
@@ -1,5 +1,4 @@
 import contextlib
-import glob
 import os
 import random
 import threading
@@ -7,7 +6,7 @@ import time
 from ctypes import windll
 from enum import Enum
 from numbers import Integral
-from typing import Callable, Union
+from typing import TYPE_CHECKING, Callable, Union
 
 import cv2
 import dill as pickle
@@ -18,8 +17,6 @@ import utilities.vision_images as vio
 import win32api
 import win32con
 import win32gui
-from sklearn.linear_model import LogisticRegression
-from sklearn.neighbors import KNeighborsClassifier
 from utilities.app_config import (
     APP_CONFIG_DEFAULTS,
     click_tracker,
@@ -35,7 +32,10 @@ from utilities.capture_window import (
     is_7ds_window_open,
 )
 from utilities.card_data import Card, CardColors, CardRanks, CardTypes
+from utilities.card_identity import card_identity_index
 from utilities.coordinates import Coordinates
+from utilities.feature_extractors import extract_color_histograms_features
+from utilities.hand_cache import CardClassification, hand_cache
 from utilities.models import (
     AmplifyCardPredictor,
     CardMergePredictor,
@@ -47,6 +47,15 @@ from utilities.models import (
 )
 from utilities.vision import Vision
 
+if TYPE_CHECKING:
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+
+# Card templates (names in `vision_images`) identifying specific hero cards
+MELI_TEMPLATES = ("meli_ult", "meli_aoe", "meli_ampli")
+STANCE_CANCEL_TEMPLATES = ("freyja_st", "margaret_st")
+SNAKE_HAM_TEMPLATES = ("mael_aoe", "mael_st", "freyja_st", "freyja_aoe")
+
 
 class Color(str, Enum):
     RED = "red"
@@ -60,6 +69,36 @@ class Color(str, Enum):
     GRAY = "gray"
 
 
+# Receives the mouse and keyboard actions instead of the game, if set (see `set_input_sink`)
+_input_sink: Callable[[str, tuple], None] | None = None
+
+
+def set_input_sink(sink: Callable[[str, tuple], None] | None):
+    """Send the clicks, drags and key presses to `sink(action, arguments)` instead of the game, e.g. to run the
+    strategies offline. `None` goes back to the game"""
+    global _input_sink
+    _input_sink = sink
+
+
+# Takes the place of the waits for the game, if set (see `set_game_wait`)
+_game_wait: Callable[[float], None] | None = None
+
+
+def set_game_wait(wait: Callable[[float], None] | None):
+    """Call `wait(seconds)` instead of sleeping while the game reacts to an input (see `wait_for_game`), e.g. to
+    skip the waits while running the strategies offline. `None` goes back to sleeping"""
+    global _game_wait
+    _game_wait = wait
+
+
+def wait_for_game(seconds: float):
+    """Give the game time to react to an input"""
+    if _game_wait is not None:
+        _game_wait(seconds)
+        return
+    time.sleep(seconds)
+
+
 def draw_rectangles(
     haystack_img, rectangles: np.ndarray, line_color: tuple = (0, 255, 0), line_type=cv2.LINE_4
 ) -> np.ndarray:
@@ -227,6 +266,9 @@ def click_im(rectangle_or_point: Union[np.ndarray, tuple], window_location: list
 def move_to_location(point: np.ndarray | tuple, window_location: list[float]):
     """Move the cursor to a location without clicking on it"""
     (x, y) = (point[0] + window_location[0], point[1] + window_location[1])
+    if _input_sink is not None:
+        _input_sink("move", (x, y))
+        return
     pyautogui.moveTo(x, y)
     time.sleep(0.1)
 
@@ -300,7 +342,7 @@ def find_and_click(
         print(f"Clicked on '{vision_image.image_name}'")
         click_tracker.record_image_click(vision_image.image_name)
 
-        time.sleep(0.2 + max(0, sleep_time))
+        wait_for_game(0.2 + max(0, sleep_time))
 
         return True
 
@@ -322,6 +364,9 @@ def find_floor_coordinates(screenshot: np.ndarray):
 
 
 def click(x, y, sleep_after_click=0.01):
+    if _input_sink is not None:
+        _input_sink("click", (x, y))
+        return
     wait_if_paused()
     pyautogui.moveTo(x, y)
     win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN, 0, 0)
@@ -331,6 +376,9 @@ def click(x, y, sleep_after_click=0.01):
 
 
 def rclick(x, y, sleep_after_click=0.01):
+    if _input_sink is not None:
+        _input_sink("rclick", (x, y))
+        return
     wait_if_paused()
     pyautogui.moveTo(x, y)
     win32api.mouse_event(win32con.MOUSEEVENTF_RIGHTDOWN, 0, 0)
@@ -346,6 +394,9 @@ def click_and_drag(start_x, start_y, end_x, end_y, *, sleep_after_click=0.02, dr
     - Requests 1 ms timer resolution only during the drag for smoother motion.
     - Slightly bumps thread priority (best-effort) to reduce scheduling hiccups.
     """
+    if _input_sink is not None:
+        _input_sink("drag", (start_x, start_y, end_x, end_y))
+        return
     wait_if_paused()
 
     # --- Best-effort: give this thread a little priority boost
@@ -425,6 +476,9 @@ def drag_im(start_point, end_point, window_location, sleep_after_click=0.15, dra
 
 
 def press_key(key: str):
+    if _input_sink is not None:
+        _input_sink("key", (key,))
+        return
     wait_if_paused()
     print(f"Pressing key '{key}'")
     pyautogui.press(key)
@@ -587,10 +641,7 @@ def get_hand_cards(num_units=4) -> list[Card]:
         for i in range(8)
     ]
 
-    return [
-        Card(determine_card_type(card[-1]), *card, determine_card_rank(card[-1]), num_units=num_units)
-        for card in house_of_cards
-    ]
+    return [classify_hand_card(*card, num_units=num_units) for card in house_of_cards]
 
 
 def get_hand_cards_3_cards() -> list[Card]:
@@ -613,15 +664,32 @@ def get_hand_cards_3_cards() -> list[Card]:
         for i in range(7)
     ]
 
-    return [
-        Card(
-            determine_card_type(card[-1], three_cards=True),
-            *card,
-            determine_card_rank(card[-1], three_cards=True),
-            num_units=3,
+    return [classify_hand_card(*card, num_units=3) for card in house_of_cards]
+
+
+def classify_hand_card(rectangle: list[int], card_image: np.ndarray, num_units=4) -> Card:
+    """Build the `Card` of a hand crop. The models only run if an identical crop hasn't been classified yet
+    this turn, otherwise the previous classification is reused (cards shift between picks, but don't change)."""
+    key = hand_cache.key(card_image, num_units=num_units)
+    classification = hand_cache.get(key)
+    if classification is None:
+        three_cards = num_units == 3
+        classification = hand_cache.store(
+            key,
+            CardClassification(
+                determine_card_type(card_image, three_cards=three_cards),
+                determine_card_rank(card_image, three_cards=three_cards),
+            ),
         )
-        for card in house_of_cards
-    ]
+
+    return Card(
+        classification.card_type,
+        rectangle,
+        card_image,
+        classification.card_rank,
+        num_units=num_units,
+        template_matches=classification.template_matches,
+    )
 
 
 def set_card_colors(hand_of_cards: list[Card], list_of_colors: list[CardColors] = None) -> None:
@@ -644,6 +712,23 @@ def get_card_slot_region_image(screenshot: np.ndarray) -> np.ndarray:
     return crop_region(screenshot, Coordinates.get_coordinates("card_slots_region"))
 
 
+CARD_SLOT_REGIONS = (
+    "first_slot_region",
+    "second_slot_region",
+    "third_slot_region",
+    "fourth_slot_region",
+    "fifth_slot_region",
+)
+
+
+def get_card_slot_images(screenshot: np.ndarray, num_slots: int = 4) -> np.ndarray:
+    """Crops of the first `num_slots` card slots, as a single batch"""
+    return np.stack(
+        [crop_region(screenshot, Coordinates.get_coordinates(region)) for region in CARD_SLOT_REGIONS[:num_slots]],
+        axis=0,
+    )
+
+
 def extract_units_types() -> list[np.ndarray]:
     """Get a of images corresponding to the unit types, in order"""
     screenshot, _ = capture_window()
@@ -693,19 +778,96 @@ def determine_card_type(card: np.ndarray | None, three_cards: bool = False) -> C
     return card_type
 
 
+def compute_merge_histograms(cards: list[Card]):
+    """Compute, in a single batch, the merge histograms of the cards that don't have one yet"""
+    pending_cards = [card for card in cards if card.merge_histogram is None and card.card_image is not None]
+    if not pending_cards:
+        return
+
+    interiors = [get_card_interior_image(card.card_image) for card in pending_cards]
+    if len({interior.shape for interior in interiors}) == 1:
+        interiors = np.stack(interiors, axis=0)
+    histograms = extract_color_histograms_features(interiors)
+
+    for card, histogram in zip(pending_cards, histograms):
+        card.merge_histogram = histogram
+
+
+class HandMergeMatrix:
+    """Pairwise merge predictions between the cards of the current hand.
+
+    The histogram of each card is computed once (and kept in `Card.merge_histogram`), and all the card pairs are
+    evaluated with a single batched model call when the hand is read. Afterwards, predicting a merge is a lookup.
+    Pairs involving cards not seen when the hand was read (e.g., copies) are predicted on demand and remembered.
+    """
+
+    def __init__(self):
+        # Keyed by the `id`s of the two card histograms, which are kept alive in `_histograms` so ids aren't reused
+        self._pair_predictions: dict[tuple[int, int], bool] = {}
+        self._histograms: list[np.ndarray] = []
+        # Predicts the merges instead of the model if set, e.g. in simulations where cards have no images
+        self.merge_rule: Callable[[Card, Card], bool] | None = None
+
+    def update(self, hand_of_cards: list[Card]):
+        """Evaluate all the card pairs of a freshly read hand"""
+        if self.merge_rule is not None:
+            return
+        cards = [card for card in hand_of_cards if card.card_image is not None]
+        compute_merge_histograms(cards)
+
+        # Hands predicted from the last one read (e.g. after simulating some plays) share its histograms
+        known_histograms = {id(histogram) for histogram in self._histograms}
+        if cards and all(id(card.merge_histogram) in known_histograms for card in cards):
+            return
+
+        self._pair_predictions = {}
+        self._histograms = [card.merge_histogram for card in cards]
+        if len(cards) < 2:
+            return
+
+        histograms = np.stack(self._histograms, axis=0)
+        distances = np.linalg.norm(histograms[:, np.newaxis] - histograms[np.newaxis], axis=-1)
+        predictions = CardMergePredictor.predict_card_merges(distances, lambda index: self._card_pair(cards, *index))
+
+        for i, histogram_1 in enumerate(self._histograms):
+            for j, histogram_2 in enumerate(self._histograms):
+                self._pair_predictions[id(histogram_1), id(histogram_2)] = bool(predictions[i, j])
+
+    @staticmethod
+    def _card_pair(cards: list[Card], i: int, j: int) -> np.ndarray | None:
+        """Interiors of both cards, as in the merges dataset. Each pair is only needed once"""
+        if i >= j:
+            return None
+        interior_1 = get_card_interior_image(cards[i].card_image)
+        interior_2 = get_card_interior_image(cards[j].card_image)
+        return np.stack((interior_1, interior_2), axis=0) if interior_1.shape == interior_2.shape else None
+
+    def predict(self, card_1: Card, card_2: Card) -> bool:
+        """Whether the interiors of both cards are the same card (regardless of ranks)"""
+        if self.merge_rule is not None:
+            return self.merge_rule(card_1, card_2)
+        compute_merge_histograms([card_1, card_2])
+        key = (id(card_1.merge_histogram), id(card_2.merge_histogram))
+        if key not in self._pair_predictions:
+            distance = np.linalg.norm(card_1.merge_histogram - card_2.merge_histogram)
+            self._pair_predictions[key] = bool(CardMergePredictor.predict_card_merges(np.array([distance]))[0])
+            self._histograms.extend((card_1.merge_histogram, card_2.merge_histogram))
+        return self._pair_predictions[key]
+
+
+hand_merge_matrix = HandMergeMatrix()
+
+
 def determine_card_merge(card_1: Card | None, card_2: Card | None) -> bool:
     """Predict whether two cards are going to merge"""
 
     if card_1.card_type in [CardTypes.NONE, CardTypes.GROUND] or card_2.card_type in [CardTypes.NONE, CardTypes.GROUND]:
         return 0
 
-    card_1_interior = get_card_interior_image(card_1.card_image)
-    card_2_interior = get_card_interior_image(card_2.card_image)
-
     return (
-        CardMergePredictor.predict_card_merge(card_1_interior, card_2_interior)
-        and card_1.card_rank == card_2.card_rank
+        card_1.card_rank == card_2.card_rank
         and card_1.card_rank.value in {0, 1}  # Only merge if both cards are BRONZE or SILVER
+        and hand_merge_matrix.predict(card_1, card_2)
     )
 
 
@@ -756,11 +918,7 @@ def is_Thor_card(card: Card) -> bool:
 
 def is_Meli_card(card: Card) -> bool:
     """Identify a Traitor Meli card"""
-    return not is_ground_card(card) and (
-        find(vio.meli_ult, card.card_image)
-        or find(vio.meli_aoe, card.card_image)
-        or find(vio.meli_ampli, card.card_image)
-    )
+    return not is_ground_card(card) and card_identity_index.matches_any(card, MELI_TEMPLATES)
 
 
 def is_ground_card(card: Card) -> bool:
@@ -785,22 +943,12 @@ def is_ground_region(screenshot: np.ndarray, card: Card, plot: bool = False) ->
 
 def is_stance_cancel_card(card: Card) -> bool:
     """Return whether the card is Stance Cancel"""
-    if card.card_image is None:
-        return False
-    return find(vio.freyja_st, card.card_image) or find(vio.margaret_st, card.card_image)
+    return card_identity_index.matches_any(card, STANCE_CANCEL_TEMPLATES)
 
 
 def is_hard_hitting_snake_card(card: Card) -> bool:
     """Return whether a card can be used as hard-hitting on Snake (excluding ultimates)"""
-    if card.card_image is None:
-        return False
-    card_image = card.card_image
-    return (
-        find(vio.mael_aoe, card_image)
-        or find(vio.mael_st, card_image)
-        or find(vio.freyja_st, card_image)
-        or find(vio.freyja_aoe, card_image)
-    )
+    return card_identity_index.matches_any(card, SNAKE_HAM_TEMPLATES)
 
 
 def display_image(image: np.ndarray, title: str = "Image"):
@@ -809,30 +957,7 @@ def display_image(image: np.ndarray, title: str = "Image"):
     cv2.destroyAllWindows()
 
 
-def load_dataset(glob_pattern: str) -> tuple[list | np.ndarray, np.ndarray]:
-    """Return all the data and labels together, based on the specified file pattern"""
-    dataset = []
-    all_labels = []
-
-    for filepath in glob.iglob(glob_pattern):
-        print(f"Loading {filepath}...")
-        local_data = pickle.load(open(filepath, "rb"))
-        data, labels = local_data["data"], local_data["labels"]
-
-        dataset.append(data)
-        all_labels.append(labels)
-
-    try:
-        dataset = np.concatenate(dataset, axis=0)
-    except ValueError:
-        print("Error concatenating dataset, returning list instead")
-
-    all_labels = np.concatenate(all_labels, axis=0)
-
-    return dataset, all_labels
-
-
-def save_model(model: KNeighborsClassifier | LogisticRegression, filename: str):
+def save_model(model: "KNeighborsClassifier | LogisticRegression", filename: str):
     """Save the model in file"""
     model_path = os.path.join("models", f"{filename}")
     with open(model_path, "wb") as pfile:
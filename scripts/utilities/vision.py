@@ -22,6 +22,17 @@ def _read_image(path: str) -> np.ndarray | None:
         return None
 
 
+# Matches every template instead of the images' own strategies, if set (see `set_matching_strategy`)
+_matching_strategy_override: IMatchingStrategy | None = None
+
+
+def set_matching_strategy(matching_strategy: IMatchingStrategy | None):
+    """Match all the images with `matching_strategy`, e.g. `NoMatchStrategy` to run the strategies offline on a
+    blank screen. `None` goes back to the strategy of each image"""
+    global _matching_strategy_override
+    _matching_strategy_override = matching_strategy
+
+
 class Vision:
     """Class to host a single image template to match"""
 
@@ -51,6 +62,14 @@ class Vision:
     def image_name(self) -> str:
         return self._image_name
 
+    @property
+    def matching_strategy(self) -> IMatchingStrategy:
+        return _matching_strategy_override or self._matching_strategy
+
+    @matching_strategy.setter
+    def matching_strategy(self, matching_strategy: IMatchingStrategy):
+        self._matching_strategy = matching_strategy
+
     @property
     def needle_img(self) -> np.ndarray | None:
         """Lazily-loaded template image; missing file yields ``None`` (and a one-shot warning)."""
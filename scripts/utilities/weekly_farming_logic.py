@@ -9,6 +9,7 @@ import pyautogui as pyautogui
 # Import all images
 import utilities.vision_images as vio
 from utilities.coordinates import Coordinates
+from utilities.interrupts import ESSETTE_SHOP, InterruptRegistry
 from utilities.logging_utils import LoggerWrapper
 from utilities.utilities import (
     capture_window,
@@ -37,6 +38,9 @@ class WeeklyFarmer:
     # Lock for thread safety, always necessary
     _lock = Lock()
 
+    # Popups closed before every state handler
+    interrupts = InterruptRegistry([ESSETTE_SHOP])
+
     # To check if we should kill the farmer
     farmer_killed = False
     manual_kill = False
@@ -215,8 +219,7 @@ class WeeklyFarmer:
 
     def check_for_essette_shop(self):
         """Check if we have the Essette shop, and click on it if so to remove the popup"""
-        screenshot, window_location = capture_window()
-        find_and_click(vio.essette_shop, screenshot, window_location)
+        self.interrupts.evaluate(self)
 
     def run(self):
 